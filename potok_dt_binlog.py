@@ -0,0 +1,275 @@
+import argparse
+import ipaddress
+import os
+import re
+import struct
+import zlib
+from datetime import datetime
+from potok_dt_log import RotatingLogWriter, next_midnight, read_file_header
+from potok_dt_detectors import (
+    decode_detectors_bytes,
+    nibbles_to_chars,
+    print_full_output,
+    print_light_output,
+)
+
+# Бинарный лог выборок: заголовок файла + записи фиксированного размера
+#   заголовок: magic 'UGDT', версия, тип источника, размер поля данных
+#   запись:    время (float64, time.time()), id контроллера (uint32),
+#              длина данных (uint8), данные (дополнены нулями до размера поля)
+MAGIC = b'UGDT'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sBBH')
+RECORD_HEADER = struct.Struct('<dIB')
+
+KIND_SNMP = 0   # Сырой OctetString детекторов из SNMP
+KIND_HTTPS = 1  # Статусы со страницы /detectors/status, байт на детектор по номеру
+
+HTTPS_STATUS_CODES = {'0': 0, '1': 1}
+HTTPS_STATUS_UNKNOWN = 0xFF
+
+# Размер поля данных; 0 - по длине первой записанной выборки
+BINARY_LOG_PAYLOAD = int(os.getenv('BINARY_LOG_PAYLOAD', '0'))
+DEFAULT_PAYLOAD = 64
+
+RAW_LINE_RE = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3})\] Raw data: '(0x[0-9a-fA-F]*)'")
+HTTPS_LINE_RE = re.compile(r"^Запрос: [\d:.]+, Ответ: (\d{2}:\d{2}:\d{2}\.\d{3}), Время: \d+ мс - (.*)$")
+HTTPS_DETECTOR_RE = re.compile(r"DT (\d+) = \S+ (\S+)")
+HTTPS_DATE_RE = re.compile(r"(\d{8})")
+
+
+def controller_id(ip):
+    """IPv4 адрес как uint32, для прочих имен - crc32"""
+    try:
+        return int(ipaddress.IPv4Address(ip))
+    except ipaddress.AddressValueError:
+        return zlib.crc32(ip.encode())
+
+
+def controller_name(controller):
+    """Обратное преобразование id в строку IPv4"""
+    return str(ipaddress.IPv4Address(controller))
+
+
+def file_header(kind=KIND_SNMP, payload_size=DEFAULT_PAYLOAD):
+    return FILE_HEADER.pack(MAGIC, VERSION, kind, payload_size)
+
+
+def pack_record(timestamp, controller, data, payload_size=DEFAULT_PAYLOAD):
+    """Упаковывает одну выборку; данные длиннее поля обрезаются"""
+    data = bytes(data[:payload_size])
+    return RECORD_HEADER.pack(timestamp, controller, len(data)) + data.ljust(payload_size, b'\0')
+
+
+def encode_https_statuses(detectors):
+    """Статусы детекторов HTTPS в байты: индекс = номер детектора - 1"""
+    statuses = {}
+    for det in detectors:
+        try:
+            statuses[int(det['number'])] = HTTPS_STATUS_CODES.get(det['status'], HTTPS_STATUS_UNKNOWN)
+        except ValueError:
+            continue
+    if not statuses:
+        return b''
+    data = bytearray([HTTPS_STATUS_UNKNOWN]) * max(statuses)
+    for number, code in statuses.items():
+        if number > 0:
+            data[number - 1] = code
+    return bytes(data)
+
+
+class BinarySampleLog:
+    """Дневной бинарный лог выборок одного контроллера.
+
+    Размер поля данных выбирается в начале дня: если файл дня уже есть
+    (перезапуск), берется из его заголовка, иначе - по первой выборке.
+    Файл с чужим заголовком не дописывается - выборки идут в следующую
+    часть дня (<prefix>_<дата>_1.bin и т.д.).
+    """
+
+    def __init__(self, log_dir, ip, kind=KIND_SNMP, prefix="snmp_samples", payload_size=BINARY_LOG_PAYLOAD):
+        self.controller = controller_id(ip)
+        self.log_dir = log_dir
+        self.kind = kind
+        self.prefix = prefix
+        self.configured_payload = payload_size
+        self.payload_size = None
+        # По дате файла: суффикс части и размер поля (заголовок пишется при открытии)
+        self.parts = {}
+        self.payloads = {}
+        self._rotate_at = 0.0
+        self.writer = RotatingLogWriter(
+            self.path_for,
+            lambda current_date: file_header(kind, self.payloads[current_date]),
+            binary=True,
+        )
+
+    def path_for(self, current_date):
+        return os.path.join(self.log_dir, f"{self.prefix}_{current_date}{self.parts.get(current_date, '')}.bin")
+
+    def _start_day(self, timestamp, data):
+        """Выбирает файл дня и размер поля, сверяясь с заголовком уже записанного файла"""
+        current_date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        payload_size = self.configured_payload or min(max(len(data), 1), 255)
+        part = 0
+        while True:
+            self.parts[current_date] = f"_{part}" if part else ""
+            path = self.path_for(current_date)
+            header = read_file_header(path, FILE_HEADER.size)
+            if header is None:
+                break
+            if len(header) == FILE_HEADER.size:
+                magic, version, kind, existing_payload = FILE_HEADER.unpack(header)
+                if (magic == MAGIC and version == VERSION and kind == self.kind and existing_payload
+                        and (not self.configured_payload or existing_payload == self.configured_payload)):
+                    payload_size = existing_payload
+                    # Неполная запись от прерванного процесса сдвинула бы все следующие
+                    record_size = RECORD_HEADER.size + payload_size
+                    extra = (os.path.getsize(path) - FILE_HEADER.size) % record_size
+                    if extra:
+                        os.truncate(path, os.path.getsize(path) - extra)
+                    break
+            part += 1
+        self.payloads[current_date] = payload_size
+        self.payload_size = payload_size
+        self._rotate_at = next_midnight(timestamp)
+
+    def write(self, timestamp, data):
+        if timestamp >= self._rotate_at:
+            self._start_day(timestamp, data)
+        # Тот же timestamp выбирает файл в writer, поэтому день и размер поля совпадают
+        self.writer.write(pack_record(timestamp, self.controller, data, self.payload_size), timestamp)
+
+    def close(self):
+        self.writer.close()
+
+
+def read_samples(path, chunk_records=4096):
+    """Потоково читает файл, выдает (тип, время, id контроллера, данные)"""
+    with open(path, 'rb') as f:
+        header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            return
+        magic, version, kind, payload_size = FILE_HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: неизвестный формат бинарного лога")
+
+        record_size = RECORD_HEADER.size + payload_size
+        while True:
+            chunk = f.read(record_size * chunk_records)
+            if not chunk:
+                break
+            # Неполная запись в конце (файл еще пишется) пропускается
+            usable = len(chunk) - len(chunk) % record_size
+            view = memoryview(chunk)
+            for offset in range(0, usable, record_size):
+                timestamp, controller, length = RECORD_HEADER.unpack_from(view, offset)
+                start = offset + RECORD_HEADER.size
+                yield kind, timestamp, controller, bytes(view[start:start + length])
+            if usable < len(chunk):
+                break
+
+
+def format_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def render_sample(kind, timestamp, data, mode='light'):
+    """Строки лога для выборки в виде light / full режима"""
+    current_datetime = format_datetime(timestamp)
+
+    if kind == KIND_HTTPS:
+        entries = []
+        for index, code in enumerate(data, 1):
+            if code == 1:
+                entries.append(f"DT {index} = 🟢 1")
+            elif code == 0:
+                entries.append(f"DT {index} = ⚪ 0")
+            else:
+                entries.append(f"DT {index} = ❓ ?")
+        return [f"[{current_datetime}] " + " , ".join(entries)]
+
+    lines = [f"[{current_datetime}] Raw data: '0x{data.hex()}'"]
+    reordered_detectors = nibbles_to_chars(decode_detectors_bytes(data))
+    if not reordered_detectors:
+        lines.append(f"[{current_datetime}] Неверный формат данных")
+    elif mode == 'light':
+        lines.append(f"[{current_datetime}] {print_light_output(reordered_detectors, len(reordered_detectors))}")
+    else:
+        for line in print_full_output(reordered_detectors, len(reordered_detectors)).split('\n'):
+            lines.append(f"[{current_datetime}] {line}")
+    return lines
+
+
+def convert_text_log(text_path, out_path, ip, payload_size=BINARY_LOG_PAYLOAD):
+    """Конвертирует snmp_log_* или detectors_log_* в бинарный формат"""
+    controller = controller_id(ip)
+    is_https = os.path.basename(text_path).startswith('detectors_log_')
+    kind = KIND_HTTPS if is_https else KIND_SNMP
+
+    day = None
+    if is_https:
+        match = HTTPS_DATE_RE.search(os.path.basename(text_path))
+        if not match:
+            raise ValueError(f"{text_path}: не удалось определить дату по имени файла")
+        day = match.group(1)
+
+    count = 0
+    with open(text_path, encoding='utf-8', errors='replace') as src, open(out_path, 'wb') as dst:
+        for line in src:
+            if is_https:
+                match = HTTPS_LINE_RE.match(line)
+                if not match:
+                    continue
+                timestamp = datetime.strptime(f"{day} {match.group(1)}", "%Y%m%d %H:%M:%S.%f").timestamp()
+                detectors = [{'number': number, 'status': status}
+                             for number, status in HTTPS_DETECTOR_RE.findall(match.group(2))]
+                data = encode_https_statuses(detectors)
+            else:
+                match = RAW_LINE_RE.match(line)
+                if not match:
+                    continue
+                timestamp = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S.%f").timestamp()
+                data = bytes.fromhex(match.group(2)[2:])
+
+            if count == 0:
+                # Размер поля - по первой выборке, если не задан явно
+                if not payload_size:
+                    payload_size = min(max(len(data), 1), 255)
+                dst.write(file_header(kind, payload_size))
+            dst.write(pack_record(timestamp, controller, data, payload_size))
+            count += 1
+
+        if count == 0:
+            dst.write(file_header(kind, payload_size or DEFAULT_PAYLOAD))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бинарный лог выборок детекторов")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    show = commands.add_parser('show', help="вывести бинарный лог в текстовом виде")
+    show.add_argument('path')
+    show.add_argument('--mode', choices=['light', 'full'], default='light')
+
+    convert = commands.add_parser('convert', help="конвертировать текстовый лог в бинарный")
+    convert.add_argument('text_path')
+    convert.add_argument('out_path')
+    convert.add_argument('--ip', default=os.getenv('IP', '0.0.0.0'))
+
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        for kind, timestamp, controller, data in read_samples(args.path):
+            for line in render_sample(kind, timestamp, data, args.mode):
+                print(line)
+    else:
+        count = convert_text_log(args.text_path, args.out_path, args.ip)
+        before = os.path.getsize(args.text_path)
+        after = os.path.getsize(args.out_path)
+        print(f"Записей: {count}, размер {before} -> {after} байт (x{before / max(after, 1):.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from potok_dt_events import EdgeDetector, https_statuses_to_bits
+
+# Загрузка констант из .env
+COMPARE_MAX_LAG = float(os.getenv('COMPARE_MAX_LAG', '2.0'))  # Наибольшая разница времени для пары событий, с
+COMPARE_BIT_PLANE = int(os.getenv('COMPARE_BIT_PLANE', '0'))  # Бит ниббла SNMP, соответствующий статусу HTTPS
+COMPARE_MAP = os.getenv('COMPARE_MAP', '')  # Соответствие 'D SNMP=номер HTTPS,...'; по умолчанию D i = номер i
+
+
+def parse_mapping(spec):
+    """'1=3,2=4' -> {1: 3, 2: 4}: детектор SNMP (после reorder_detectors) -> номер на странице HTTPS"""
+    mapping = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        snmp_index, https_number = item.split('=', 1)
+        mapping[int(snmp_index)] = int(https_number)
+    return mapping
+
+
+def sample_edges(samples, plane=0, mapping=None):
+    """Выборки (время, нибблы) -> события изменения [(время, номер детектора, новое значение)].
+
+    Учитывается только бит plane; номер детектора переводится через mapping.
+    """
+    edges = EdgeDetector("")
+    events = []
+    for timestamp, nibbles in samples:
+        for event_time, _, detector, bit_plane, value in edges.update(timestamp, nibbles):
+            if bit_plane != plane:
+                continue
+            if mapping:
+                detector = mapping.get(detector)
+                if detector is None:
+                    continue
+            events.append((event_time, detector, value))
+    return events
+
+
+def match_events(snmp_events, https_events, max_lag=COMPARE_MAX_LAG):
+    """Сопоставляет изменения двух источников по детектору и направлению.
+
+    Пара - ближайшие по порядку события с тем же новым значением, разница
+    времени не больше max_lag. Возвращает {детектор: {'lags': [...],
+    'missed_by_snmp': n, 'missed_by_https': n}}; задержка > 0 - SNMP
+    сообщил об изменении раньше HTTPS.
+    """
+    streams = {}
+    for source, events in (('snmp', snmp_events), ('https', https_events)):
+        for timestamp, detector, value in events:
+            streams.setdefault((detector, value), {'snmp': [], 'https': []})[source].append(timestamp)
+
+    result = {}
+    for (detector, value), times in streams.items():
+        stats = result.setdefault(detector, {'lags': [], 'missed_by_snmp': 0, 'missed_by_https': 0})
+        snmp_times = sorted(times['snmp'])
+        https_times = sorted(times['https'])
+        used = 0
+        for snmp_time in snmp_times:
+            # События HTTPS, для которых пары уже не будет, - пропущены SNMP
+            first = bisect_left(https_times, snmp_time - max_lag, used)
+            stats['missed_by_snmp'] += first - used
+            used = first
+            if used < len(https_times) and https_times[used] <= snmp_time + max_lag:
+                stats['lags'].append(https_times[used] - snmp_time)
+                used += 1
+            else:
+                stats['missed_by_https'] += 1
+        stats['missed_by_snmp'] += len(https_times) - used
+    return result
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def format_lags(lags):
+    """Распределение задержек: медиана, p95 и доля, где SNMP раньше"""
+    if not lags:
+        return "пар нет"
+    lags = sorted(lags)
+    snmp_first = sum(1 for lag in lags if lag > 0)
+    https_first = sum(1 for lag in lags if lag < 0)
+    return (
+        f"пар {len(lags)}, медиана {percentile(lags, 0.5) * 1000:+.0f} мс, "
+        f"p5 {percentile(lags, 0.05) * 1000:+.0f} мс, p95 {percentile(lags, 0.95) * 1000:+.0f} мс, "
+        f"раньше SNMP {snmp_first}, раньше HTTPS {https_first}"
+    )
+
+
+def format_report(result):
+    """Строки отчета: по детекторам и итог"""
+    lines = ["Задержка = время HTTPS - время SNMP (плюс - SNMP раньше)"]
+    all_lags = []
+    missed_by_snmp = 0
+    missed_by_https = 0
+    for detector in sorted(result):
+        stats = result[detector]
+        all_lags.extend(stats['lags'])
+        missed_by_snmp += stats['missed_by_snmp']
+        missed_by_https += stats['missed_by_https']
+        lines.append(
+            f"DT {detector:2d}: {format_lags(stats['lags'])}; "
+            f"пропущено SNMP {stats['missed_by_snmp']}, HTTPS {stats['missed_by_https']}"
+        )
+    lines.append("-" * 60)
+    lines.append(f"Всего: {format_lags(all_lags)}")
+    lines.append(f"Пропущено изменений: SNMP {missed_by_snmp}, HTTPS {missed_by_https}")
+    return lines
+
+
+def compare_samples(snmp_samples, https_samples, plane=COMPARE_BIT_PLANE, mapping=None, max_lag=COMPARE_MAX_LAG):
+    """Выборки двух источников -> результат match_events"""
+    snmp_events = sample_edges(snmp_samples, plane, mapping)
+    https_events = sample_edges(https_samples, 0)
+    return match_events(snmp_events, https_events, max_lag)
+
+
+async def collect_live(ip, duration, snmp_interval=0.1, https_interval=0.0, snmp_port=161, https_address=None):
+    """Параллельный опрос контроллера по SNMP и HTTPS в течение duration секунд.
+
+    Возвращает (выборки SNMP, выборки HTTPS); время выборки - момент ответа.
+    https_address - адрес страницы, если отличается от ip (например ip:порт).
+    """
+    from potok_dt_https import parse_cookies_from_browser, parse_detectors_page
+    from potok_dt_https_async import fetch_status_page, make_session
+    from potok_dt_schedule import FixedRateScheduler
+    from potok_dt_snmp_client import COMMUNITY_STRING, get_client
+    from potok_dt_detectors import decode_detectors_bytes
+
+    snmp_samples = []
+    https_samples = []
+    deadline = time.monotonic() + duration
+
+    async def poll_snmp():
+        client = get_client(ip, COMMUNITY_STRING, snmp_port)
+        await client.discover()
+        scheduler = FixedRateScheduler(snmp_interval)
+        while time.monotonic() < deadline:
+            await scheduler.wait()
+            raw = await client.get_ug405_raw()
+            if raw is not None:
+                snmp_samples.append((time.time(), decode_detectors_bytes(raw)))
+
+    async def poll_https(session):
+        scheduler = FixedRateScheduler(https_interval)
+        while time.monotonic() < deadline:
+            await scheduler.wait()
+            text = await fetch_status_page(session, https_address or ip)
+            received = time.time()
+            if text is None:
+                continue
+            detectors = parse_detectors_page(text)
+            if detectors:
+                https_samples.append((received, https_statuses_to_bits(detectors)))
+
+    cookies = parse_cookies_from_browser(os.getenv('BROWSER_COOKIES', ''))
+    async with make_session(cookies) as session:
+        await asyncio.gather(poll_snmp(), poll_https(session))
+    return snmp_samples, https_samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение задержки изменений детекторов SNMP и HTTPS")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    logs = commands.add_parser('logs', help="по логам snmp_log_* и detectors_log_*")
+    logs.add_argument('snmp_log')
+    logs.add_argument('https_log')
+    logs.add_argument('--start', help="HH:MM[:SS] или 'YYYY-MM-DD HH:MM[:SS]'")
+    logs.add_argument('--end')
+
+    live = commands.add_parser('live', help="одновременный опрос контроллера")
+    live.add_argument('ip', nargs='?', default=os.getenv('IP'))
+    live.add_argument('--duration', type=float, default=60)
+    live.add_argument('--snmp-interval', type=float, default=0.1)
+    live.add_argument('--https-interval', type=float, default=0.0)
+    live.add_argument('--snmp-port', type=int, default=161)
+    live.add_argument('--https-address', help="адрес страницы, если отличается от ip (ip:порт)")
+
+    for command in (logs, live):
+        command.add_argument('--map', default=COMPARE_MAP, help="соответствие '1=3,2=4' (D SNMP = номер HTTPS)")
+        command.add_argument('--plane', type=int, default=COMPARE_BIT_PLANE)
+        command.add_argument('--max-lag', type=float, default=COMPARE_MAX_LAG)
+
+    args = parser.parse_args()
+    mapping = parse_mapping(args.map)
+
+    if args.command == 'logs':
+        from potok_dt_logreader import LogReader, parse_time_arg
+
+        with LogReader(args.snmp_log) as snmp_reader, LogReader(args.https_log) as https_reader:
+            first = next(snmp_reader.samples(), None)
+            reference = first[0] if first else time.time()
+            start = parse_time_arg(args.start, reference) if args.start else None
+            end = parse_time_arg(args.end, reference) if args.end else None
+            result = compare_samples(
+                snmp_reader.samples(start, end),
+                https_reader.samples(start, end),
+                args.plane,
+                mapping,
+                args.max_lag,
+            )
+    else:
+        if not args.ip:
+            print("❌ IP не задан (аргумент или IP в .env)")
+            return
+        print(f"Опрос {args.ip} по SNMP и HTTPS: {args.duration:.0f} с")
+        snmp_samples, https_samples = asyncio.run(collect_live(
+            args.ip,
+            args.duration,
+            args.snmp_interval,
+            args.https_interval,
+            args.snmp_port,
+            args.https_address,
+        ))
+        print(f"Выборок: SNMP {len(snmp_samples)}, HTTPS {len(https_samples)}")
+        result = compare_samples(snmp_samples, https_samples, args.plane, mapping, args.max_lag)
+
+    for line in format_report(result):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
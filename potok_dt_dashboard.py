@@ -0,0 +1,179 @@
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+# Загрузка констант из .env
+DASHBOARD_FPS = float(os.getenv('DASHBOARD_FPS', '10'))  # Наибольшая частота перерисовки, кадров/с
+DASHBOARD_PLANES = tuple(int(plane) for plane in os.getenv('DASHBOARD_PLANES', '0').split(','))  # Биты ниббла: '0' - как light, '0,1,2,3' - как full
+
+# Управляющие последовательности ANSI
+CLEAR = "\x1b[2J\x1b[H"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+CELL_WIDTH = 6  # Эмодзи (2 колонки) + номер в 3 знака + пробел
+HEADER_WIDTH = 60
+
+
+def move_to(row, column):
+    return f"\x1b[{row};{column}H"
+
+
+class Dashboard:
+    """Экран состояния детекторов, перерисовка только изменившихся ячеек.
+
+    update() из конвейера опроса только запоминает последнее состояние
+    контроллера; кадр собирается отдельной задачей не чаще DASHBOARD_FPS,
+    сравнивается с уже нарисованным и выводится одной записью в фоновом
+    потоке, поэтому опрос не ждет терминал. Если терминал не успевает,
+    кадры пропускаются.
+    """
+
+    def __init__(self, planes=DASHBOARD_PLANES, fps=DASHBOARD_FPS, stream=None):
+        self.planes = planes
+        self.interval = 1 / fps if fps > 0 else 0.1
+        self.stream = stream or sys.stdout
+        # Контроллер -> (время, нибблы, есть данные)
+        self.latest = {}
+        self.version = 0
+        self.drawn_version = -1
+        # Нарисованное: (строка, колонка) -> текст
+        self.cells = {}
+        self.layout_key = None
+        self.bottom = 1
+        self.frames = 0
+        self.last_cells = 0
+
+    def update(self, controller, timestamp, nibbles):
+        self.latest[controller] = (timestamp, nibbles, True)
+        self.version += 1
+
+    def mark_missing(self, controller, timestamp):
+        """Опрос без данных: остается последнее состояние с отметкой"""
+        previous = self.latest.get(controller)
+        self.latest[controller] = (timestamp, previous[1] if previous else b'', False)
+        self.version += 1
+
+    def frame(self):
+        """ANSI текст кадра: только ячейки, отличающиеся от нарисованных"""
+        width = shutil.get_terminal_size().columns
+        per_row = max(1, (width - 1) // CELL_WIDTH)
+        controllers = sorted(self.latest.items())
+        out = []
+
+        # Новый контроллер, другое число детекторов или ширина - полная перерисовка
+        layout_key = (width, tuple((controller, len(state[1])) for controller, state in controllers))
+        if layout_key != self.layout_key:
+            self.layout_key = layout_key
+            self.cells = {}
+            out.append(CLEAR)
+
+        cells = self.cells
+        changed = 0
+
+        def put(row, column, text):
+            nonlocal changed
+            if cells.get((row, column)) != text:
+                cells[(row, column)] = text
+                out.append(move_to(row, column) + text)
+                changed += 1
+
+        row = 1
+        for controller, (timestamp, nibbles, has_data) in controllers:
+            current_time = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")[:-3] if timestamp else "--:--:--.---"
+            header = f"{controller}  [{current_time}]{'' if has_data else '  ❌ нет данных'}"
+            put(row, 1, header.ljust(HEADER_WIDTH))
+            row += 1
+            rows_per_plane = (len(nibbles) + per_row - 1) // per_row
+            for plane in self.planes:
+                for index, nibble in enumerate(nibbles):
+                    emoji = "🟢" if (nibble >> plane) & 1 else "⚪"
+                    put(row + index // per_row, 1 + (index % per_row) * CELL_WIDTH, f"{emoji}{index + 1:>3} ")
+                row += rows_per_plane
+            row += 1
+
+        self.frames += 1
+        self.last_cells = changed
+        status = f"Контроллеров: {len(controllers)}, кадр {self.frames}, изменено ячеек: {changed}"
+        put(row, 1, status.ljust(HEADER_WIDTH))
+        self.bottom = row
+        return "".join(out)
+
+    def write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def begin(self):
+        if os.name == 'nt':
+            # Включает обработку ANSI последовательностей в консоли Windows
+            os.system('')
+        self.write(HIDE_CURSOR + CLEAR)
+
+    def end(self):
+        self.write(move_to(self.bottom + 1, 1) + SHOW_CURSOR)
+
+    async def run(self):
+        """Задача перерисовки в цикле событий опроса"""
+        loop = asyncio.get_running_loop()
+        writing = None
+        self.begin()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                if writing is not None and not writing.done():
+                    # Терминал еще выводит прошлый кадр - этот пропускаем
+                    continue
+                if self.version == self.drawn_version:
+                    continue
+                self.drawn_version = self.version
+                text = self.frame()
+                if text:
+                    writing = loop.run_in_executor(None, self.write, text)
+        finally:
+            self.end()
+
+    def run_table(self, table, running=lambda: True):
+        """Отдельный процесс-читатель: состояние из таблицы potok_dt_state"""
+        from potok_dt_state import STATUS_EMPTY, STATUS_OK
+
+        self.begin()
+        try:
+            while running():
+                for seq, name, timestamp, status, nibbles in table.snapshot():
+                    if status == STATUS_EMPTY:
+                        self.latest[name] = (0.0, b'', False)
+                    else:
+                        self.latest[name] = (timestamp, nibbles, status == STATUS_OK)
+                text = self.frame()
+                if text:
+                    self.write(text)
+                time.sleep(self.interval)
+        finally:
+            self.end()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Экран состояния детекторов из таблицы в разделяемой памяти")
+    parser.add_argument('--name', default=None, help="имя таблицы (STATE_NAME)")
+    parser.add_argument('--fps', type=float, default=DASHBOARD_FPS)
+    parser.add_argument('--planes', default=None, help="биты ниббла, например 0,1,2,3")
+    args = parser.parse_args()
+
+    from potok_dt_state import STATE_NAME, StateTable
+
+    planes = tuple(int(plane) for plane in args.planes.split(',')) if args.planes else DASHBOARD_PLANES
+    table = StateTable.attach(args.name or STATE_NAME)
+    try:
+        Dashboard(planes, args.fps).run_table(table)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+
+if __name__ == "__main__":
+    main()
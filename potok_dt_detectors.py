@@ -0,0 +1,195 @@
+# Разбор статуса детекторов UG405 и его текстовое представление.
+# Без побочных эффектов при импорте: используется монитором и утилитами логов.
+
+# Таблица преобразования символов в бинарное представление (перевернутое)
+CHAR_TO_BINARY = {
+    '0': '0000',  # 0000 -> 0000
+    '1': '1000',  # 0001 -> 1000
+    '2': '0100',  # 0010 -> 0100
+    '3': '1100',  # 0011 -> 1100
+    '4': '0010',  # 0100 -> 0010
+    '5': '1010',  # 0101 -> 1010
+    '6': '0110',  # 0110 -> 0110
+    '7': '1110',  # 0111 -> 1110
+    '8': '0001',  # 1000 -> 0001
+    '9': '1001',  # 1001 -> 1001
+    'a': '0101',  # 1010 -> 0101
+    'b': '1101',  # 1011 -> 1101
+    'c': '0011',  # 1100 -> 0011
+    'd': '1011',  # 1101 -> 1011
+    'e': '0111',  # 1110 -> 0111
+    'f': '1111',  # 1111 -> 1111
+}
+
+# Таблицы для декодирования сырых байт OctetString без hex-строки
+HEX_DIGITS = b'0123456789abcdef'
+LOW_NIBBLE_TABLE = bytes(b & 0x0F for b in range(256))
+HIGH_NIBBLE_TABLE = bytes(b >> 4 for b in range(256))
+NIBBLE_TO_CHAR_TABLE = HEX_DIGITS + bytes(240)
+# Для каждого из 4 бит: значение ниббла -> b'0' / b'1' (как в CHAR_TO_BINARY)
+NIBBLE_TO_BIT_TABLES = [
+    bytes(48 + ((b >> bit_position) & 1) for b in range(256))
+    for bit_position in range(4)
+]
+
+def parse_detectors_status(hex_string):
+    """Парсит hex-строку и возвращает статусы детекторов"""
+    if not hex_string or hex_string == "None" or not hex_string.startswith("0x"):
+        return []
+    
+    # Очищаем строку от лишних пробелов и непечатаемых символов
+    hex_string = ''.join(hex_string.split())
+    hex_string = hex_string.strip()
+    
+    # Убираем префикс "0x"
+    hex_data = hex_string[2:]
+    
+    # Делим строку на 4 равные части
+    part_length = len(hex_data) // 4
+    if part_length == 0:
+        return []
+    
+    # Берем только первую часть
+    first_part = hex_data[:part_length]
+    
+    # Каждый символ в первой части - это статус одного детектора
+    detectors_status = list(first_part)
+    
+    return detectors_status
+
+def reorder_detectors(detectors):
+    """Переупорядочивает детекторы согласно правилу: 2,1,4,3,6,5 и т.д."""
+    if not detectors:
+        return []
+    
+    reordered = []
+    for i in range(0, len(detectors), 2):
+        if i + 1 < len(detectors):
+            # Меняем местами пары: берем второй, затем первый
+            reordered.append(detectors[i + 1])
+            reordered.append(detectors[i])
+        else:
+            # Если нечетное количество, последний остается на месте
+            reordered.append(detectors[i])
+    
+    return reordered
+
+def hex_to_raw(hex_string):
+    """Преобразует '0x...' из prettyPrint в bytes, None если это не hex"""
+    if not hex_string or not hex_string.startswith("0x"):
+        return None
+    try:
+        return bytes.fromhex(hex_string[2:])
+    except ValueError:
+        return None
+
+def decode_detectors_bytes(raw):
+    """Статусы детекторов из сырых байт, сразу в порядке reorder_detectors.
+    
+    Возвращает bytes, один байт (ниббл 0-15) на детектор; бит N ниббла -
+    строка N в convert_to_binary_representation. Результат совпадает с
+    reorder_detectors(parse_detectors_status('0x' + raw.hex())).
+    """
+    # В hex-строке 2 символа на байт, берется первая четверть строки
+    count = len(raw) // 2
+    full_bytes = count // 2
+    part = bytes(raw[:full_bytes])
+    
+    # Пара (старший, младший) ниббл после перестановки идет как (младший, старший)
+    nibbles = bytearray(full_bytes * 2)
+    nibbles[0::2] = part.translate(LOW_NIBBLE_TABLE)
+    nibbles[1::2] = part.translate(HIGH_NIBBLE_TABLE)
+    if count % 2:
+        # Нечетное количество - последний остается на месте
+        nibbles.append(raw[full_bytes] >> 4)
+    return bytes(nibbles)
+
+def nibbles_to_chars(nibbles):
+    """Нибблы детекторов в список hex-символов (как reorder_detectors)"""
+    return list(nibbles.translate(NIBBLE_TO_CHAR_TABLE).decode('ascii'))
+
+def nibbles_to_binary_representation(nibbles):
+    """Нибблы в 4 строки бит (как convert_to_binary_representation)"""
+    if not nibbles:
+        return []
+    return [list(nibbles.translate(table).decode('ascii')) for table in NIBBLE_TO_BIT_TABLES]
+
+def decode_detectors_batch(raw_matrix):
+    """Пакетное декодирование на NumPy.
+    
+    raw_matrix - массив uint8 формы (выборки, длина OctetString).
+    Возвращает uint8 массив нибблов формы (выборки, детекторы).
+    """
+    import numpy as np
+    
+    raw = np.asarray(raw_matrix, dtype=np.uint8)
+    count = raw.shape[1] // 2
+    full_bytes = count // 2
+    part = raw[:, :full_bytes]
+    
+    nibbles = np.empty((raw.shape[0], count), dtype=np.uint8)
+    nibbles[:, 0:full_bytes * 2:2] = part & 0x0F
+    nibbles[:, 1:full_bytes * 2:2] = part >> 4
+    if count % 2:
+        nibbles[:, -1] = raw[:, full_bytes] >> 4
+    return nibbles
+
+def nibbles_to_planes(nibbles):
+    """Нибблы (выборки, детекторы) в биты (выборки, детекторы, 4)"""
+    import numpy as np
+    
+    shifts = np.arange(4, dtype=np.uint8)
+    return (np.asarray(nibbles, dtype=np.uint8)[..., None] >> shifts) & 1
+
+def get_emoji_status(status_char):
+    """Возвращает эмодзи в зависимости от статуса детектора"""
+    return "⚪" if status_char == '0' else "🟢"
+
+def get_emoji_from_binary(bit):
+    """Возвращает эмодзи в зависимости от бинарного значения"""
+    return "⚪" if bit == '0' else "🟢"
+
+def convert_to_binary_representation(detectors):
+    """Преобразует символы детекторов в бинарное представление (4 строки)"""
+    if not detectors:
+        return []
+    
+    binary_lines = []
+    
+    # Для каждого детектора получаем его бинарное представление
+    for detector_char in detectors:
+        char_lower = detector_char.lower()
+        binary_repr = CHAR_TO_BINARY.get(char_lower, '0000')
+        binary_lines.append(binary_repr)
+    
+    # Транспонируем: создаем 4 строки, каждая содержит соответствующий бит из каждого детектора
+    result_lines = []
+    for bit_position in range(4):
+        line_bits = [line[bit_position] for line in binary_lines]
+        result_lines.append(line_bits)
+    
+    return result_lines
+
+def print_light_output(reordered_detectors, num_detectors):
+    """Вывод в легком режиме"""
+    detector_outputs = []
+    for i, status in enumerate(reordered_detectors[:num_detectors], 1):
+        emoji = get_emoji_status(status)
+        detector_outputs.append(f"{emoji} {i}={status}")
+    return " ".join(detector_outputs)
+
+def print_full_output(reordered_detectors, num_detectors):
+    """Вывод в полном режиме (4 строки с бинарным представлением)"""
+    binary_lines = convert_to_binary_representation(reordered_detectors[:num_detectors])
+    
+    output_lines = []
+    for line_idx, line_bits in enumerate(binary_lines):
+        detector_outputs = []
+        for i, bit in enumerate(line_bits, 1):
+            emoji = get_emoji_from_binary(bit)
+            # Получаем оригинальный символ для отображения
+            original_char = reordered_detectors[i-1] if i-1 < len(reordered_detectors) else '0'
+            detector_outputs.append(f"{emoji} {i}={original_char}")
+        output_lines.append(" ".join(detector_outputs))
+    
+    return "\n".join(output_lines)
@@ -0,0 +1,92 @@
+import os
+from datetime import datetime
+from potok_dt_log import RotatingLogWriter
+
+# Загрузка констант из .env
+OUTPUT_MODE = os.getenv('OUTPUT_MODE', 'full').lower()  # 'full' - полное состояние, 'events' - только изменения, 'dashboard' - экран potok_dt_dashboard
+
+
+class EdgeDetector:
+    """Выделяет изменения битов детекторов между соседними выборками.
+
+    Состояние хранится одним целым числом (байт на детектор, биты 0-3 -
+    строки convert_to_binary_representation), изменения находятся XOR'ом,
+    поэтому стоимость пропорциональна числу изменившихся битов.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.previous = None
+        self.previous_count = 0
+
+    def update(self, timestamp, nibbles):
+        """Возвращает список событий (время, контроллер, детектор, бит, новое значение)"""
+        current = int.from_bytes(nibbles, 'little')
+        previous = self.previous
+        count = len(nibbles)
+        self.previous = current
+
+        # Первая выборка или смена числа детекторов - новая точка отсчета
+        if previous is None or count != self.previous_count:
+            self.previous_count = count
+            return []
+
+        changed = current ^ previous
+        events = []
+        while changed:
+            lowest = changed & -changed
+            position = lowest.bit_length() - 1
+            events.append((
+                timestamp,
+                self.controller,
+                position // 8 + 1,
+                position % 8,
+                (current >> position) & 1,
+            ))
+            changed ^= lowest
+        return events
+
+    def reset(self):
+        self.previous = None
+
+
+def https_statuses_to_bits(detectors):
+    """Статусы со страницы HTTPS в байты состояния: индекс = номер детектора - 1"""
+    numbered = []
+    for det in detectors:
+        try:
+            numbered.append((int(det['number']), 1 if det['status'] == '1' else 0))
+        except ValueError:
+            continue
+    if not numbered:
+        return b''
+    bits = bytearray(max(number for number, _ in numbered))
+    for number, value in numbered:
+        if number > 0:
+            bits[number - 1] = value
+    return bytes(bits)
+
+
+def format_event(event):
+    """Строка события для терминала и лога"""
+    timestamp, controller, detector, bit_plane, new_value = event
+    current_datetime = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    arrow = "⚪→🟢" if new_value else "🟢→⚪"
+    return f"[{current_datetime}] {controller} DT {detector} бит {bit_plane} {arrow} {new_value}"
+
+
+class EventLog:
+    """Дневной лог событий изменения детекторов"""
+
+    def __init__(self, log_dir, prefix="snmp_events", date_format="%Y-%m-%d"):
+        self.writer = RotatingLogWriter(
+            lambda current_date: os.path.join(log_dir, f"{prefix}_{current_date}.txt"),
+            date_format=date_format,
+        )
+
+    def write_events(self, events):
+        if events:
+            self.writer.write("".join(format_event(event) + "\n" for event in events))
+
+    def close(self):
+        self.writer.close()
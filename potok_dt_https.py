@@ -1,10 +1,25 @@
-import requests
-from bs4 import BeautifulSoup
-import urllib3
 from dotenv import load_dotenv
+import html
 import os
+import re
 import time
 from datetime import datetime
+from potok_dt_events import EdgeDetector, EventLog, format_event, https_statuses_to_bits
+from potok_dt_log import RotatingLogWriter
+from potok_dt_metrics import STAGE_HTML_PARSE, STAGE_LOG_WRITE, start_metrics_server, stage_histogram
+from potok_dt_push import hub, start_push_server_thread
+from potok_dt_schedule import FixedRateScheduler
+from potok_dt_stats import DetectorStats, StatsLog, parse_ints
+
+# Заголовки как в браузере
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+# Признак того, что быстрый разбор не подходит для разметки страницы
+LAYOUT_MISMATCH = object()
 
 def parse_cookies_from_browser(cookie_string):
     """Парсим куки из строки браузера"""
@@ -29,55 +44,254 @@ def parse_cookies_from_browser(cookie_string):
     
     return cookies
 
-def get_detectors_status(ip, session):
+# Быстрый разбор страницы /detectors/status регулярными выражениями
+# Атрибуты в кавычках могут содержать '>': открывающий tbody ищется по всей
+# странице, поэтому его шаблон пропускает значения в кавычках целиком
+TBODY_OPEN_RE = re.compile(r'''<tbody\b((?:[^>"']|"[^"]*"|'[^']*')*)>''', re.I)
+TBODY_CLOSE_RE = re.compile(r'</tbody\s*>', re.I)
+ROW_RE = re.compile(r'<tr\b[^>]*>(.*?)</tr\s*>', re.I | re.S)
+CELL_RE = re.compile(r'<td\b[^>]*>(.*?)</td\s*>', re.I | re.S)
+SPAN_RE = re.compile(r'<span\b([^>]*)>(.*?)</span\s*>', re.I | re.S)
+SELECT_RE = re.compile(r'<select\b([^>]*)>(.*?)</select\s*>', re.I | re.S)
+OPTION_RE = re.compile(r'<option\b([^>]*)>(.*?)</option\s*>', re.I | re.S)
+ATTR_RE = re.compile(r'''([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+TAG_RE = re.compile(r'<[^>]*>')
+# Разметка, которую быстрый разбор не повторяет в точности как html.parser
+UNSUPPORTED_RE = re.compile(r'<(?:tbody|table|script|style|!--)', re.I)
+# Тег с '>' внутри значения в кавычках: [^>]* в шаблонах строк и ячеек
+# оборвал бы такой тег раньше, чем html.parser
+QUOTED_GT_RE = re.compile(r'''<[^>]*?=\s*(?:"[^"]*>|'[^']*>)''')
+
+def parse_attrs(attr_text):
+    """Атрибуты тега в словарь (имена в нижнем регистре, как у html.parser)"""
+    attrs = {}
+    for name, double_quoted, single_quoted, bare in ATTR_RE.findall(attr_text):
+        attrs[name.lower()] = html.unescape(double_quoted or single_quoted or bare)
+    return attrs
+
+def get_text_strip(fragment):
+    """Аналог get_text(strip=True): текстовые узлы без тегов, обрезанные и склеенные"""
+    parts = (html.unescape(part).strip() for part in TAG_RE.split(fragment))
+    return "".join(part for part in parts if part)
+
+def count_tags(fragment, tag):
+    """Количество открывающих и закрывающих тегов"""
+    opened = len(re.findall(rf'<{tag}\b', fragment, re.I))
+    closed = len(re.findall(rf'</{tag}\s*>', fragment, re.I))
+    return opened, closed
+
+def parse_detectors_fast(html_text):
+    """Разбирает только tbody#table_detectors без построения дерева.
+    
+    Возвращает тот же список, что и parse_detectors_bs4, или
+    LAYOUT_MISMATCH, если разметка отличается от ожидаемой.
+    """
+    for match in TBODY_OPEN_RE.finditer(html_text):
+        if parse_attrs(match.group(1)).get('id') == 'table_detectors':
+            break
+    else:
+        return LAYOUT_MISMATCH
+    
+    close = TBODY_CLOSE_RE.search(html_text, match.end())
+    if not close:
+        return LAYOUT_MISMATCH
+    region = html_text[match.end():close.start()]
+    
+    rows_opened, rows_closed = count_tags(region, 'tr')
+    if UNSUPPORTED_RE.search(region) or QUOTED_GT_RE.search(region) or rows_opened != rows_closed:
+        return LAYOUT_MISMATCH
+    
+    detectors = []
+    rows = ROW_RE.findall(region)
+    if len(rows) != rows_opened:
+        return LAYOUT_MISMATCH
+    
+    for row in rows:
+        cells_opened, cells_closed = count_tags(row, 'td')
+        if '<tr' in row.lower() or cells_opened != cells_closed:
+            return LAYOUT_MISMATCH
+        cells = CELL_RE.findall(row)
+        if len(cells) != cells_opened or any('<td' in cell.lower() for cell in cells):
+            return LAYOUT_MISMATCH
+        if len(cells) < 5:
+            continue
+        
+        # Статус
+        status = "N/A"
+        status_class = []
+        if count_tags(cells[3], 'span') != (len(SPAN_RE.findall(cells[3])),) * 2:
+            return LAYOUT_MISMATCH
+        for span_attrs, span_body in SPAN_RE.findall(cells[3]):
+            if '<span' in span_body.lower():
+                return LAYOUT_MISMATCH
+            attrs = parse_attrs(span_attrs)
+            if attrs.get('id') == 'det_status':
+                status = get_text_strip(span_body)
+                status_class = attrs['class'].split() if 'class' in attrs else []
+                break
+        
+        # Режим установки
+        state_text = "N/A"
+        for select_attrs, select_body in SELECT_RE.findall(cells[4]):
+            if parse_attrs(select_attrs).get('name') != 'state[]':
+                continue
+            options = OPTION_RE.findall(select_body)
+            if count_tags(select_body, 'option') != (len(options),) * 2:
+                return LAYOUT_MISMATCH
+            for option_attrs, option_body in options:
+                if 'selected' in parse_attrs(option_attrs):
+                    state_text = get_text_strip(option_body)
+                    break
+            break
+        
+        detectors.append({
+            'number': get_text_strip(cells[0]),
+            'input': get_text_strip(cells[1]),
+            'type': get_text_strip(cells[2]),
+            'status': status,
+            'status_class': status_class,
+            'state': state_text
+        })
+    
+    return detectors
+
+def parse_detectors_bs4(html_text):
+    """Разбор страницы через BeautifulSoup (эталон и запасной вариант)"""
+    # bs4 загружается только при первом откате на этот разбор
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html_text, 'html.parser')
+    
+    # Находим таблицу с детекторами
+    detectors_table = soup.find('tbody', {'id': 'table_detectors'})
+    if not detectors_table:
+        return None
+    
+    detectors = []
+    rows = detectors_table.find_all('tr')
+    
+    for row in rows:
+        # Извлекаем данные из строки таблицы
+        cells = row.find_all('td')
+        if len(cells) >= 5:
+            # Номер детектора
+            det_number = cells[0].get_text(strip=True)
+            # Номер входа
+            input_number = cells[1].get_text(strip=True)
+            # Тип детектора
+            det_type = cells[2].get_text(strip=True)
+            # Статус
+            status_span = cells[3].find('span', {'id': 'det_status'})
+            status = status_span.get_text(strip=True) if status_span else "N/A"
+            # Класс статуса (определяет цвет)
+            status_class = status_span.get('class', []) if status_span else []
+            
+            # Режим установки
+            state_select = cells[4].find('select', {'name': 'state[]'})
+            state_text = "N/A"
+            if state_select:
+                selected_option = state_select.find('option', selected=True)
+                if selected_option:
+                    state_text = selected_option.get_text(strip=True)
+            
+            detectors.append({
+                'number': det_number,
+                'input': input_number,
+                'type': det_type,
+                'status': status,
+                'status_class': status_class,
+                'state': state_text
+            })
+    
+    return detectors
+
+def parse_detectors_page(html_text, html_parser='fast'):
+    """Разбор страницы: быстрый, с откатом на BeautifulSoup при другой разметке"""
+    if html_parser == 'fast':
+        detectors = parse_detectors_fast(html_text)
+        if detectors is not LAYOUT_MISMATCH:
+            return detectors
+    return parse_detectors_bs4(html_text)
+
+def page_fingerprint(html_text):
+    """Отпечаток области table_detectors: (длина, хэш) или None, если области нет"""
+    start = html_text.find('table_detectors')
+    if start < 0:
+        return None
+    end = html_text.find('</tbody', start)
+    region = html_text[start:end] if end >= 0 else html_text[start:]
+    return len(region), hash(region)
+
+class DetectorsPageCache:
+    """Результат последнего разбора страницы, повторно используется при том же отпечатке"""
+    
+    def __init__(self):
+        self.fingerprint = None
+        self.detectors = None
+        self.log_body = None
+        self.terminal_lines = None
+        # Счетчики: пропущенные (hits) и выполненные (misses) разборы
+        self.hits = 0
+        self.misses = 0
+    
+    def lookup(self, html_text):
+        """Возвращает (отпечаток, детекторы из кэша или None)"""
+        fingerprint = page_fingerprint(html_text)
+        if fingerprint is not None and fingerprint == self.fingerprint:
+            self.hits += 1
+            return fingerprint, self.detectors
+        self.misses += 1
+        return fingerprint, None
+    
+    def store(self, fingerprint, detectors):
+        self.fingerprint = fingerprint if detectors else None
+        self.detectors = detectors
+        self.log_body = None
+        self.terminal_lines = None
+    
+    def parse(self, html_text, html_parser='fast'):
+        """Разбор страницы с пропуском, если область таблицы не изменилась"""
+        fingerprint, detectors = self.lookup(html_text)
+        if detectors is None:
+            detectors = parse_detectors_page(html_text, html_parser)
+            self.store(fingerprint, detectors)
+        return detectors
+    
+    def format_for_log(self, detectors):
+        """format_detectors_for_log с кэшем для неизменившегося списка"""
+        if detectors is not self.detectors:
+            return format_detectors_for_log(detectors)
+        if self.log_body is None:
+            self.log_body = format_detectors_for_log(detectors)
+        return self.log_body
+    
+    def format_for_terminal(self, detectors):
+        """format_detectors_for_terminal с кэшем для неизменившегося списка"""
+        if detectors is not self.detectors:
+            return format_detectors_for_terminal(detectors)
+        if self.terminal_lines is None:
+            self.terminal_lines = format_detectors_for_terminal(detectors)
+        return self.terminal_lines
+    
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total * 100 if total else 0.0
+
+def get_detectors_status(ip, session, html_parser=None, cache=None):
     """Получаем статус детекторов"""
+    if html_parser is None:
+        # 'fast' - быстрый разбор, 'bs4' - только BeautifulSoup
+        html_parser = os.getenv('HTML_PARSER', 'fast').lower()
     try:
         response = session.get(f"https://{ip}/detectors/status", verify=False, timeout=5)
         
         if response.status_code == 200 and "Авторизация" not in response.text:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Находим таблицу с детекторами
-            detectors_table = soup.find('tbody', {'id': 'table_detectors'})
-            if not detectors_table:
-                return None
-            
-            detectors = []
-            rows = detectors_table.find_all('tr')
-            
-            for row in rows:
-                # Извлекаем данные из строки таблицы
-                cells = row.find_all('td')
-                if len(cells) >= 5:
-                    # Номер детектора
-                    det_number = cells[0].get_text(strip=True)
-                    # Номер входа
-                    input_number = cells[1].get_text(strip=True)
-                    # Тип детектора
-                    det_type = cells[2].get_text(strip=True)
-                    # Статус
-                    status_span = cells[3].find('span', {'id': 'det_status'})
-                    status = status_span.get_text(strip=True) if status_span else "N/A"
-                    # Класс статуса (определяет цвет)
-                    status_class = status_span.get('class', []) if status_span else []
-                    
-                    # Режим установки
-                    state_select = cells[4].find('select', {'name': 'state[]'})
-                    state_text = "N/A"
-                    if state_select:
-                        selected_option = state_select.find('option', selected=True)
-                        if selected_option:
-                            state_text = selected_option.get_text(strip=True)
-                    
-                    detectors.append({
-                        'number': det_number,
-                        'input': input_number,
-                        'type': det_type,
-                        'status': status,
-                        'status_class': status_class,
-                        'state': state_text
-                    })
-            
+            started = time.perf_counter()
+            if cache is not None:
+                detectors = cache.parse(response.text, html_parser)
+            else:
+                detectors = parse_detectors_page(response.text, html_parser)
+            stage_histogram(STAGE_HTML_PARSE, ip).observe(time.perf_counter() - started)
             return detectors
         else:
             return None
@@ -86,21 +300,23 @@ def get_detectors_status(ip, session):
         print(f"Ошибка получения статуса: {e}")
         return None
 
+# Буферизованный лог-файл, создается при первой записи
+_log_writer = None
+
 def write_to_log(message):
     """Запись сообщения в лог-файл"""
+    global _log_writer
     log_entry = f"{message}\n"
     
-    # Создаем папку для логов если ее нет
-    log_dir = "logs_https"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-    # Имя файла с датой
-    log_filename = f"{log_dir}/detectors_log_{datetime.now().strftime('%Y%m%d')}.txt"
+    if _log_writer is None:
+        # Имя файла с датой, папка logs_https создается при первой записи на диск
+        _log_writer = RotatingLogWriter(
+            lambda current_date: f"logs_https/detectors_log_{current_date}.txt",
+            date_format="%Y%m%d",
+        )
     
-    # Записываем в файл
-    with open(log_filename, "a", encoding="utf-8") as log_file:
-        log_file.write(log_entry)
+    # Запись на диск идет в фоновом потоке
+    _log_writer.write(log_entry)
 
 def format_detectors_for_log(detectors):
     """Форматируем данные детекторов для лога в формате DT X = EMOJI STATUS"""
@@ -124,13 +340,57 @@ def format_detectors_for_log(detectors):
     
     return " , ".join(log_entries)
 
-def monitor_detectors(ip):
-    """Мониторинг детекторов - следующий запрос сразу после получения ответа"""
+def format_detectors_for_terminal(detectors):
+    """Строки детекторов для терминала в старом формате"""
+    lines = []
+    for det in detectors:
+        # Определяем эмодзи статуса
+        if det['status'] == '1':
+            status_emoji = "🟢"
+        elif det['status'] == '0':
+            status_emoji = "⚪"
+        else:
+            status_emoji = "❓"
+        
+        lines.append(f"Детектор {det['number']:>3} | Вход {det['input']:>2} | Статус: {status_emoji} {det['status']}")
+    return "\n".join(lines)
+
+def monitor_detectors(ip, interval=0.0):
+    """Мониторинг детекторов с периодом interval (0 - следующий запрос сразу после ответа)"""
+    import requests
+    import urllib3
     
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
     session = requests.Session()
     
+    # Дополнительный бинарный лог выборок (BINARY_LOG=true в .env)
+    binary_log = None
+    if os.getenv('BINARY_LOG', 'false').lower() == 'true':
+        from potok_dt_binlog import KIND_HTTPS, BinarySampleLog, encode_https_statuses
+        binary_log = BinarySampleLog("logs_https", ip, KIND_HTTPS, prefix="detectors_samples")
+    
+    # Режим событий (OUTPUT_MODE=events): выводятся и пишутся только изменения статусов
+    edges = None
+    events_log = None
+    if os.getenv('OUTPUT_MODE', 'full').lower() == 'events':
+        edges = EdgeDetector(ip)
+        events_log = EventLog("logs_https", prefix="detectors_events", date_format="%Y%m%d")
+    
+    # Агрегаты по окнам (STATS=true в .env): занятость, срабатывания, интервалы;
+    # у HTTPS статуса только бит 0
+    stats = None
+    stats_log = None
+    if os.getenv('STATS', 'false').lower() == 'true':
+        stats = DetectorStats(ip, windows=parse_ints(os.getenv('STATS_WINDOWS', '60,900,3600')), planes=(0,))
+        stats_log = StatsLog("logs_https", prefix="detectors_stats", date_format="%Y%m%d")
+    
+    # Дневная матрица время × детектор × бит (MATRIX_EXPORT=true в .env)
+    matrix = None
+    if os.getenv('MATRIX_EXPORT', 'false').lower() == 'true':
+        from potok_dt_matrix import DayMatrixWriter
+        matrix = DayMatrixWriter("logs_https", prefix="detectors_matrix")
+    
     # Получаем куки из .env файла
     browser_cookies = os.getenv('BROWSER_COOKIES')
     if not browser_cookies:
@@ -144,26 +404,30 @@ def monitor_detectors(ip):
         session.cookies.set(name, value)
     
     # Заголовки как в браузере
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-    })
+    session.headers.update(BROWSER_HEADERS)
     
     print("🚦 МОНИТОРИНГ ДЕТЕКТОРОВ (непрерывный режим)")
     print("=" * 60)
+    start_metrics_server()
+    # Поток изменений для других программ (PUSH_PORT в .env), сервер в фоновом потоке
+    start_push_server_thread()
+    log_metric = stage_histogram(STAGE_LOG_WRITE, ip)
     
     iteration = 0
+    # Повторный разбор пропускается, если таблица на странице не изменилась
+    page_cache = DetectorsPageCache()
+    scheduler = FixedRateScheduler(interval)
     
     try:
         while True:
+            missed = scheduler.wait_sync()
             iteration += 1
             
             # Фиксируем время начала запроса
             request_time = datetime.now()
             request_timestamp = request_time.strftime("%H:%M:%S.%f")[:-3]
             
-            detectors = get_detectors_status(ip, session)
+            detectors = get_detectors_status(ip, session, cache=page_cache)
             
             # Фиксируем время получения ответа
             response_time = datetime.now()
@@ -172,27 +436,44 @@ def monitor_detectors(ip):
             # Вычисляем время выполнения запроса в миллисекундах
             request_duration_ms = (response_time - request_time).total_seconds() * 1000
             
-            if detectors:
+            if detectors and (stats is not None or matrix is not None or hub.active):
+                bits = https_statuses_to_bits(detectors)
+                if hub.active:
+                    hub.publish(ip, response_time.timestamp(), bits)
+                if matrix is not None and bits:
+                    matrix.write(response_time.timestamp(), bits)
+                if stats is not None:
+                    stats_log.write_records(stats.update(response_time.timestamp(), bits))
+            
+            if detectors and edges is not None:
+                events = edges.update(response_time.timestamp(), https_statuses_to_bits(detectors))
+                for event in events:
+                    print(format_event(event))
+                started = time.perf_counter()
+                events_log.write_events(events)
+                if binary_log is not None:
+                    binary_log.write(response_time.timestamp(), encode_https_statuses(detectors))
+                log_metric.observe(time.perf_counter() - started)
+                
+            elif detectors:
                 print(f"\n[{request_timestamp}] Запрос #{iteration}")
                 print(f"[{response_timestamp}] Ответ #{iteration} - Время: {request_duration_ms:.0f} мс")
                 print(f"Найдено детекторов: {len(detectors)}")
+                if interval > 0:
+                    print(f"Опоздание такта: {scheduler.last_lateness * 1000:.1f} мс, пропущено тактов: {missed}")
                 print("-" * 60)
                 
                 # Выводим детекторы в терминал в старом формате
-                for det in detectors:
-                    # Определяем эмодзи статуса
-                    if det['status'] == '1':
-                        status_emoji = "🟢"
-                    elif det['status'] == '0':
-                        status_emoji = "⚪"
-                    else:
-                        status_emoji = "❓"
-                    
-                    print(f"Детектор {det['number']:>3} | Вход {det['input']:>2} | Статус: {status_emoji} {det['status']}")
+                print(page_cache.format_for_terminal(detectors))
+                print(f"Пропущено разборов (страница не изменилась): {page_cache.hits} ({page_cache.hit_rate():.0f}%)")
                 
                 # Форматируем для лога в новом формате
-                log_message = f"Запрос: {request_timestamp}, Ответ: {response_timestamp}, Время: {request_duration_ms:.0f} мс - {format_detectors_for_log(detectors)}"
+                started = time.perf_counter()
+                log_message = f"Запрос: {request_timestamp}, Ответ: {response_timestamp}, Время: {request_duration_ms:.0f} мс - {page_cache.format_for_log(detectors)}"
                 write_to_log(log_message)
+                if binary_log is not None:
+                    binary_log.write(response_time.timestamp(), encode_https_statuses(detectors))
+                log_metric.observe(time.perf_counter() - started)
                 
             else:
                 print(f"\n[{request_timestamp}] Запрос #{iteration}")
@@ -201,12 +482,11 @@ def monitor_detectors(ip):
                 log_message = f"Запрос: {request_timestamp}, Ответ: {response_timestamp}, Время: {request_duration_ms:.0f} мс - ❌ Не удалось получить данные детекторов"
                 write_to_log(log_message)
             
-            # Следующий запрос отправляется сразу после получения ответа
-            # Нет задержки между запросами
-            
     except KeyboardInterrupt:
         print("\n⏹️ Мониторинг остановлен")
         write_to_log("⏹️ Мониторинг остановлен")
+        if interval > 0:
+            print(scheduler.format_stats())
 
 if __name__ == "__main__":
     load_dotenv()
@@ -217,4 +497,4 @@ if __name__ == "__main__":
         exit(1)
     
     print("🔍 Запуск мониторинга детекторов (непрерывный режим)...")
-    monitor_detectors(ip)
+    monitor_detectors(ip, float(os.getenv('HTTPS_POLL_INTERVAL', '0')))
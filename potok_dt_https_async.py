@@ -0,0 +1,219 @@
+import asyncio
+import ipaddress
+import math
+import os
+import ssl
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import aiohttp
+from dotenv import load_dotenv
+from potok_dt_https import (
+    BROWSER_HEADERS,
+    DetectorsPageCache,
+    parse_cookies_from_browser,
+    parse_detectors_page,
+)
+from potok_dt_log import RotatingLogWriter
+from potok_dt_events import https_statuses_to_bits
+from potok_dt_metrics import STAGE_HTML_PARSE, STAGE_LOG_WRITE, start_metrics_server, stage_histogram
+from potok_dt_push import hub, start_push_server
+from potok_dt_schedule import FixedRateScheduler
+
+LOG_DIR = "logs_https"
+
+
+class HttpsSettings:
+    """Настройки монитора из окружения.
+
+    Читаются при создании объекта, то есть в main() уже после load_dotenv(),
+    а не при импорте модуля.
+    """
+
+    def __init__(self):
+        self.controllers_file = os.getenv('HTTPS_CONTROLLERS_FILE', 'controllers_https.txt')
+        self.poll_interval = float(os.getenv('HTTPS_POLL_INTERVAL', '0'))  # 0 - следующий запрос сразу после ответа
+        self.concurrency = int(os.getenv('HTTPS_CONCURRENCY', '100'))  # Всего соединений
+        self.per_host = int(os.getenv('HTTPS_PER_HOST', '1'))  # Соединений на контроллер
+        self.timeout = float(os.getenv('HTTPS_TIMEOUT', '5'))
+        self.parse_workers = int(os.getenv('HTTPS_PARSE_WORKERS', str(os.cpu_count() or 1)))
+        self.echo = os.getenv('HTTPS_ECHO', 'false').lower() == 'true'
+        self.html_parser = os.getenv('HTML_PARSER', 'fast').lower()
+
+
+def load_https_controllers(path, default_interval=0.0):
+    """Читает список контроллеров: ip[:порт][,интервал_опроса_с] по строке.
+
+    Пустые строки и строки с # пропускаются, ошибочные - пропускаются
+    с сообщением, чтобы одна строка не мешала опросу остальных.
+    Интервал 0 допустим: следующий запрос сразу после ответа.
+    """
+    controllers = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+
+            parts = [part.strip() for part in line.split(',')]
+            address = parts[0]
+            try:
+                ip, _, port = address.partition(':')
+                ipaddress.IPv4Address(ip)
+                if port and not 0 < int(port) < 65536:
+                    raise ValueError(f"неверный порт: {port}")
+                interval = float(parts[1]) if len(parts) > 1 and parts[1] else default_interval
+                if not 0 <= interval < math.inf:
+                    raise ValueError(f"период опроса должен быть не меньше 0: {interval}")
+            except ValueError as e:
+                print(f"⚠️ {path}:{number}: строка пропущена ({e})")
+                continue
+            controllers.append((address, interval))
+
+    return controllers
+
+
+def make_ssl_context():
+    """Общий TLS контекст без проверки сертификата (как verify=False)"""
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def make_session(cookies, settings=None):
+    """Одна сессия на все контроллеры: общий пул keep-alive соединений"""
+    if settings is None:
+        settings = HttpsSettings()
+    connector = aiohttp.TCPConnector(
+        ssl=make_ssl_context(),
+        limit=settings.concurrency,
+        limit_per_host=settings.per_host,
+        keepalive_timeout=60,
+        ttl_dns_cache=300,
+    )
+    # unsafe=True - куки принимаются и для хостов, заданных IP адресом
+    return aiohttp.ClientSession(
+        connector=connector,
+        cookie_jar=aiohttp.CookieJar(unsafe=True),
+        cookies=cookies,
+        headers=BROWSER_HEADERS,
+        timeout=aiohttp.ClientTimeout(total=settings.timeout),
+    )
+
+
+async def fetch_status_page(session, ip, echo=False):
+    """Текст страницы /detectors/status или None"""
+    try:
+        async with session.get(f"https://{ip}/detectors/status") as response:
+            text = await response.text()
+            if response.status == 200 and "Авторизация" not in text:
+                return text
+    except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError, LookupError) as e:
+        # LookupError/UnicodeDecodeError - неизвестная или неверная кодировка ответа
+        if echo:
+            print(f"[{ip}] Ошибка получения статуса: {e}")
+    return None
+
+
+# Кэши разбора по контроллерам (счетчики пропущенных разборов)
+page_caches = {}
+
+
+def parse_skip_stats():
+    """Суммарно: пропущено разборов, выполнено разборов"""
+    hits = sum(cache.hits for cache in page_caches.values())
+    misses = sum(cache.misses for cache in page_caches.values())
+    return hits, misses
+
+
+async def monitor_controller(session, pool, ip, interval, settings):
+    """Опрос одного контроллера; разбор HTML выполняется в пуле процессов"""
+    loop = asyncio.get_running_loop()
+    log_dir = os.path.join(LOG_DIR, ip.replace(':', '_'))
+    log = RotatingLogWriter(
+        lambda current_date: os.path.join(log_dir, f"detectors_log_{current_date}.txt"),
+        date_format="%Y%m%d",
+    )
+    page_cache = DetectorsPageCache()
+    page_caches[ip] = page_cache
+    parse_metric = stage_histogram(STAGE_HTML_PARSE, ip)
+    log_metric = stage_histogram(STAGE_LOG_WRITE, ip)
+    echo = settings.echo
+    # Интервал 0 - следующий запрос сразу после ответа
+    scheduler = FixedRateScheduler(interval)
+
+    while True:
+        await scheduler.wait()
+        request_time = datetime.now()
+        text = await fetch_status_page(session, ip, echo)
+        response_time = datetime.now()
+
+        detectors = None
+        if text is not None:
+            # Если область таблицы не изменилась, разбор в пуле не нужен
+            started = time.perf_counter()
+            fingerprint, detectors = page_cache.lookup(text)
+            if detectors is None:
+                try:
+                    detectors = await loop.run_in_executor(pool, parse_detectors_page, text, settings.html_parser)
+                    page_cache.store(fingerprint, detectors)
+                except Exception as e:
+                    # Ошибка разбора (в т.ч. BrokenProcessPool) - выборка без данных,
+                    # опрос этого и остальных контроллеров продолжается
+                    if echo:
+                        print(f"[{ip}] Ошибка разбора страницы: {e}")
+                    detectors = None
+            # Для пула процессов сюда входит и ожидание свободного процесса
+            parse_metric.observe(time.perf_counter() - started)
+
+        request_timestamp = request_time.strftime("%H:%M:%S.%f")[:-3]
+        response_timestamp = response_time.strftime("%H:%M:%S.%f")[:-3]
+        request_duration_ms = (response_time - request_time).total_seconds() * 1000
+
+        if detectors and hub.active:
+            hub.publish(ip, response_time.timestamp(), https_statuses_to_bits(detectors))
+
+        started = time.perf_counter()
+        if detectors:
+            body = page_cache.format_for_log(detectors)
+        else:
+            body = "❌ Не удалось получить данные детекторов"
+        log_message = f"Запрос: {request_timestamp}, Ответ: {response_timestamp}, Время: {request_duration_ms:.0f} мс - {body}"
+        log.write(log_message + "\n")
+        log_metric.observe(time.perf_counter() - started)
+        if echo:
+            print(f"[{ip}] {log_message}")
+
+
+async def main():
+    load_dotenv()
+    browser_cookies = os.getenv('BROWSER_COOKIES')
+    if not browser_cookies:
+        print("❌ BROWSER_COOKIES не найдены в .env файле")
+        return
+
+    settings = HttpsSettings()
+    controllers = load_https_controllers(settings.controllers_file, settings.poll_interval)
+    print("🚦 МОНИТОРИНГ ДЕТЕКТОРОВ (asyncio, HTTPS)")
+    print(f"Контроллеров: {len(controllers)}, соединений: {settings.concurrency}, "
+          f"процессов разбора: {settings.parse_workers}")
+    print("=" * 60)
+    # Порты метрик и потока изменений тоже читаются из окружения при запуске
+    start_metrics_server()
+    await start_push_server()
+
+    with ProcessPoolExecutor(max_workers=settings.parse_workers) as pool:
+        async with make_session(parse_cookies_from_browser(browser_cookies), settings) as session:
+            await asyncio.gather(*(
+                monitor_controller(session, pool, ip, interval, settings) for ip, interval in controllers
+            ))
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        hits, misses = parse_skip_stats()
+        print(f"\nПропущено разборов: {hits} из {hits + misses}")
+        print("⏹️ Мониторинг остановлен")
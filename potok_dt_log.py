@@ -0,0 +1,219 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Загрузка констант из .env
+LOG_FLUSH_BYTES = int(os.getenv('LOG_FLUSH_BYTES', '65536'))  # Сброс буфера по размеру
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '1.0'))  # И не реже чем раз в N секунд
+LOG_RETRY_BYTES = int(os.getenv('LOG_RETRY_BYTES', str(16 * 1024 * 1024)))  # Сколько держать в буфере при ошибках записи
+
+
+def next_midnight(timestamp):
+    """Время (как time.time()) ближайшей следующей локальной полуночи"""
+    day = datetime.fromtimestamp(timestamp).date() + timedelta(days=1)
+    return datetime(day.year, day.month, day.day).timestamp()
+
+
+def read_file_header(path, size):
+    """Первые size байт существующего файла; None, если файла нет или он пуст"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(size)
+    except FileNotFoundError:
+        return None
+    return header or None
+
+
+class RotatingLogWriter:
+    """Буферизованный дневной лог-файл.
+
+    write() только складывает строку в буфер; на диск пишет общий фоновый
+    поток (по размеру буфера, по таймеру или при завершении), файл держится
+    открытым. Смена файла в полночь - по заранее посчитанной границе.
+    Если запись не удалась, недописанные данные остаются в буфере и
+    пишутся при следующем сбросе; сверх LOG_RETRY_BYTES старые данные
+    отбрасываются с сообщением о потерянном объеме.
+    """
+
+    def __init__(self, path_for_date, header_for_date=None, date_format="%Y-%m-%d",
+                 flush_bytes=LOG_FLUSH_BYTES, binary=False):
+        self.path_for_date = path_for_date
+        self.header_for_date = header_for_date
+        self.date_format = date_format
+        self.flush_bytes = flush_bytes
+        self.binary = binary
+        self.current_date = None
+        self._target = None
+        self._rotate_at = 0.0
+        self._pending = []
+        self._pending_bytes = 0
+        self._buffer_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._file = None
+        self._file_path = None
+        # Последний сброс не удался: повтор по таймеру, а не на каждой записи
+        self._failed = False
+        self.lost_bytes = 0
+        _flusher.register(self)
+
+    def _rotate(self, now):
+        """Переключает буфер на файл новой даты"""
+        self.current_date = datetime.fromtimestamp(now).strftime(self.date_format)
+        self._target = (self.path_for_date(self.current_date), self.current_date)
+        self._rotate_at = next_midnight(now)
+
+    def write(self, data, now=None):
+        """Добавляет данные в буфер без обращения к диску.
+
+        now - время для выбора дневного файла (по умолчанию текущее); с общим
+        now несколько писателей меняют файлы на одной и той же записи.
+        """
+        if now is None:
+            now = time.time()
+        if now >= self._rotate_at:
+            self._rotate(now)
+
+        with self._buffer_lock:
+            self._pending.append((self._target, data))
+            self._pending_bytes += len(data)
+            full = self._pending_bytes >= self.flush_bytes and not self._failed
+        if full:
+            _flusher.wake()
+
+    def flush(self):
+        """Пишет накопленный буфер на диск (вызывается из фонового потока)"""
+        with self._io_lock:
+            with self._buffer_lock:
+                pending, self._pending = self._pending, []
+                self._pending_bytes = 0
+            if not pending:
+                return
+
+            target = pending[0][0]
+            chunk = []
+            # Начало еще не записанной части pending
+            start = 0
+            try:
+                for index, (item_target, data) in enumerate(pending):
+                    if item_target != target:
+                        self._write_chunk(target, chunk)
+                        target, chunk, start = item_target, [], index
+                    chunk.append(data)
+                self._write_chunk(target, chunk)
+            except OSError as e:
+                self._close_file()
+                self._requeue(pending[start:], target, e)
+                return
+            self._failed = False
+
+    def _requeue(self, unwritten, target, error):
+        """Возвращает недописанное в начало буфера (вызывается под _io_lock)"""
+        with self._buffer_lock:
+            pending = unwritten + self._pending
+            pending_bytes = sum(len(data) for _, data in pending)
+            lost = 0
+            drop = 0
+            while pending_bytes > LOG_RETRY_BYTES and drop < len(pending):
+                size = len(pending[drop][1])
+                pending_bytes -= size
+                lost += size
+                drop += 1
+            self._pending = pending[drop:]
+            self._pending_bytes = pending_bytes
+            self._failed = True
+            self.lost_bytes += lost
+
+        message = f"Ошибка записи в лог {target[0]}: {error}, в буфере {pending_bytes} байт"
+        if lost:
+            message += f", потеряно {lost} байт"
+        print(message)
+
+    def _write_chunk(self, target, chunk):
+        path, current_date = target
+        if path != self._file_path:
+            self._open(path, current_date)
+        self._file.write((b'' if self.binary else '').join(chunk))
+        self._file.flush()
+
+    def _open(self, path, current_date):
+        self._close_file()
+        log_dir = os.path.dirname(path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if self.binary:
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'a', encoding='utf-8')
+        self._file_path = path
+
+        # Заголовок пишется только при создании файла
+        if is_new and self.header_for_date:
+            self._file.write(self.header_for_date(current_date))
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+        self._file = None
+        self._file_path = None
+
+    def close(self):
+        """Сбрасывает буфер и закрывает файл"""
+        self.flush()
+        with self._io_lock:
+            self._close_file()
+        _flusher.unregister(self)
+
+
+class _LogFlusher:
+    """Общий фоновый поток записи логов"""
+
+    def __init__(self):
+        self.writers = []
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+
+    def register(self, writer):
+        with self.lock:
+            self.writers.append(writer)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="log-flusher", daemon=True)
+                self.thread.start()
+
+    def unregister(self, writer):
+        with self.lock:
+            if writer in self.writers:
+                self.writers.remove(writer)
+
+    def wake(self):
+        self.event.set()
+
+    def flush_all(self):
+        with self.lock:
+            writers = list(self.writers)
+        for writer in writers:
+            writer.flush()
+
+    def run(self):
+        while True:
+            self.event.wait(LOG_FLUSH_INTERVAL)
+            self.event.clear()
+            self.flush_all()
+
+
+_flusher = _LogFlusher()
+
+
+def flush_logs():
+    """Принудительно сбрасывает все буферы логов на диск"""
+    _flusher.flush_all()
+
+
+atexit.register(flush_logs)
@@ -0,0 +1,184 @@
+import argparse
+import mmap
+import os
+import re
+import time
+from datetime import datetime
+from potok_dt_binlog import HTTPS_DATE_RE
+from potok_dt_detectors import decode_detectors_bytes
+
+# Строки snmp_log_* : [YYYY-MM-DD HH:MM:SS.mmm] ...
+SNMP_TIME_RE = re.compile(rb"^\[(\d{4}-\d\d-\d\d \d\d):(\d\d):(\d\d)\.(\d{3})\]", re.M)
+SNMP_RAW_RE = re.compile(rb"^\[(\d{4}-\d\d-\d\d \d\d):(\d\d):(\d\d)\.(\d{3})\] Raw data: '0x([0-9a-fA-F]*)'", re.M)
+
+# Строки detectors_log_* : Запрос: HH:MM:SS.mmm, Ответ: HH:MM:SS.mmm, Время: N мс - DT 1 = 🟢 1, ...
+# Время выборки - время ответа, и для поиска начала интервала, и для фильтра
+HTTPS_TIME_RE = re.compile(r"^Запрос: [\d:.]+, Ответ: (\d\d):(\d\d):(\d\d)\.(\d{3})".encode(), re.M)
+HTTPS_SAMPLE_RE = re.compile(
+    r"^Запрос: [\d:.]+, Ответ: (\d\d):(\d\d):(\d\d)\.(\d{3}), Время: \d+ мс - ([^\n]*)".encode(), re.M
+)
+HTTPS_DETECTOR_BYTES_RE = re.compile(rb"DT (\d+) = \S+ (\S+)")
+
+
+class LogReader:
+    """Чтение текстовых логов snmp_log_* / detectors_log_* через mmap.
+
+    Файл не читается в память целиком: регулярные выражения работают прямо
+    по отображению, выборки отдаются генератором. Время в логе идет по
+    возрастанию, поэтому начало интервала ищется бинарным поиском по
+    метке времени в начале строки.
+    """
+
+    def __init__(self, path, kind=None):
+        self.path = path
+        name = os.path.basename(path)
+        self.kind = kind or ('https' if name.startswith('detectors_log_') else 'snmp')
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._hour_base = {}
+
+        if self.kind == 'https':
+            # В строках HTTPS лога только время, дата - из имени файла
+            match = HTTPS_DATE_RE.search(name)
+            if not match:
+                raise ValueError(f"{path}: не удалось определить дату по имени файла")
+            self.day = datetime.strptime(match.group(1), "%Y%m%d")
+        self.time_re = HTTPS_TIME_RE if self.kind == 'https' else SNMP_TIME_RE
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def base_for_hour(self, hour_key):
+        """Начало часа (time.time()) по ключу 'YYYY-MM-DD HH' или номеру часа для HTTPS"""
+        base = self._hour_base.get(hour_key)
+        if base is None:
+            if self.kind == 'https':
+                day = self.day
+                base = datetime(day.year, day.month, day.day, int(hour_key)).timestamp()
+            else:
+                base = datetime.strptime(hour_key.decode(), "%Y-%m-%d %H").timestamp()
+            self._hour_base[hour_key] = base
+        return base
+
+    def match_timestamp(self, match):
+        """Время выборки по группам (час, минуты, секунды, мс) совпадения"""
+        hour_key, minutes, seconds, millis = match.group(1, 2, 3, 4)
+        return self.base_for_hour(hour_key) + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+    def seek_time(self, timestamp):
+        """Смещение первой строки с меткой времени >= timestamp (бинарный поиск)"""
+        mm = self.mm
+        low, high = 0, len(mm)
+        while low < high:
+            middle = (low + high) // 2
+            # Первая строка с меткой времени, начинающаяся не раньше middle
+            match = self.time_re.search(mm, middle)
+            if match is None or self.match_timestamp(match) >= timestamp:
+                high = middle
+            else:
+                low = match.end()
+        match = self.time_re.search(mm, low)
+        return match.start() if match else len(mm)
+
+    def samples(self, start=None, end=None, raw=False):
+        """Генератор выборок (время, нибблы) в интервале [start, end).
+
+        Нибблы - байт на детектор в порядке номеров, бит p - строка p
+        представления convert_to_binary_representation (для HTTPS - только
+        бит 0). raw=True для SNMP отдает сырые байты OctetString.
+        """
+        mm = self.mm
+        position = self.seek_time(start) if start is not None else 0
+
+        if self.kind == 'https':
+            for match in HTTPS_SAMPLE_RE.finditer(mm, position):
+                timestamp = self.match_timestamp(match)
+                if end is not None and timestamp >= end:
+                    return
+                if start is not None and timestamp < start:
+                    continue
+                # Номера меньше 1 в строке не соответствуют детектору - пропускаются
+                statuses = [
+                    (int(number), status)
+                    for number, status in HTTPS_DETECTOR_BYTES_RE.findall(match.group(5))
+                    if int(number) >= 1
+                ]
+                if not statuses:
+                    continue
+                bits = bytearray(max(number for number, _ in statuses))
+                for number, status in statuses:
+                    if status == b'1':
+                        bits[number - 1] = 1
+                yield timestamp, bytes(bits)
+            return
+
+        for match in SNMP_RAW_RE.finditer(mm, position):
+            timestamp = self.match_timestamp(match)
+            if end is not None and timestamp >= end:
+                return
+            if start is not None and timestamp < start:
+                continue
+            data = bytes.fromhex(match.group(5).decode())
+            yield timestamp, data if raw else decode_detectors_bytes(data)
+
+
+def read_log_samples(path, start=None, end=None, raw=False):
+    """Выборки текстового лога одним генератором (файл закрывается по завершении)"""
+    with LogReader(path) as reader:
+        yield from reader.samples(start, end, raw)
+
+
+def parse_time_arg(value, reference):
+    """'HH:MM[:SS]' относительно дня reference или 'YYYY-MM-DD HH:MM[:SS]'"""
+    for date_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(value, date_format).timestamp()
+        except ValueError:
+            pass
+    for time_format in ("%H:%M:%S", "%H:%M"):
+        try:
+            parsed = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        day = datetime.fromtimestamp(reference)
+        return day.replace(hour=parsed.hour, minute=parsed.minute, second=parsed.second, microsecond=0).timestamp()
+    raise ValueError(f"Неверное время: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выборки из текстовых логов snmp_log_* / detectors_log_*")
+    parser.add_argument("path")
+    parser.add_argument("--start", help="Начало интервала: HH:MM[:SS] или 'YYYY-MM-DD HH:MM[:SS]'")
+    parser.add_argument("--end", help="Конец интервала (не включая)")
+    parser.add_argument("--count", action="store_true", help="Только число выборок и время чтения")
+    args = parser.parse_args()
+
+    with LogReader(args.path) as reader:
+        first = next(reader.samples(), None)
+        reference = first[0] if first else time.time()
+        start = parse_time_arg(args.start, reference) if args.start else None
+        end = parse_time_arg(args.end, reference) if args.end else None
+
+        started = time.perf_counter()
+        count = 0
+        for timestamp, nibbles in reader.samples(start, end):
+            count += 1
+            if not args.count:
+                current_datetime = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+                print(f"[{current_datetime}] {''.join(f'{nibble:x}' for nibble in nibbles)}")
+        elapsed = (time.perf_counter() - started) * 1000
+        if args.count:
+            print(f"Выборок: {count}, время: {elapsed:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import os
+import struct
+from datetime import datetime
+from potok_dt_log import RotatingLogWriter, next_midnight, read_file_header
+
+# Дневная матрица контроллера: два файла с общим именем
+#   <prefix>_<дата>.matrix - заголовок + строки uint8 [детектор][бит] (0/1)
+#   <prefix>_<дата>.times  - время выборок, float64 (time.time()), по строке на выборку
+# Оба файла только дописываются, поэтому их можно читать во время опроса.
+MAGIC = b'UGDM'
+VERSION = 1
+PLANES = 4
+MATRIX_HEADER = struct.Struct('<4sBBH8x')
+
+# Ниббл -> 4 байта битов (бит p - строка p convert_to_binary_representation)
+NIBBLE_TO_PLANES = [bytes((nibble >> plane) & 1 for plane in range(PLANES)) for nibble in range(16)]
+
+
+def matrix_header(detectors):
+    return MATRIX_HEADER.pack(MAGIC, VERSION, PLANES, detectors)
+
+
+def planes_row(nibbles, detectors):
+    """Строка матрицы: нибблы -> detectors * 4 байт, лишние отбрасываются, недостающие - нули"""
+    row = b''.join([NIBBLE_TO_PLANES[nibble & 0x0F] for nibble in nibbles[:detectors]])
+    return row.ljust(detectors * PLANES, b'\0')
+
+
+class DayMatrixWriter:
+    """Дописывает выборки контроллера в дневную матрицу время × детектор × бит.
+
+    Число детекторов выбирается в начале дня: из заголовка уже записанной
+    матрицы дня (перезапуск) или по первой выборке. Файл с чужим заголовком
+    не дописывается - выборки идут в следующую часть (<prefix>_<дата>_1).
+    День определяется один раз по времени выборки, и оба файла меняются на
+    одной и той же выборке; запись идет через RotatingLogWriter, то есть
+    буфером в фоновом потоке.
+    """
+
+    def __init__(self, log_dir, prefix="snmp_matrix", detectors=0):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.configured_detectors = detectors
+        self.detectors = None
+        # По дате файла: суффикс части и число детекторов (заголовок пишется при открытии)
+        self.parts = {}
+        self.day_detectors = {}
+        self._rotate_at = 0.0
+        self.matrix = RotatingLogWriter(
+            lambda current_date: self.path_for(current_date) + ".matrix",
+            lambda current_date: matrix_header(self.day_detectors[current_date]),
+            binary=True,
+        )
+        self.times = RotatingLogWriter(
+            lambda current_date: self.path_for(current_date) + ".times",
+            binary=True,
+        )
+
+    def path_for(self, current_date):
+        """Путь файлов дня без расширения"""
+        return os.path.join(self.log_dir, f"{self.prefix}_{current_date}{self.parts.get(current_date, '')}")
+
+    def _start_day(self, timestamp, nibbles):
+        """Выбирает файлы дня и число детекторов, сверяясь с заголовком записанной матрицы"""
+        current_date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        detectors = self.configured_detectors or len(nibbles)
+        part = 0
+        while True:
+            self.parts[current_date] = f"_{part}" if part else ""
+            matrix_path = self.path_for(current_date) + ".matrix"
+            header = read_file_header(matrix_path, MATRIX_HEADER.size)
+            if header is None:
+                # Время без матрицы (или матрица без заголовка) - начинаем день заново
+                times_path = times_path_for(matrix_path)
+                if os.path.exists(times_path):
+                    os.truncate(times_path, 0)
+                break
+            if len(header) == MATRIX_HEADER.size:
+                magic, version, planes, existing = MATRIX_HEADER.unpack(header)
+                if (magic == MAGIC and version == VERSION and planes == PLANES and existing
+                        and (not self.configured_detectors or existing == self.configured_detectors)):
+                    detectors = existing
+                    align_day_files(matrix_path, detectors)
+                    break
+            part += 1
+        self.day_detectors[current_date] = detectors
+        self.detectors = detectors
+        self._rotate_at = next_midnight(timestamp)
+
+    def write(self, timestamp, nibbles):
+        if timestamp >= self._rotate_at:
+            self._start_day(timestamp, nibbles)
+        # Один timestamp для обоих файлов: строка и ее время всегда в файлах одного дня.
+        # Сначала строка матрицы, затем время: число строк определяется по .times
+        self.matrix.write(planes_row(nibbles, self.detectors), timestamp)
+        self.times.write(struct.pack('<d', timestamp), timestamp)
+
+    def close(self):
+        self.matrix.close()
+        self.times.close()
+
+
+def align_day_files(matrix_path, detectors):
+    """Обрезает матрицу и время до общего числа полных строк.
+
+    После прерванного процесса в одном из файлов может остаться лишняя
+    или неполная строка, и дописанные следом строки разошлись бы со временем.
+    """
+    times_path = times_path_for(matrix_path)
+    row_size = detectors * PLANES
+    rows = min(
+        (os.path.getsize(matrix_path) - MATRIX_HEADER.size) // row_size,
+        os.path.getsize(times_path) // 8 if os.path.exists(times_path) else 0,
+    )
+    os.truncate(matrix_path, MATRIX_HEADER.size + rows * row_size)
+    if os.path.exists(times_path):
+        os.truncate(times_path, rows * 8)
+
+
+def times_path_for(matrix_path):
+    return matrix_path[:-len('.matrix')] + '.times' if matrix_path.endswith('.matrix') else matrix_path + '.times'
+
+
+def load_day_matrix(matrix_path):
+    """Ленивая загрузка дневной матрицы: (время (N,), биты (N, детекторы, 4)) как np.memmap.
+
+    N - число полностью записанных выборок, поэтому файл можно открывать,
+    пока опрос продолжает дописывать его.
+    """
+    import numpy as np
+
+    with open(matrix_path, 'rb') as f:
+        header = f.read(MATRIX_HEADER.size)
+    if len(header) < MATRIX_HEADER.size:
+        raise ValueError(f"{matrix_path}: нет заголовка")
+    magic, version, planes, detectors = MATRIX_HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{matrix_path}: неизвестный формат")
+
+    times_path = times_path_for(matrix_path)
+    row_size = detectors * planes
+    rows = min(
+        (os.path.getsize(matrix_path) - MATRIX_HEADER.size) // max(row_size, 1),
+        os.path.getsize(times_path) // 8 if os.path.exists(times_path) else 0,
+    )
+    if rows == 0:
+        return np.zeros(0, dtype='<f8'), np.zeros((0, detectors, planes), dtype=np.uint8)
+
+    times = np.memmap(times_path, dtype='<f8', mode='r', shape=(rows,))
+    matrix = np.memmap(matrix_path, dtype=np.uint8, mode='r', offset=MATRIX_HEADER.size,
+                       shape=(rows, detectors, planes))
+    return times, matrix
+
+
+def export_text_log(text_path, out_dir, prefix=None):
+    """Текстовый лог DualLogger (или detectors_log_*) -> дневная матрица, возвращает путь .matrix"""
+    from potok_dt_logreader import LogReader
+
+    with LogReader(text_path) as reader:
+        if prefix is None:
+            prefix = "detectors_matrix" if reader.kind == 'https' else "snmp_matrix"
+        matrix_path = None
+        matrix_file = times_file = None
+        detectors = None
+        try:
+            for timestamp, nibbles in reader.samples():
+                if matrix_file is None:
+                    detectors = len(nibbles)
+                    day = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+                    os.makedirs(out_dir, exist_ok=True)
+                    matrix_path = os.path.join(out_dir, f"{prefix}_{day}.matrix")
+                    matrix_file = open(matrix_path, 'wb')
+                    times_file = open(times_path_for(matrix_path), 'wb')
+                    matrix_file.write(matrix_header(detectors))
+                matrix_file.write(planes_row(nibbles, detectors))
+                times_file.write(struct.pack('<d', timestamp))
+        finally:
+            if matrix_file is not None:
+                matrix_file.close()
+                times_file.close()
+    return matrix_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Дневные матрицы детекторов (время × детектор × бит)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help="текстовый лог -> матрица")
+    export.add_argument('text_path')
+    export.add_argument('--out', default='matrix')
+
+    info = commands.add_parser('info', help="размер матрицы и занятость по детекторам")
+    info.add_argument('matrix_path')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        matrix_path = export_text_log(args.text_path, args.out)
+        if matrix_path is None:
+            print("В логе нет выборок")
+        else:
+            print(f"Матрица: {matrix_path}")
+        return
+
+    times, matrix = load_day_matrix(args.matrix_path)
+    print(f"Выборок: {matrix.shape[0]}, детекторов: {matrix.shape[1]}, битов: {matrix.shape[2]}")
+    if len(times):
+        start = datetime.fromtimestamp(times[0]).strftime("%Y-%m-%d %H:%M:%S")
+        end = datetime.fromtimestamp(times[-1]).strftime("%H:%M:%S")
+        print(f"Интервал: {start} - {end}")
+        # Занятость по выборкам (бит 0), векторно по всей матрице
+        occupancy = matrix[:, :, 0].mean(axis=0) * 100
+        for detector, value in enumerate(occupancy, 1):
+            print(f"DT {detector:2d}: {value:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Загрузка констант из .env
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # 0 - HTTP эндпоинт метрик выключен
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Этапы горячего пути
+STAGE_SCN_GETNEXT = 'scn_getnext'
+STAGE_DETECTOR_GET = 'detector_get'
+STAGE_DECODE = 'decode'
+STAGE_HTML_PARSE = 'html_parse'
+STAGE_LOG_WRITE = 'log_write'
+
+# Границы корзин гистограммы, с: от 10 мкс до 5 с
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class Histogram:
+    """Гистограмма длительностей одного этапа одного контроллера.
+
+    observe() - бинарный поиск корзины и три сложения, без блокировок:
+    наблюдения идут из одного потока опроса, а экспорт читает копию счетчиков.
+    """
+
+    __slots__ = ('stage', 'controller', 'counts', 'sum', 'count')
+
+    def __init__(self, stage, controller):
+        self.stage = stage
+        self.controller = controller
+        # Последняя корзина - больше последней границы (+Inf)
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Оценка квантиля по верхней границе корзины"""
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else float('inf')
+        return float('inf')
+
+
+# Гистограммы по (этап, контроллер)
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def stage_histogram(stage, controller):
+    """Возвращает гистограмму этапа для контроллера, создавая при первом обращении"""
+    key = (stage, controller)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(key, Histogram(stage, controller))
+    return histogram
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """Все гистограммы в текстовом формате Prometheus"""
+    with _histograms_lock:
+        histograms = sorted(_histograms.values(), key=lambda h: (h.stage, h.controller))
+
+    lines = [
+        "# HELP ug405_stage_seconds Длительность этапов опроса детекторов",
+        "# TYPE ug405_stage_seconds histogram",
+    ]
+    for histogram in histograms:
+        labels = f'controller="{escape_label(histogram.controller)}",stage="{histogram.stage}"'
+        counts = list(histogram.counts)
+        cumulative = 0
+        for bound, count in zip(BUCKETS, counts):
+            cumulative += count
+            lines.append(f'ug405_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'ug405_stage_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f'ug405_stage_seconds_sum{{{labels}}} {histogram.sum}')
+        lines.append(f'ug405_stage_seconds_count{{{labels}}} {cumulative}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics - гистограммы этапов"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Запросы сборщика метрик не печатаются в терминал мониторинга
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port=None, host=None):
+    """Запускает HTTP эндпоинт метрик в фоновом потоке (один раз на процесс).
+
+    port/host по умолчанию берутся из окружения в момент вызова, поэтому
+    учитывается и .env, загруженный уже после импорта модуля.
+    При port=0 ничего не делает. Возвращает сервер или None.
+    """
+    global _server
+    if port is None:
+        port = int(os.getenv('METRICS_PORT', '0'))
+    if host is None:
+        host = os.getenv('METRICS_HOST', '127.0.0.1')
+    if not port:
+        return None
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Метрики: http://{host}:{port}/metrics")
+    return _server
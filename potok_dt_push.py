@@ -0,0 +1,332 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from potok_dt_events import EdgeDetector
+
+# Загрузка констант из .env
+PUSH_PORT = int(os.getenv('PUSH_PORT', '0'))  # 0 - сервер потока изменений выключен
+PUSH_HOST = os.getenv('PUSH_HOST', '127.0.0.1')
+PUSH_QUEUE = int(os.getenv('PUSH_QUEUE', '256'))  # Событий в очереди клиента, старые отбрасываются
+PUSH_KEEPALIVE = float(os.getenv('PUSH_KEEPALIVE', '15'))  # Пустое сообщение SSE при простое, с
+
+MESSAGE_STATE = 'state'
+MESSAGE_EVENT = 'event'
+
+
+def parse_list(value, convert=str):
+    """'a,b' -> {a, b}; пустое значение - None (без фильтра)"""
+    if not value:
+        return None
+    return {convert(item.strip()) for item in value.split(',') if item.strip()}
+
+
+def state_message(controller, timestamp, nibbles, detectors=None):
+    """Сообщение о полном состоянии контроллера (нибблы по номерам детекторов)"""
+    return {
+        'type': MESSAGE_STATE,
+        'controller': controller,
+        'time': timestamp,
+        'detectors': {
+            str(number): nibble
+            for number, nibble in enumerate(nibbles, 1)
+            if detectors is None or number in detectors
+        },
+    }
+
+
+def event_message(event):
+    timestamp, controller, detector, bit_plane, value = event
+    return {
+        'type': MESSAGE_EVENT,
+        'controller': controller,
+        'time': timestamp,
+        'detector': detector,
+        'plane': bit_plane,
+        'value': value,
+    }
+
+
+class Subscriber:
+    """Клиент потока: фильтр и ограниченная очередь.
+
+    Состояние контроллера схлопывается (в очереди только последнее),
+    события копятся до queue_size, при переполнении отбрасываются самые
+    старые, и клиент получает сообщение 'dropped' с их числом. Медленный
+    клиент поэтому не задерживает опрос и не копит память.
+    """
+
+    def __init__(self, controllers=None, detectors=None, kinds=(MESSAGE_STATE, MESSAGE_EVENT), queue_size=PUSH_QUEUE):
+        self.controllers = controllers
+        self.detectors = detectors
+        self.kinds = kinds
+        self.queue_size = queue_size
+        self.states = {}
+        self.events = deque()
+        self.dropped = 0
+        self.wakeup = asyncio.Event()
+
+    def wants(self, controller):
+        return self.controllers is None or controller in self.controllers
+
+    def offer_state(self, controller, message):
+        self.states[controller] = message
+        self.wakeup.set()
+
+    def offer_event(self, message):
+        if len(self.events) >= self.queue_size:
+            self.events.popleft()
+            self.dropped += 1
+        self.events.append(message)
+        self.wakeup.set()
+
+    async def next_messages(self, timeout=None):
+        """Ожидает и забирает накопленные сообщения (пустой список по таймауту)"""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self.wakeup.clear()
+        messages = []
+        if self.dropped:
+            messages.append({'type': 'dropped', 'count': self.dropped})
+            self.dropped = 0
+        messages.extend(self.events)
+        self.events.clear()
+        messages.extend(self.states.values())
+        self.states.clear()
+        return messages
+
+
+class PushHub:
+    """Последнее состояние контроллеров и рассылка изменений подписчикам.
+
+    publish() вызывается конвейером опроса; из чужого потока (синхронный
+    монитор) вызов передается в цикл событий сервера. Пока сервер не
+    запущен, publish() ничего не делает.
+    """
+
+    def __init__(self):
+        self.state = {}
+        self.edges = {}
+        self.subscribers = set()
+        self.loop = None
+        self.thread_id = None
+
+    @property
+    def active(self):
+        """Сервер запущен, и publish() доставляет сообщения"""
+        return self.loop is not None
+
+    def attach_loop(self, loop):
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+
+    def publish(self, controller, timestamp, nibbles):
+        if self.loop is None:
+            return
+        if threading.get_ident() == self.thread_id:
+            self._publish(controller, timestamp, nibbles)
+        else:
+            self.loop.call_soon_threadsafe(self._publish, controller, timestamp, nibbles)
+
+    def _publish(self, controller, timestamp, nibbles):
+        first = controller not in self.state
+        self.state[controller] = (timestamp, nibbles)
+        edges = self.edges.get(controller)
+        if edges is None:
+            edges = self.edges[controller] = EdgeDetector(controller)
+        events = edges.update(timestamp, nibbles)
+        if not (events or first):
+            return
+
+        for subscriber in self.subscribers:
+            if not subscriber.wants(controller):
+                continue
+            detectors = subscriber.detectors
+            matched = events if detectors is None else [event for event in events if event[2] in detectors]
+            if MESSAGE_EVENT in subscriber.kinds:
+                for event in matched:
+                    subscriber.offer_event(event_message(event))
+            if MESSAGE_STATE in subscriber.kinds and (matched or first):
+                subscriber.offer_state(controller, state_message(controller, timestamp, nibbles, detectors))
+
+    def snapshot(self, controllers=None, detectors=None):
+        """Текущее состояние: {контроллер: сообщение state}"""
+        return {
+            controller: state_message(controller, timestamp, nibbles, detectors)
+            for controller, (timestamp, nibbles) in self.state.items()
+            if controllers is None or controller in controllers
+        }
+
+    def subscribe(self, controllers=None, detectors=None, kinds=(MESSAGE_STATE, MESSAGE_EVENT)):
+        """Новый подписчик; первым сообщением получает текущее состояние"""
+        subscriber = Subscriber(controllers, detectors, kinds)
+        if MESSAGE_STATE in kinds:
+            for controller, message in self.snapshot(controllers, detectors).items():
+                subscriber.offer_state(controller, message)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+
+# Общий хаб процесса
+hub = PushHub()
+
+
+def parse_filters(query):
+    """Фильтр из параметров: ?controller=ip1,ip2&detector=1,5&types=state,event.
+
+    Возвращает (контроллеры, детекторы, типы сообщений); неверное значение - ValueError.
+    """
+    try:
+        detectors = parse_list(query.get('detector'), int)
+    except ValueError:
+        raise ValueError(f"detector - номера через запятую, получено {query.get('detector')!r}") from None
+    if detectors and min(detectors) < 1:
+        raise ValueError("номера детекторов начинаются с 1")
+    kinds = parse_list(query.get('types')) or {MESSAGE_STATE, MESSAGE_EVENT}
+    unknown = kinds - {MESSAGE_STATE, MESSAGE_EVENT}
+    if unknown:
+        raise ValueError(f"неизвестный тип сообщений: {', '.join(sorted(unknown))}")
+    return parse_list(query.get('controller')), detectors, tuple(kinds)
+
+
+def make_push_app():
+    """aiohttp приложение: /snapshot (JSON), /ws (WebSocket), /events (SSE)"""
+    from aiohttp import WSMsgType, web
+
+    def request_filters(request):
+        # Фильтр разбирается до prepare(): на ошибку клиент получает 400, а не оборванный поток
+        try:
+            return parse_filters(request.query)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=f"Неверный фильтр: {e}")
+
+    async def snapshot(request):
+        controllers, detectors, kinds = request_filters(request)
+        return web.json_response(hub.snapshot(controllers, detectors))
+
+    async def websocket(request):
+        filters = request_filters(request)
+        ws = web.WebSocketResponse(heartbeat=PUSH_KEEPALIVE)
+        await ws.prepare(request)
+        subscriber = hub.subscribe(*filters)
+
+        async def drain_incoming():
+            # Входящие сообщения не нужны, но чтение обрабатывает закрытие соединения
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+
+        reader = asyncio.create_task(drain_incoming())
+        try:
+            while not ws.closed and not reader.done():
+                for message in await subscriber.next_messages(PUSH_KEEPALIVE):
+                    await ws.send_str(json.dumps(message, ensure_ascii=False))
+        except ConnectionResetError:
+            pass
+        finally:
+            hub.unsubscribe(subscriber)
+            reader.cancel()
+        return ws
+
+    async def server_sent_events(request):
+        filters = request_filters(request)
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+        })
+        await response.prepare(request)
+        subscriber = hub.subscribe(*filters)
+        try:
+            while True:
+                messages = await subscriber.next_messages(PUSH_KEEPALIVE)
+                if not messages:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                await response.write("".join(
+                    f"event: {message['type']}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+                    for message in messages
+                ).encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            hub.unsubscribe(subscriber)
+        return response
+
+    app = web.Application()
+    app.router.add_get('/snapshot', snapshot)
+    app.router.add_get('/ws', websocket)
+    app.router.add_get('/events', server_sent_events)
+    return app
+
+
+def push_address(port=None, host=None):
+    """Порт и адрес сервера: явные или из окружения в момент вызова (.env может быть загружен после импорта)"""
+    if port is None:
+        port = int(os.getenv('PUSH_PORT', '0'))
+    if host is None:
+        host = os.getenv('PUSH_HOST', '127.0.0.1')
+    return port, host
+
+
+async def start_push_server(port=None, host=None):
+    """Запускает сервер в текущем цикле событий. При port=0 ничего не делает.
+
+    Хаб подключается к циклу только после успешного запуска сайта: если порт
+    занят, исключение уходит вызывающему, а publish() остается пустым.
+    """
+    port, host = push_address(port, host)
+    if not port:
+        return None
+    from aiohttp import web
+
+    runner = web.AppRunner(make_push_app(), access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except BaseException:
+        await runner.cleanup()
+        raise
+    hub.attach_loop(asyncio.get_running_loop())
+    print(f"Поток изменений: ws://{host}:{port}/ws, http://{host}:{port}/events, http://{host}:{port}/snapshot")
+    return runner
+
+
+def start_push_server_thread(port=None, host=None):
+    """Для синхронного монитора: сервер в своем цикле событий в фоновом потоке.
+
+    Возвращает поток или None, если сервер выключен или не запустился.
+    """
+    port, host = push_address(port, host)
+    if not port:
+        return None
+    started = threading.Event()
+    errors = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(start_push_server(port, host))
+        except Exception as e:
+            errors.append(e)
+            started.set()
+            loop.close()
+            return
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, name="push-server", daemon=True)
+    thread.start()
+    if not started.wait(5):
+        print(f"❌ Сервер потока изменений на порту {port} не запустился за 5 с")
+        return None
+    if errors:
+        print(f"❌ Сервер потока изменений на порту {port} не запущен: {errors[0]}")
+        return None
+    return thread
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+
+# Загрузка констант из .env
+SCHEDULE_POLICY = os.getenv('SCHEDULE_POLICY', 'skip').lower()  # 'skip' или 'coalesce' при переполнении такта
+
+
+class FixedRateScheduler:
+    """Опрос с постоянным периодом по абсолютным монотонным срокам.
+
+    Срок k-го такта - start + k * interval, поэтому время самого запроса
+    не накапливается в периоде. Если опрос не уложился в период, такты
+    не копятся в очередь: опоздание меньше периода просто учитывается,
+    а если прошел целый период, при 'skip' следующий опрос ждет ближайший
+    будущий срок сетки, при 'coalesce' пропущенные такты сливаются в
+    один немедленный опрос. Для каждого такта запоминается опоздание.
+    Интервал 0 - следующий опрос сразу после предыдущего.
+    """
+
+    def __init__(self, interval, start=None, policy=SCHEDULE_POLICY):
+        self.interval = interval
+        self.policy = policy
+        # Первый вызов wait() срабатывает в момент start
+        self.deadline = (time.monotonic() if start is None else start) - interval
+        self.ticks = 0
+        self.skipped = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def next_delay(self, now):
+        """Переходит к следующему сроку; возвращает (задержка, пропущено тактов)"""
+        if self.interval <= 0:
+            self.deadline = now
+            return 0.0, 0
+
+        self.deadline += self.interval
+        missed = 0
+        if now - self.deadline >= self.interval:
+            # Опрос не уложился в период: сроки до now уже прошли
+            missed = int((now - self.deadline) // self.interval)
+            if self.policy != 'coalesce':
+                missed += 1
+            self.deadline += missed * self.interval
+            self.skipped += missed
+        return max(0.0, self.deadline - now), missed
+
+    def record(self, now):
+        """Запоминает опоздание такта относительно его срока"""
+        lateness = max(0.0, now - self.deadline)
+        self.ticks += 1
+        self.last_lateness = lateness
+        self.total_lateness += lateness
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        return lateness
+
+    async def wait(self):
+        """Ждет срока следующего такта; возвращает число пропущенных тактов"""
+        delay, missed = self.next_delay(time.monotonic())
+        # sleep(0) отдает управление другим задачам даже без ожидания
+        await asyncio.sleep(delay)
+        self.record(time.monotonic())
+        return missed
+
+    def wait_sync(self):
+        """То же, что wait(), для синхронных циклов"""
+        delay, missed = self.next_delay(time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+        self.record(time.monotonic())
+        return missed
+
+    def mean_lateness(self):
+        return self.total_lateness / self.ticks if self.ticks else 0.0
+
+    def format_stats(self):
+        """Строка статистики тактов для терминала и лога"""
+        return (
+            f"Тактов: {self.ticks}, пропущено: {self.skipped}, "
+            f"опоздание: последнее {self.last_lateness * 1000:.1f} мс, "
+            f"среднее {self.mean_lateness() * 1000:.1f} мс, "
+            f"макс {self.max_lateness * 1000:.1f} мс"
+        )
@@ -0,0 +1,355 @@
+import asyncio
+import bisect
+import ipaddress
+import os
+import random
+import ssl
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from potok_dt_snmp_client import KNOWN_OBJECTS, OID_DETECTORS, OID_SCN
+from potok_dt_snmp_fast import (
+    PDU_GET,
+    PDU_GET_BULK,
+    PDU_GET_NEXT,
+    PDU_RESPONSE,
+    PDU_TRAP_V2,
+    TAG_END_OF_MIB_VIEW,
+    TAG_INTEGER,
+    TAG_NO_SUCH_INSTANCE,
+    TAG_OCTET_STRING,
+    TAG_OID,
+    TAG_TIMETICKS,
+    SnmpDecodeError,
+    decode_message,
+    encode_message,
+    parse_oid,
+)
+
+# Загрузка констант из .env
+SIM_CONTROLLERS = int(os.getenv('SIM_CONTROLLERS', '1'))
+SIM_HOST = os.getenv('SIM_HOST', '127.0.0.1')
+SIM_SNMP_PORT = int(os.getenv('SIM_SNMP_PORT', '16100'))  # Порты SNMP: SIM_SNMP_PORT + номер
+SIM_HTTPS_PORT = int(os.getenv('SIM_HTTPS_PORT', '18400'))  # Порты HTTPS: SIM_HTTPS_PORT + номер
+SIM_DETECTORS = int(os.getenv('SIM_DETECTORS', '16'))
+SIM_PATTERN = os.getenv('SIM_PATTERN', 'walk')  # 'walk', 'random' или 'static'
+SIM_STEP = float(os.getenv('SIM_STEP', '0.2'))  # Шаг сценария, с
+SIM_SCNS = int(os.getenv('SIM_SCNS', '1'))  # Строк SCN в таблице каждого контроллера
+SIM_TRAP_TARGET = os.getenv('SIM_TRAP_TARGET', '')  # 'host:порт' - слать trap при изменении детекторов
+
+
+def encode_detectors_bytes(nibbles):
+    """Обратное к decode_detectors_bytes: нибблы детекторов -> OctetString.
+
+    Длина строки - 2 байта на детектор (первая четверть hex-строки несет
+    статусы, остальное заполняется нулями, как у контроллера без данных).
+    """
+    count = len(nibbles)
+    raw = bytearray(count * 2)
+    for index in range(count // 2):
+        raw[index] = (nibbles[index * 2 + 1] << 4) | nibbles[index * 2]
+    if count % 2:
+        raw[count // 2] = nibbles[-1] << 4
+    return bytes(raw)
+
+
+class DetectorScript:
+    """Сценарий состояния детекторов во времени"""
+
+    def __init__(self, num_detectors=SIM_DETECTORS, pattern=SIM_PATTERN, step=SIM_STEP, seed=0):
+        self.num_detectors = num_detectors
+        self.pattern = pattern
+        self.step = step
+        self.started = time.monotonic()
+        self.random = random.Random(seed)
+        self.state = bytearray(num_detectors)
+        self.last_tick = 0
+
+    def nibbles(self):
+        """Состояние детекторов на текущий момент (ниббл на детектор)"""
+        tick = int((time.monotonic() - self.started) / self.step)
+
+        if self.pattern == 'walk':
+            # Каждый детектор занят 3 шага из 10, со сдвигом по номеру
+            return bytes(
+                0x1 if (tick + index * 3) % 10 < 3 else 0x0
+                for index in range(self.num_detectors)
+            )
+
+        if self.pattern == 'random':
+            # Случайные переключения битов, по одному на шаг
+            while self.last_tick < tick:
+                self.last_tick += 1
+                index = self.random.randrange(self.num_detectors)
+                self.state[index] ^= 1 << self.random.randrange(4)
+            return bytes(self.state)
+
+        return bytes(self.state)
+
+    def raw(self):
+        return encode_detectors_bytes(self.nibbles())
+
+    def detectors(self):
+        """Состояние в виде строк страницы /detectors/status"""
+        return [
+            {
+                'number': str(index + 1),
+                'input': str(index + 1),
+                'type': 'Индуктивный',
+                'status': '1' if nibble & 1 else '0',
+            }
+            for index, nibble in enumerate(self.nibbles())
+        ]
+
+
+class SnmpAgentSimulator(asyncio.DatagramProtocol):
+    """Заменитель SNMP агента UG405: SCN, статус детекторов, фаза и режим"""
+
+    def __init__(self, script, scn="SIM0001", community=b"UTMC", scn_count=SIM_SCNS):
+        self.script = script
+        self.community = community
+        scn_index = (1, len(scn)) + tuple(scn.encode())
+        self.scn_value = scn.encode()
+        self.scn_oid = parse_oid(OID_SCN) + scn_index
+        self.detectors_oid = parse_oid(OID_DETECTORS) + scn_index
+        # MIB агента: OID -> функция (тег, значение), OID отсортированы для GETNEXT
+        self.mib = {parse_oid(KNOWN_OBJECTS['mode']): lambda: (TAG_INTEGER, 1)}
+        self.scn_scripts = []
+        self.add_scn(scn, script)
+        # Остальные SCN контроллера со своими сценариями
+        for number in range(1, scn_count):
+            self.add_scn(f"{scn}-{number}", DetectorScript(seed=script.random.randrange(1 << 30)))
+        self.mib_oids = sorted(self.mib)
+        self.transport = None
+        self.requests = 0
+        self.traps = 0
+        self.trap_task = None
+
+    def add_scn(self, scn, script):
+        """Добавляет строку SCN: значение SCN, статус детекторов и фаза"""
+        scn_index = (1, len(scn)) + tuple(scn.encode())
+        value = scn.encode()
+        self.scn_scripts.append((parse_oid(OID_DETECTORS) + scn_index, script))
+        self.mib[parse_oid(OID_SCN) + scn_index] = lambda: (TAG_OCTET_STRING, value)
+        self.mib[parse_oid(OID_DETECTORS) + scn_index] = lambda: (TAG_OCTET_STRING, script.raw())
+        self.mib[parse_oid(KNOWN_OBJECTS['stage'][:-4]) + scn_index] = lambda: self.stage(script)
+
+    @staticmethod
+    def stage(script):
+        """Фаза меняется каждые 10 шагов сценария"""
+        tick = int((time.monotonic() - script.started) / script.step)
+        return TAG_INTEGER, 1 + (tick // 10) % 4
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def respond_get(self, oid):
+        getter = self.mib.get(oid)
+        if getter is None:
+            return oid, TAG_NO_SUCH_INSTANCE, None
+        return (oid,) + getter()
+
+    def respond_get_next(self, oid):
+        index = bisect.bisect_right(self.mib_oids, oid)
+        if index == len(self.mib_oids):
+            return oid, TAG_END_OF_MIB_VIEW, None
+        next_oid = self.mib_oids[index]
+        return (next_oid,) + self.mib[next_oid]()
+
+    def respond_get_bulk(self, oids, non_repeaters, max_repetitions):
+        varbinds = [self.respond_get_next(oid) for oid in oids[:non_repeaters]]
+        cursors = list(oids[non_repeaters:])
+        for _ in range(max_repetitions if cursors else 0):
+            row = [self.respond_get_next(oid) for oid in cursors]
+            varbinds.extend(row)
+            cursors = [oid for oid, _, _ in row]
+            if all(tag == TAG_END_OF_MIB_VIEW for _, tag, _ in row):
+                break
+        return varbinds
+
+    async def send_traps(self, target):
+        """Шлет trapV2 со статусом детекторов SCN при каждом его изменении"""
+        from potok_dt_snmp_trap import OID_SNMP_TRAP_OID, OID_SYS_UPTIME
+
+        started = time.monotonic()
+        previous = {}
+        step = min(script.step for _, script in self.scn_scripts) / 4
+        while True:
+            for oid, script in self.scn_scripts:
+                raw = script.raw()
+                if previous.get(oid) == raw:
+                    continue
+                previous[oid] = raw
+                self.traps += 1
+                varbinds = [
+                    (OID_SYS_UPTIME, TAG_TIMETICKS, int((time.monotonic() - started) * 100)),
+                    (OID_SNMP_TRAP_OID, TAG_OID, OID_DETECTORS),
+                    (oid, TAG_OCTET_STRING, raw),
+                ]
+                self.transport.sendto(encode_message(PDU_TRAP_V2, self.traps, varbinds, self.community), target)
+            await asyncio.sleep(step)
+
+    def datagram_received(self, data, addr):
+        try:
+            message = decode_message(data)
+        except SnmpDecodeError:
+            return
+        if message['community'] != self.community:
+            return
+        self.requests += 1
+
+        if message['pdu_type'] == PDU_GET:
+            varbinds = [self.respond_get(oid) for oid, _, _ in message['varbinds']]
+        elif message['pdu_type'] == PDU_GET_NEXT:
+            varbinds = [self.respond_get_next(oid) for oid, _, _ in message['varbinds']]
+        elif message['pdu_type'] == PDU_GET_BULK:
+            varbinds = self.respond_get_bulk(
+                [oid for oid, _, _ in message['varbinds']],
+                message['error_status'],
+                message['error_index'],
+            )
+        else:
+            return
+
+        self.transport.sendto(
+            encode_message(PDU_RESPONSE, message['request_id'], varbinds, self.community),
+            addr,
+        )
+
+
+STATUS_PAGE_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Статус детекторов</title></head>
+<body>
+<table class="table">
+<thead><tr><th>Номер</th><th>Вход</th><th>Тип</th><th>Статус</th><th>Режим</th></tr></thead>
+<tbody id="table_detectors">
+"""
+
+STATUS_PAGE_TAIL = """</tbody>
+</table>
+</body></html>
+"""
+
+STATE_OPTIONS = ["Авто", "Вкл", "Выкл"]
+
+
+def render_status_page(detectors):
+    """HTML страницы /detectors/status в разметке контроллера"""
+    rows = []
+    for det in detectors:
+        css_class = "badge badge-success" if det['status'] == '1' else "badge badge-secondary"
+        options = "".join(
+            f'<option value="{index}"{" selected" if index == 0 else ""}>{name}</option>'
+            for index, name in enumerate(STATE_OPTIONS)
+        )
+        rows.append(
+            "<tr>"
+            f"<td>{det['number']}</td>"
+            f"<td>{det['input']}</td>"
+            f"<td>{det['type']}</td>"
+            f'<td><span id="det_status" class="{css_class}">{det["status"]}</span></td>'
+            f'<td><select name="state[]" class="form-control">{options}</select></td>'
+            "</tr>\n"
+        )
+    return STATUS_PAGE_HEAD + "".join(rows) + STATUS_PAGE_TAIL
+
+
+def make_self_signed_context():
+    """TLS контекст сервера с самоподписанным сертификатом на 127.0.0.1"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "ug405-sim")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=365))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.IPv4Address(SIM_HOST))]), False)
+        .sign(key, hashes.SHA256())
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path = os.path.join(tmp, "cert.pem")
+        key_path = os.path.join(tmp, "key.pem")
+        with open(cert_path, "wb") as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        with open(key_path, "wb") as f:
+            f.write(key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            ))
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+def make_https_app(script):
+    """aiohttp приложение одного контроллера"""
+    from aiohttp import web
+
+    async def status(request):
+        return web.Response(text=render_status_page(script.detectors()), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/detectors/status", status)
+    return app
+
+
+async def start_simulators(count=SIM_CONTROLLERS, snmp=True, https=True):
+    """Запускает count контроллеров, возвращает список (агенты SNMP, aiohttp runners)"""
+    loop = asyncio.get_running_loop()
+    agents = []
+    runners = []
+    context = make_self_signed_context() if https else None
+
+    for index in range(count):
+        script = DetectorScript(seed=index)
+        if snmp:
+            _, agent = await loop.create_datagram_endpoint(
+                lambda: SnmpAgentSimulator(script, scn=f"SIM{index:04d}"),
+                local_addr=(SIM_HOST, SIM_SNMP_PORT + index),
+            )
+            agents.append(agent)
+            if SIM_TRAP_TARGET:
+                host, port = SIM_TRAP_TARGET.rsplit(':', 1)
+                agent.trap_task = asyncio.create_task(agent.send_traps((host, int(port))))
+        if https:
+            from aiohttp import web
+
+            runner = web.AppRunner(make_https_app(script), access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, SIM_HOST, SIM_HTTPS_PORT + index, ssl_context=context).start()
+            runners.append(runner)
+
+    return agents, runners
+
+
+async def main():
+    agents, runners = await start_simulators()
+    print(f"Симуляторов: {SIM_CONTROLLERS}, сценарий: {SIM_PATTERN}, детекторов: {SIM_DETECTORS}")
+    print(f"SNMP: {SIM_HOST}:{SIM_SNMP_PORT}..{SIM_SNMP_PORT + SIM_CONTROLLERS - 1}")
+    print(f"HTTPS: {SIM_HOST}:{SIM_HTTPS_PORT}..{SIM_HTTPS_PORT + SIM_CONTROLLERS - 1}")
+    if SIM_TRAP_TARGET:
+        print(f"Trap при изменениях -> {SIM_TRAP_TARGET}")
+    print("READY", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
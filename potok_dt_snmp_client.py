@@ -0,0 +1,522 @@
+import ipaddress
+import os
+import time
+from potok_dt_metrics import STAGE_DETECTOR_GET, STAGE_SCN_GETNEXT, stage_histogram
+
+SNMP_PORT = 161
+COMMUNITY_STRING = "UTMC"
+
+# 'pysnmp' - через hlapi, 'fast' - собственный BER кодек (potok_dt_snmp_fast)
+SNMP_TRANSPORT = os.getenv('SNMP_TRANSPORT', 'pysnmp').lower()
+
+# OID столбца SCN и OID статуса детекторов (к нему дописывается суффикс SCN)
+OID_SCN = ".1.3.6.1.4.1.13267.3.2.4.2.1.15"
+OID_DETECTORS = ".1.3.6.1.4.1.13267.3.2.5.1.1.32"
+
+# Дополнительные объекты UG405, опрашиваемые вместе со статусом детекторов.
+# Формат: имя=OID|имя=OID+scn|имя=OID*|известное_имя
+#   OID      - скаляр (OID целиком, например с .0)
+#   OID+scn  - экземпляр для SCN контроллера (дописывается суффикс SCN)
+#   OID*     - столбец таблицы, обходится GETBULK
+UG405_OBJECTS = os.getenv('UG405_OBJECTS', '')
+UG405_BULK_REPETITIONS = int(os.getenv('UG405_BULK_REPETITIONS', '16'))  # max-repetitions для GETBULK
+
+# 'first' - только первый SCN (GETNEXT), 'all' - все строки таблицы SCN (GETBULK)
+SCN_DISCOVERY = os.getenv('SCN_DISCOVERY', 'first').lower()
+SCN_BATCH_SIZE = int(os.getenv('SCN_BATCH_SIZE', '16'))  # OID детекторов в одном GET (ответ в пределах MTU)
+
+# Известные объекты UTMC UTC Type 2
+KNOWN_OBJECTS = {
+    'mode': ".1.3.6.1.4.1.13267.3.2.4.1.0",  # utcType2OperationMode
+    'stage': ".1.3.6.1.4.1.13267.3.2.5.1.1.3+scn",  # utcReplyGn - текущая фаза
+}
+
+
+def scn_to_oid_suffix(co):
+    """Преобразует SCN в суффикс OID вида .1.<длина>.<ascii коды>"""
+    len_scn = str(len(co)) + "."
+    scn = [str(ord(c)) for c in co]
+    scn = ".".join(scn)
+    return f".1.{len_scn}{scn}"
+
+
+def controller_label(ip, port=SNMP_PORT):
+    """Имя контроллера в метриках: ip, а для нестандартного порта ip:порт"""
+    return ip if port == SNMP_PORT else f"{ip}:{port}"
+
+
+def oid_to_tuple(oid):
+    """'.1.3.6...' -> кортеж чисел"""
+    return tuple(int(arc) for arc in oid.strip('.').split('.'))
+
+
+def tuple_to_oid(arcs):
+    """Кортеж чисел -> '.1.3.6...'"""
+    return "." + ".".join(str(arc) for arc in arcs)
+
+
+# pysnmp импортируется при первом запросе: с SNMP_TRANSPORT=fast и в модулях,
+# которым нужны только константы и функции разбора, он не загружается вовсе
+_hlapi = None
+_exception_types = None
+
+
+def hlapi():
+    """Модуль pysnmp.hlapi.asyncio (загружается при первом обращении)"""
+    global _hlapi
+    if _hlapi is None:
+        import pysnmp.hlapi.asyncio as module
+        _hlapi = module
+    return _hlapi
+
+
+def is_exception_value(val):
+    """noSuchObject / noSuchInstance / endOfMibView"""
+    global _exception_types
+    if _exception_types is None:
+        from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchInstance, NoSuchObject
+        _exception_types = (NoSuchInstance, NoSuchObject, EndOfMibView)
+    return isinstance(val, _exception_types)
+
+
+def normalize_value(val):
+    """Значение pysnmp -> bytes / int / кортеж OID; None для noSuch*/endOfMibView"""
+    if val is None or is_exception_value(val):
+        return None
+    if hasattr(val, 'asOctets'):
+        return val.asOctets()
+    if hasattr(val, 'asTuple'):
+        return tuple(val.asTuple())
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return val.prettyPrint()
+
+
+class Ug405Object:
+    """Объект UG405 в наборе опроса: имя, OID и способ адресации"""
+
+    def __init__(self, name, oid, kind='scalar'):
+        self.name = name
+        self.oid = oid
+        self.kind = kind  # 'scalar', 'scn' или 'table'
+
+    def __repr__(self):
+        return f"Ug405Object({self.name!r}, {self.oid!r}, {self.kind!r})"
+
+
+def parse_objects(spec):
+    """Разбирает описание набора объектов (формат UG405_OBJECTS)"""
+    objects = []
+    for item in spec.split('|'):
+        item = item.strip()
+        if not item:
+            continue
+        if '=' in item:
+            name, oid = (part.strip() for part in item.split('=', 1))
+        elif item in KNOWN_OBJECTS:
+            name, oid = item, KNOWN_OBJECTS[item]
+        else:
+            raise ValueError(f"Неизвестный объект UG405: {item}")
+
+        if oid.endswith('+scn'):
+            objects.append(Ug405Object(name, oid[:-4], 'scn'))
+        elif oid.endswith('*'):
+            objects.append(Ug405Object(name, oid[:-1].rstrip('.'), 'table'))
+        else:
+            objects.append(Ug405Object(name, oid))
+    return objects
+
+
+class SnmpPollerClient:
+    """SNMP клиент одного контроллера: SnmpEngine, транспорт и community создаются один раз"""
+
+    def __init__(self, ip, community=COMMUNITY_STRING, port=SNMP_PORT, timeout=1, retries=5):
+        self.ip = ip
+        self.community = community
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.engine = None
+        self.auth_data = None
+        self.transport = None
+        self.context = None
+        # Готовые ObjectType по OID: разрешаются по MIB при первом запросе
+        # и дальше переиспользуются без повторного разбора строки OID
+        self.object_types = {}
+        # Кэш суффикса OID для SCN, заполняется при discover()
+        self.scn_suffix = None
+        # Все строки таблицы SCN [(SCN, суффикс)], заполняется discover_all_scns()
+        self.scn_table = None
+        # Гистограммы длительности запросов
+        self.scn_metric = stage_histogram(STAGE_SCN_GETNEXT, controller_label(ip, port))
+        self.get_metric = stage_histogram(STAGE_DETECTOR_GET, controller_label(ip, port))
+
+    def _ensure_engine(self):
+        """Лениво создает движок и транспорт.
+
+        Внутри нет ни одного await, поэтому при параллельных задачах опроса
+        на одном event loop объекты гарантированно создаются ровно один раз.
+        """
+        if self.engine is None:
+            api = hlapi()
+            # Транспорт первым: если адрес не разрешается, движок не остается
+            # наполовину созданным и следующий опрос попробует заново
+            self.transport = api.UdpTransportTarget(
+                (self.ip, self.port), timeout=self.timeout, retries=self.retries
+            )
+            self.auth_data = api.CommunityData(self.community)
+            self.context = api.ContextData()
+            self.engine = api.SnmpEngine()
+        return self.engine
+
+    def object_type(self, oid):
+        """ObjectType для OID из числового кортежа, один объект на OID"""
+        object_type = self.object_types.get(oid)
+        if object_type is None:
+            api = hlapi()
+            object_type = api.ObjectType(api.ObjectIdentity(oid_to_tuple(oid)))
+            self.object_types[oid] = object_type
+        return object_type
+
+    async def get_value(self, oid):
+        """SNMP GET запрос, возвращает значение pysnmp или None при ошибке"""
+        engine = self._ensure_engine()
+        error_indication, error_status, error_index, var_binds = await hlapi().getCmd(
+            engine,
+            self.auth_data,
+            self.transport,
+            self.context,
+            self.object_type(oid),
+            lexicographicMode=True,
+            lookupMib=False,
+        )
+
+        if error_indication:
+            return None
+        if error_status:
+            return None
+
+        for name, val in var_binds:
+            return val
+
+    async def get(self, oid):
+        """SNMP GET запрос, возвращает prettyPrint значения или None"""
+        val = await self.get_value(oid)
+        if val is None:
+            return None
+        return val.prettyPrint()
+
+    async def get_many(self, oids):
+        """Один GET на несколько OID, значения по порядку (normalize_value) или None"""
+        engine = self._ensure_engine()
+        error_indication, error_status, error_index, var_binds = await hlapi().getCmd(
+            engine,
+            self.auth_data,
+            self.transport,
+            self.context,
+            *(self.object_type(oid) for oid in oids),
+            lookupMib=False,
+        )
+
+        if error_indication or error_status:
+            return None
+        return [normalize_value(val) for name, val in var_binds]
+
+    async def get_bulk(self, oids, max_repetitions, non_repeaters=0):
+        """Один GETBULK, возвращает [(кортеж OID, значение)] построчно или None"""
+        engine = self._ensure_engine()
+        error_indication, error_status, error_index, var_bind_table = await hlapi().bulkCmd(
+            engine,
+            self.auth_data,
+            self.transport,
+            self.context,
+            non_repeaters,
+            max_repetitions,
+            *(self.object_type(oid) for oid in oids),
+            lookupMib=False,
+        )
+
+        if error_indication or error_status:
+            return None
+        return [
+            (tuple(name), normalize_value(val))
+            for row in var_bind_table
+            for name, val in row
+        ]
+
+    async def get_next_scn(self, oid=OID_SCN):
+        """SNMP GET NEXT запрос, возвращает суффикс OID для первого SCN"""
+        engine = self._ensure_engine()
+        started = time.perf_counter()
+        error_indication, error_status, error_index, var_binds = await hlapi().nextCmd(
+            engine,
+            self.auth_data,
+            self.transport,
+            self.context,
+            self.object_type(oid),
+            lexicographicMode=True,
+            lookupMib=False,
+        )
+        self.scn_metric.observe(time.perf_counter() - started)
+
+        if error_indication:
+            return None
+        if error_status:
+            return None
+
+        # Извлекаем SCN
+        co = var_binds[0][0][1].prettyPrint()
+        return scn_to_oid_suffix(co)
+
+    async def discover(self):
+        """Находит SCN и запоминает суффикс OID для последующих опросов"""
+        self.scn_suffix = await self.get_next_scn()
+        return self.scn_suffix
+
+    def invalidate_scn(self):
+        """Сбрасывает кэш SCN, при следующем опросе он будет найден заново"""
+        self.scn_suffix = None
+
+    async def get_detectors_value(self):
+        """Запрашивает статус детекторов, SCN берется из кэша"""
+        old_str = self.scn_suffix
+        if old_str is None:
+            old_str = await self.discover()
+            if old_str is None:
+                return None
+
+        # Получаем статус детекторов
+        started = time.perf_counter()
+        val = await self.get_value(f"{OID_DETECTORS}{old_str}")
+        self.get_metric.observe(time.perf_counter() - started)
+        if val is None or is_exception_value(val):
+            # SCN мог смениться (перезагрузка или перенастройка контроллера)
+            self.invalidate_scn()
+        return val
+
+    async def get_ug405(self):
+        """Статус детекторов в виде prettyPrint ('0x...')"""
+        val = await self.get_detectors_value()
+        if val is None:
+            return None
+        return val.prettyPrint()
+
+    async def get_ug405_raw(self):
+        """Статус детекторов как bytes или None"""
+        val = await self.get_detectors_value()
+        if val is None or is_exception_value(val):
+            return None
+        return val.asOctets()
+
+    def close(self):
+        """Закрывает транспорт движка"""
+        if self.engine is not None:
+            dispatcher = self.engine.transportDispatcher
+            if dispatcher is not None:
+                dispatcher.closeDispatcher()
+            self.engine = None
+
+
+# Клиенты по контроллерам: (ip, port, community) -> SnmpPollerClient
+_clients = {}
+
+
+def get_client(ip, community=COMMUNITY_STRING, port=SNMP_PORT, timeout=1, retries=5):
+    """Возвращает общий клиент для контроллера, создавая его при первом обращении"""
+    key = (ip, port, community)
+    client = _clients.get(key)
+    if client is None:
+        if SNMP_TRANSPORT == 'fast':
+            from potok_dt_snmp_fast import FastSnmpClient
+            client = FastSnmpClient(ip, community, port, timeout, retries)
+        else:
+            client = SnmpPollerClient(ip, community, port, timeout, retries)
+        _clients[key] = client
+    return client
+
+
+def close_clients():
+    """Закрывает все созданные клиенты"""
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
+
+
+async def bulk_walk(client, columns, max_repetitions=UG405_BULK_REPETITIONS):
+    """Обход столбцов таблиц через GETBULK.
+
+    Все незаконченные столбцы запрашиваются в одном PDU; возвращает
+    {столбец: [(суффикс строки, значение)]} или None при ошибке запроса.
+    """
+    prefixes = {column: oid_to_tuple(column) for column in columns}
+    rows = {column: [] for column in columns}
+    cursor = dict(prefixes)
+    active = list(columns)
+
+    while active:
+        response = await client.get_bulk([tuple_to_oid(cursor[column]) for column in active], max_repetitions)
+        if response is None:
+            return None
+
+        # Ответ идет строками: по одному varbind на каждый запрошенный столбец
+        width = len(active)
+        finished = set()
+        for index, (oid, value) in enumerate(response):
+            column = active[index % width]
+            if column in finished:
+                continue
+            prefix = prefixes[column]
+            if value is None or oid[:len(prefix)] != prefix or oid <= cursor[column]:
+                # Конец столбца, конец MIB или неубывающий OID
+                finished.add(column)
+                continue
+            rows[column].append((oid[len(prefix):], value))
+            cursor[column] = oid
+
+        if len(response) < width:
+            # Агент не вернул ни одной полной строки - дальше не продвинемся
+            break
+        active = [column for column in active if column not in finished]
+
+    return rows
+
+
+async def get_sample(client, objects, max_repetitions=UG405_BULK_REPETITIONS):
+    """Одна выборка: статус детекторов и набор объектов UG405.
+
+    Скаляры и экземпляры SCN идут одним GET вместе с OID детекторов,
+    столбцы таблиц - одним обходом GETBULK. Возвращает словарь
+    {'time', 'detectors', имя объекта: значение}; значение таблицы -
+    {суффикс строки: значение}.
+    """
+    scn_suffix = client.scn_suffix
+    if scn_suffix is None:
+        scn_suffix = await client.discover()
+
+    sample = {'time': None, 'detectors': None}
+    get_objects = []
+    oids = []
+    if scn_suffix is not None:
+        oids.append(f"{OID_DETECTORS}{scn_suffix}")
+    for obj in objects:
+        if obj.kind == 'scalar':
+            get_objects.append(obj)
+            oids.append(obj.oid)
+        elif obj.kind == 'scn' and scn_suffix is not None:
+            get_objects.append(obj)
+            oids.append(f"{obj.oid}{scn_suffix}")
+        else:
+            sample[obj.name] = None
+
+    if oids:
+        started = time.perf_counter()
+        values = await client.get_many(oids)
+        client.get_metric.observe(time.perf_counter() - started)
+        sample['time'] = time.time()
+        if values is not None and len(values) == len(oids):
+            if scn_suffix is not None:
+                sample['detectors'] = values.pop(0)
+            for obj, value in zip(get_objects, values):
+                sample[obj.name] = value
+        if scn_suffix is not None and not isinstance(sample['detectors'], bytes):
+            # SCN мог смениться (перезагрузка или перенастройка контроллера)
+            sample['detectors'] = None
+            client.invalidate_scn()
+
+    tables = [obj for obj in objects if obj.kind == 'table']
+    if tables:
+        walked = await bulk_walk(client, [obj.oid for obj in tables], max_repetitions)
+        if sample['time'] is None:
+            sample['time'] = time.time()
+        for obj in tables:
+            if walked is not None:
+                sample[obj.name] = {tuple_to_oid(suffix): value for suffix, value in walked[obj.oid]}
+
+    return sample
+
+
+async def discover_all_scns(client):
+    """Обходит столбец SCN через GETBULK и запоминает все строки [(SCN, суффикс OID)]"""
+    started = time.perf_counter()
+    walked = await bulk_walk(client, [OID_SCN])
+    client.scn_metric.observe(time.perf_counter() - started)
+    if walked is None:
+        return None
+
+    table = []
+    for suffix, value in walked[OID_SCN]:
+        scn = value.decode('latin-1') if isinstance(value, bytes) else str(value)
+        table.append((scn, tuple_to_oid(suffix)))
+    client.scn_table = table
+    # Первый SCN остается доступен одиночному опросу get_ug405()
+    client.scn_suffix = table[0][1] if table else None
+    return table
+
+
+async def get_all_detectors(client, batch_size=SCN_BATCH_SIZE):
+    """Статус детекторов всех SCN контроллера: {SCN: bytes или None}.
+
+    OID детекторов всех SCN упаковываются в GET по batch_size штук, так
+    что на контроллер уходит ceil(число SCN / batch_size) запросов.
+    """
+    table = client.scn_table
+    if table is None:
+        table = await discover_all_scns(client)
+        if table is None:
+            return None
+
+    result = {}
+    stale = False
+    for start in range(0, len(table), batch_size):
+        batch = table[start:start + batch_size]
+        started = time.perf_counter()
+        values = await client.get_many([f"{OID_DETECTORS}{suffix}" for scn, suffix in batch])
+        client.get_metric.observe(time.perf_counter() - started)
+        if values is None or len(values) != len(batch):
+            values = [None] * len(batch)
+        for (scn, suffix), value in zip(batch, values):
+            if not isinstance(value, bytes):
+                stale = True
+                value = None
+            result[scn] = value
+
+    if stale or not table:
+        # Таблица SCN могла измениться - при следующем опросе обходим заново
+        client.scn_table = None
+    return result
+
+
+def format_value(value):
+    """Значение объекта UG405 для лога"""
+    if isinstance(value, bytes):
+        return '0x' + value.hex()
+    if isinstance(value, tuple):
+        return tuple_to_oid(value)
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {format_value(item)}" for key, item in value.items()) + "}"
+    return str(value)
+
+
+def format_sample_objects(sample, objects):
+    """Строка 'имя=значение, ...' для дополнительных объектов выборки"""
+    return ", ".join(f"{obj.name}={format_value(sample.get(obj.name))}" for obj in objects)
+
+
+async def snmp_get_request(ip, community, oid):
+    """Асинхронный SNMP GET запрос"""
+    return await get_client(ip, community).get(oid)
+
+
+async def snmp_get_next_request(ip, community, oid):
+    """Асинхронный SNMP GET NEXT запрос"""
+    return await get_client(ip, community).get_next_scn(oid)
+
+
+async def get_ug405(ip_address, community_string=COMMUNITY_STRING):
+    try:
+        ipaddress.IPv4Address(ip_address)
+    except ipaddress.AddressValueError:
+        return "Invalid IP Address"
+
+    return await get_client(ip_address, community_string).get_ug405()
@@ -1,192 +1,93 @@
 import asyncio
-import ipaddress
 import time
 import os
 from datetime import datetime
-from pysnmp.hlapi.asyncio import *
+from potok_dt_detectors import (
+    decode_detectors_bytes,
+    hex_to_raw,
+    nibbles_to_chars,
+    parse_detectors_status,
+    print_full_output,
+    print_light_output,
+    reorder_detectors,
+)
+from potok_dt_events import OUTPUT_MODE, EdgeDetector, EventLog, format_event
+from potok_dt_log import RotatingLogWriter
+from potok_dt_metrics import STAGE_DECODE, STAGE_LOG_WRITE, start_metrics_server, stage_histogram
+from potok_dt_push import PUSH_PORT, hub, start_push_server
+from potok_dt_schedule import FixedRateScheduler
+from potok_dt_stats import STATS, DetectorStats, StatsLog
+from potok_dt_snmp_client import (
+    SCN_DISCOVERY,
+    UG405_OBJECTS,
+    discover_all_scns,
+    format_sample_objects,
+    get_all_detectors,
+    get_client,
+    get_sample,
+    get_ug405,
+    parse_objects,
+    scn_to_oid_suffix,
+)
+from potok_dt_snmp_trap import RECONCILE_INTERVAL, TRAP_LISTENER, TRAP_PORT, start_trap_receiver
 
 # Загрузка констант из .env
 SCAN_MODE = os.getenv('SCAN_MODE', 'light').lower()  # 'light' или 'full'
 IP_ADDRESS = os.getenv('IP', '10.179.72.97')
 SKIP_DUPLICATES = os.getenv('SKIP_DUPLICATES', 'true').lower() == 'false'  # Пропуск повторяющихся 
+BINARY_LOG = os.getenv('BINARY_LOG', 'false').lower() == 'true'  # Дополнительный бинарный лог выборок
+MATRIX_EXPORT = os.getenv('MATRIX_EXPORT', 'false').lower() == 'true'  # Дневная матрица выборок (potok_dt_matrix)
+POLL_INTERVAL = float(os.getenv('POLL_INTERVAL', '0.2'))  # Период опроса, с
 
 # Создаем папку для логов
 LOG_DIR = "logs_snmp"
 os.makedirs(LOG_DIR, exist_ok=True)
 
-# Таблица преобразования символов в бинарное представление (перевернутое)
-CHAR_TO_BINARY = {
-    '0': '0000',  # 0000 -> 0000
-    '1': '1000',  # 0001 -> 1000
-    '2': '0100',  # 0010 -> 0100
-    '3': '1100',  # 0011 -> 1100
-    '4': '0010',  # 0100 -> 0010
-    '5': '1010',  # 0101 -> 1010
-    '6': '0110',  # 0110 -> 0110
-    '7': '1110',  # 0111 -> 1110
-    '8': '0001',  # 1000 -> 0001
-    '9': '1001',  # 1001 -> 1001
-    'a': '0101',  # 1010 -> 0101
-    'b': '1101',  # 1011 -> 1101
-    'c': '0011',  # 1100 -> 0011
-    'd': '1011',  # 1101 -> 1011
-    'e': '0111',  # 1110 -> 0111
-    'f': '1111',  # 1111 -> 1111
-}
-
 class DualLogger:
-    def __init__(self):
-        self.light_log_file = None
-        self.full_log_file = None
-        self.setup_log_files()
-    
-    def setup_log_files(self):
-        """Создает два лог-файла с текущей датой для light и full режимов"""
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        
-        # Файл для light режима
-        self.light_log_file = os.path.join(LOG_DIR, f"snmp_log_light_{current_date}.txt")
-        # Файл для full режима  
-        self.full_log_file = os.path.join(LOG_DIR, f"snmp_log_full_{current_date}.txt")
-        
-        # Записываем заголовки при создании файлов
-        for log_file, mode_name in [(self.light_log_file, "Light"), (self.full_log_file, "Full")]:
-            if not os.path.exists(log_file):
-                with open(log_file, 'w', encoding='utf-8') as f:
-                    f.write(f"SNMP Monitor Log - {current_date} ({mode_name} Mode)\n")
-                    f.write(f"Scan Mode: {SCAN_MODE}\n")
-                    f.write(f"IP Address: {IP_ADDRESS}\n")
-                    f.write(f"Skip Duplicates: {SKIP_DUPLICATES}\n")
-                    f.write("=" * 80 + "\n\n")
+    def __init__(self, ip_address=IP_ADDRESS, log_dir=LOG_DIR):
+        self.ip_address = ip_address
+        self.log_dir = log_dir
+        # Файлы открываются фоновым потоком при первой записи и меняются в полночь
+        self.light_log = RotatingLogWriter(
+            lambda current_date: os.path.join(self.log_dir, f"snmp_log_light_{current_date}.txt"),
+            lambda current_date: self.log_header(current_date, "Light"),
+        )
+        self.full_log = RotatingLogWriter(
+            lambda current_date: os.path.join(self.log_dir, f"snmp_log_full_{current_date}.txt"),
+            lambda current_date: self.log_header(current_date, "Full"),
+        )
     
-    def check_and_update_log_files(self):
-        """Проверяет, не изменилась ли дата (для создания новых файлов)"""
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        expected_light_file = os.path.join(LOG_DIR, f"snmp_log_light_{current_date}.txt")
-        expected_full_file = os.path.join(LOG_DIR, f"snmp_log_full_{current_date}.txt")
-        
-        if self.light_log_file != expected_light_file or self.full_log_file != expected_full_file:
-            self.setup_log_files()
+    def log_header(self, current_date, mode_name):
+        """Заголовок нового лог-файла"""
+        return (
+            f"SNMP Monitor Log - {current_date} ({mode_name} Mode)\n"
+            f"Scan Mode: {SCAN_MODE}\n"
+            f"IP Address: {self.ip_address}\n"
+            f"Skip Duplicates: {SKIP_DUPLICATES}\n"
+            + "=" * 80 + "\n\n"
+        )
     
     def write_light_log(self, message):
         """Записывает сообщение в light лог-файл"""
-        try:
-            self.check_and_update_log_files()
-            with open(self.light_log_file, 'a', encoding='utf-8') as f:
-                f.write(message + '\n')
-        except Exception as e:
-            print(f"Ошибка записи в light лог: {e}")
+        self.light_log.write(message + '\n')
     
     def write_full_log(self, message):
         """Записывает сообщение в full лог-файл"""
-        try:
-            self.check_and_update_log_files()
-            with open(self.full_log_file, 'a', encoding='utf-8') as f:
-                f.write(message + '\n')
-        except Exception as e:
-            print(f"Ошибка записи в full лог: {e}")
+        self.full_log.write(message + '\n')
     
     def write_both_logs(self, light_message, full_message):
         """Записывает сообщения в оба лог-файла"""
         self.write_light_log(light_message)
         self.write_full_log(full_message)
+    
+    def close(self):
+        """Сбрасывает буферы и закрывает файлы"""
+        self.light_log.close()
+        self.full_log.close()
 
 # Глобальный объект логгера
 logger = DualLogger()
 
-async def snmp_get_request(ip, community, oid):
-    """Асинхронный SNMP GET запрос"""
-    error_indication, error_status, error_index, var_binds = await getCmd(
-        SnmpEngine(),
-        CommunityData(community),
-        UdpTransportTarget((ip, 161)),
-        ContextData(),
-        ObjectType(ObjectIdentity(oid)),
-        lexicographicMode=True,
-    )
-    
-    if error_indication:
-        return None
-    if error_status:
-        return None
-
-    for name, val in var_binds:
-        return val.prettyPrint()
-
-async def snmp_get_next_request(ip, community, oid):
-    """Асинхронный SNMP GET NEXT запрос"""
-    error_indication, error_status, error_index, var_binds = await nextCmd(
-        SnmpEngine(),
-        CommunityData(community),
-        UdpTransportTarget((ip, 161)),
-        ContextData(),
-        ObjectType(ObjectIdentity(oid)),
-        lexicographicMode=True,
-    )
-
-    if error_indication:
-        return None
-    if error_status:
-        return None
-
-    # Извлекаем SCN
-    co = var_binds[0][0][1].prettyPrint()
-    len_scn = str(len(co)) + "."
-    scn = [str(ord(c)) for c in co]
-    scn = ".".join(scn)
-    scn = f".1.{len_scn}{scn}"
-    return scn
-
-def parse_detectors_status(hex_string):
-    """Парсит hex-строку и возвращает статусы детекторов"""
-    if not hex_string or hex_string == "None" or not hex_string.startswith("0x"):
-        return []
-    
-    # Очищаем строку от лишних пробелов и непечатаемых символов
-    hex_string = ''.join(hex_string.split())
-    hex_string = hex_string.strip()
-    
-    # Убираем префикс "0x"
-    hex_data = hex_string[2:]
-    
-    # Делим строку на 4 равные части
-    part_length = len(hex_data) // 4
-    if part_length == 0:
-        return []
-    
-    # Берем только первую часть
-    first_part = hex_data[:part_length]
-    
-    # Каждый символ в первой части - это статус одного детектора
-    detectors_status = list(first_part)
-    
-    return detectors_status
-
-def reorder_detectors(detectors):
-    """Переупорядочивает детекторы согласно правилу: 2,1,4,3,6,5 и т.д."""
-    if not detectors:
-        return []
-    
-    reordered = []
-    for i in range(0, len(detectors), 2):
-        if i + 1 < len(detectors):
-            # Меняем местами пары: берем второй, затем первый
-            reordered.append(detectors[i + 1])
-            reordered.append(detectors[i])
-        else:
-            # Если нечетное количество, последний остается на месте
-            reordered.append(detectors[i])
-    
-    return reordered
-
-def get_emoji_status(status_char):
-    """Возвращает эмодзи в зависимости от статуса детектора"""
-    return "⚪" if status_char == '0' else "🟢"
-
-def get_emoji_from_binary(bit):
-    """Возвращает эмодзи в зависимости от бинарного значения"""
-    return "⚪" if bit == '0' else "🟢"
-
 def get_current_time_with_ms():
     """Возвращает текущее время с миллисекундами"""
     current_time = time.time()
@@ -198,105 +99,128 @@ def get_current_datetime():
     """Возвращает текущую дату и время для логов"""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
 
-def convert_to_binary_representation(detectors):
-    """Преобразует символы детекторов в бинарное представление (4 строки)"""
-    if not detectors:
-        return []
-    
-    binary_lines = []
-    
-    # Для каждого детектора получаем его бинарное представление
-    for detector_char in detectors:
-        char_lower = detector_char.lower()
-        binary_repr = CHAR_TO_BINARY.get(char_lower, '0000')
-        binary_lines.append(binary_repr)
-    
-    # Транспонируем: создаем 4 строки, каждая содержит соответствующий бит из каждого детектора
-    result_lines = []
-    for bit_position in range(4):
-        line_bits = [line[bit_position] for line in binary_lines]
-        result_lines.append(line_bits)
-    
-    return result_lines
-
-def print_light_output(reordered_detectors, num_detectors):
-    """Вывод в легком режиме"""
-    detector_outputs = []
-    for i, status in enumerate(reordered_detectors[:num_detectors], 1):
-        emoji = get_emoji_status(status)
-        detector_outputs.append(f"{emoji} {i}={status}")
-    return " ".join(detector_outputs)
-
-def print_full_output(reordered_detectors, num_detectors):
-    """Вывод в полном режиме (4 строки с бинарным представлением)"""
-    binary_lines = convert_to_binary_representation(reordered_detectors[:num_detectors])
-    
-    output_lines = []
-    for line_idx, line_bits in enumerate(binary_lines):
-        detector_outputs = []
-        for i, bit in enumerate(line_bits, 1):
-            emoji = get_emoji_from_binary(bit)
-            # Получаем оригинальный символ для отображения
-            original_char = reordered_detectors[i-1] if i-1 < len(reordered_detectors) else '0'
-            detector_outputs.append(f"{emoji} {i}={original_char}")
-        output_lines.append(" ".join(detector_outputs))
-    
-    return "\n".join(output_lines)
-
-async def get_ug405(ip_address):
-    try:
-        ipaddress.IPv4Address(ip_address)
-    except ipaddress.AddressValueError:
-        return "Invalid IP Address"
-
-    community_string = "UTMC"
-    oid_get_request = ".1.3.6.1.4.1.13267.3.2.4.2.1.15"
-    
-    # Получаем SCN
-    old_str = await snmp_get_next_request(ip_address, community_string, oid_get_request)
-    
-    if old_str is not None:
-        # Получаем статус детекторов
-        oid_get = f".1.3.6.1.4.1.13267.3.2.5.1.1.32{old_str}"
-        response = await snmp_get_request(ip_address, community_string, oid_get)
-        return response
-    
-    return None
-
-async def main():
-    ip = IP_ADDRESS
-    num_detectors = 0
-    first_run = True
-    previous_raw_data = None
+class DetectorPipeline:
+    """Декодирование, вывод и логирование ответов одного контроллера"""
     
-    print(f"Режим сканирования: {SCAN_MODE}")
-    print(f"IP адрес: {ip}")
-    print(f"Пропуск одинаковых ответов: {'ВКЛЮЧЕН' if SKIP_DUPLICATES else 'ВЫКЛЮЧЕН'}")
-    print(f"Логи сохраняются в папку: {LOG_DIR}")
-    print(f"Созданы два лог-файла: light и full режимы")
+    def __init__(self, log, echo=True, prefix="", binary_log=None, edges=None, events_log=None,
+                 stats=None, stats_log=None, matrix=None, state=None, push=None, dashboard=None):
+        self.logger = log
+        # Экран состояния (OUTPUT_MODE=dashboard): только запоминает выборку, рисует отдельная задача
+        self.dashboard = dashboard
+        # Рассылка состояния и изменений подписчикам (potok_dt_push)
+        self.push = push
+        # Слот в таблице последнего состояния (potok_dt_state) для читателей из других процессов
+        self.state = state
+        self.binary_log = binary_log
+        # Дневная матрица время × детектор × бит (каждая выборка, включая повторы)
+        self.matrix = matrix
+        # Агрегаты по окнам (занятость, срабатывания, интервалы)
+        self.stats = stats
+        self.stats_log = stats_log
+        # Режим событий: вместо полного состояния только изменившиеся биты
+        self.edges = edges
+        self.events_log = events_log
+        self.echo = echo
+        self.prefix = prefix
+        # Нужны ли нибблы выборки кому-то, кроме вывода и текстовых логов
+        self.needs_nibbles = any(sink is not None for sink in (stats, matrix, state, push, dashboard))
+        self.num_detectors = 0
+        self.first_run = True
+        self.previous_raw_data = None
+        self.previous_objects = None
+        # Гистограммы этапов: декодирование и запись в логи
+        self.decode_metric = stage_histogram(STAGE_DECODE, log.ip_address)
+        self.log_metric = stage_histogram(STAGE_LOG_WRITE, log.ip_address)
     
-    # Логируем начало работы в оба файла
-    start_message = f"[{get_current_datetime()}] Запуск мониторинга"
-    logger.write_both_logs(start_message, start_message)
+    def print(self, message):
+        """Выводит сообщение в терминал, если вывод включен"""
+        if self.echo:
+            print(f"{self.prefix}{message}")
     
-    mode_message = f"[{get_current_datetime()}] Режим сканирования: {SCAN_MODE}"
-    logger.write_both_logs(mode_message, mode_message)
+    def log_error(self, error_message):
+        """Выводит и пишет в оба лога сообщение об ошибке"""
+        self.print(f"[{get_current_time_with_ms()}] {error_message}")
+        current_datetime = get_current_datetime()
+        self.logger.write_both_logs(
+            f"[{current_datetime}] {error_message}", 
+            f"[{current_datetime}] {error_message}"
+        )
     
-    ip_message = f"[{get_current_datetime()}] IP адрес: {ip}"
-    logger.write_both_logs(ip_message, ip_message)
+    def process_events(self, result, raw):
+        """Режим событий: выводятся и пишутся только изменения битов"""
+        if raw is None:
+            self.log_error("Неверный формат данных" if result else "Нет данных от устройства")
+            return
+        
+        timestamp = time.time()
+        started = time.perf_counter()
+        events = self.edges.update(timestamp, decode_detectors_bytes(raw))
+        self.decode_metric.observe(time.perf_counter() - started)
+        for event in events:
+            self.print(format_event(event))
+        
+        started = time.perf_counter()
+        if self.binary_log is not None and result != self.previous_raw_data:
+            self.binary_log.write(timestamp, raw)
+        self.previous_raw_data = result
+        if self.events_log is not None:
+            self.events_log.write_events(events)
+        self.log_metric.observe(time.perf_counter() - started)
     
-    skip_message = f"[{get_current_datetime()}] Пропуск одинаковых ответов: {'ВКЛЮЧЕН' if SKIP_DUPLICATES else 'ВЫКЛЮЧЕН'}"
-    logger.write_both_logs(skip_message, skip_message)
+    def process_sample(self, sample, objects):
+        """Обрабатывает выборку get_sample: детекторы и дополнительные объекты UG405"""
+        self.process(sample['detectors'])
+        if not objects or sample['time'] is None:
+            return
+        
+        # Значения объектов меняются редко - пишем только изменения
+        objects_text = format_sample_objects(sample, objects)
+        if objects_text != self.previous_objects:
+            self.previous_objects = objects_text
+            message = f"Объекты UG405: {objects_text}"
+            self.print(f"[{get_current_time_with_ms()}] {message}")
+            current_datetime = get_current_datetime()
+            self.logger.write_both_logs(f"[{current_datetime}] {message}", f"[{current_datetime}] {message}")
     
-    while True:
-        result = await get_ug405(ip)
+    def process(self, result):
+        """Обрабатывает один ответ get_ug405 ('0x...' или сырые bytes)"""
+        logger = self.logger
+        
+        if isinstance(result, (bytes, bytearray)):
+            raw = bytes(result)
+            result = '0x' + raw.hex()
+        else:
+            raw = hex_to_raw(result)
+        
+        if raw is not None and self.needs_nibbles:
+            timestamp = time.time()
+            nibbles = decode_detectors_bytes(raw)
+            if self.dashboard is not None:
+                self.dashboard.update(logger.ip_address, timestamp, nibbles)
+            if self.push is not None:
+                self.push.publish(logger.ip_address, timestamp, nibbles)
+            if self.state is not None:
+                self.state.publish(timestamp, nibbles)
+            if self.matrix is not None and nibbles:
+                self.matrix.write(timestamp, nibbles)
+            if self.stats is not None:
+                records = self.stats.update(timestamp, nibbles)
+                if records:
+                    self.stats_log.write_records(records)
+        elif raw is None:
+            if self.state is not None:
+                self.state.publish_missing(time.time())
+            if self.dashboard is not None:
+                self.dashboard.mark_missing(logger.ip_address, time.time())
+        
+        if self.edges is not None:
+            self.process_events(result, raw)
+            return
         
         if result:
             # Проверяем, нужно ли пропускать одинаковые ответы
-            if SKIP_DUPLICATES and result == previous_raw_data:
+            if SKIP_DUPLICATES and result == self.previous_raw_data:
                 # Данные повторяются и пропуск включен - не выводим
-                current_time = get_current_time_with_ms()
-                # print(f"[{current_time}] 🟡 Данные не изменились, пропускаем вывод")
                 pass  # Полностью пропускаем вывод
             else:
                 # Данные новые или пропуск выключен - выводим как обычно
@@ -304,72 +228,245 @@ async def main():
                 current_datetime = get_current_datetime()
                 
                 # Добавляем отметку о дубликате, если это повторяющиеся данные при выключенном пропуске
-                duplicate_marker = "" if not SKIP_DUPLICATES and result == previous_raw_data else ""
+                duplicate_marker = "" if not SKIP_DUPLICATES and result == self.previous_raw_data else ""
                 
                 terminal_message = f"[{current_time}] Raw data: '{result}'{duplicate_marker}"
                 log_message = f"[{current_datetime}] Raw data: '{result}'{duplicate_marker}"
                 
-                print(terminal_message)
+                self.print(terminal_message)
                 # Сырые данные пишем в оба лога
+                started = time.perf_counter()
                 logger.write_both_logs(log_message, log_message)
+                if self.binary_log is not None and raw is not None:
+                    self.binary_log.write(time.time(), raw)
+                log_seconds = time.perf_counter() - started
                 
                 # Парсим статусы детекторов
-                detectors = parse_detectors_status(result)
+                started = time.perf_counter()
+                if raw is not None:
+                    detectors = decode_detectors_bytes(raw)
+                else:
+                    detectors = parse_detectors_status(result)
                 
                 # Если первый запуск, определяем количество детекторов
-                if first_run and detectors:
-                    num_detectors = len(detectors)
-                    detectors_message = f"Обнаружено детекторов: {num_detectors}"
-                    print(detectors_message)
+                if self.first_run and detectors:
+                    self.num_detectors = len(detectors)
+                    detectors_message = f"Обнаружено детекторов: {self.num_detectors}"
+                    self.print(detectors_message)
                     logger.write_both_logs(
                         f"[{get_current_datetime()}] {detectors_message}", 
                         f"[{get_current_datetime()}] {detectors_message}"
                     )
-                    first_run = False
+                    self.first_run = False
                 
                 if detectors:
                     # Переупорядочиваем детекторы
-                    reordered_detectors = reorder_detectors(detectors)
+                    if raw is not None:
+                        reordered_detectors = nibbles_to_chars(detectors)
+                    else:
+                        reordered_detectors = reorder_detectors(detectors)
                     
                     # Генерируем вывод для обоих режимов
-                    light_output = print_light_output(reordered_detectors, num_detectors)
-                    full_output = print_full_output(reordered_detectors, num_detectors)
+                    light_output = print_light_output(reordered_detectors, self.num_detectors)
+                    full_output = print_full_output(reordered_detectors, self.num_detectors)
+                    self.decode_metric.observe(time.perf_counter() - started)
                     
                     # Выводим в терминал в зависимости от текущего режима
                     if SCAN_MODE == 'light':
-                        print(light_output)
+                        self.print(light_output)
                     else:  # full mode
-                        print(full_output)
+                        self.print(full_output)
                     
                     # Логируем в соответствующие файлы
+                    started = time.perf_counter()
                     logger.write_light_log(f"[{current_datetime}] {light_output}")
                     
                     # Для полного режима логируем каждую строку отдельно
                     for line in full_output.split('\n'):
                         logger.write_full_log(f"[{current_datetime}] {line}")
+                    log_seconds += time.perf_counter() - started
                         
                 else:
                     error_message = "Неверный формат данных"
-                    print(f"[{current_time}] {error_message}")
+                    self.print(f"[{current_time}] {error_message}")
                     logger.write_both_logs(
                         f"[{current_datetime}] {error_message}", 
                         f"[{current_datetime}] {error_message}"
                     )
                 
+                self.log_metric.observe(log_seconds)
+                
                 # Сохраняем текущие данные как предыдущие
-                previous_raw_data = result
+                self.previous_raw_data = result
                 
         else:
             current_time = get_current_time_with_ms()
             current_datetime = get_current_datetime()
             error_message = "Нет данных от устройства"
-            print(f"[{current_time}] {error_message}")
+            self.print(f"[{current_time}] {error_message}")
             logger.write_both_logs(
                 f"[{current_datetime}] {error_message}", 
                 f"[{current_datetime}] {error_message}"
             )
 
-        await asyncio.sleep(0.2)
+def make_pipeline(controller, log_dir, log=None, echo=True, prefix="", state=None, dashboard=None):
+    """Конвейер контроллера (или одного его SCN) с логами по настройкам .env"""
+    if log is None:
+        log = DualLogger(controller, log_dir)
+    binary_log = None
+    if BINARY_LOG:
+        from potok_dt_binlog import BinarySampleLog
+        binary_log = BinarySampleLog(log_dir, controller)
+    edges = None
+    events_log = None
+    if OUTPUT_MODE == 'events':
+        edges = EdgeDetector(controller)
+        events_log = EventLog(log_dir)
+    stats = None
+    stats_log = None
+    if STATS:
+        stats = DetectorStats(controller)
+        stats_log = StatsLog(log_dir)
+    matrix = None
+    if MATRIX_EXPORT:
+        from potok_dt_matrix import DayMatrixWriter
+        matrix = DayMatrixWriter(log_dir)
+    return DetectorPipeline(
+        log,
+        # С экраном состояния построчный вывод выключен
+        echo=echo and dashboard is None,
+        prefix=prefix,
+        binary_log=binary_log,
+        edges=edges,
+        events_log=events_log,
+        stats=stats,
+        stats_log=stats_log,
+        matrix=matrix,
+        state=state,
+        push=hub if PUSH_PORT else None,
+        dashboard=dashboard,
+    )
+
+class ScnPipelines:
+    """Конвейеры по SCN контроллера (SCN_DISCOVERY=all), логи в подпапке SCN"""
+    
+    def __init__(self, ip, log_dir, echo=True, prefix="", dashboard=None):
+        self.ip = ip
+        self.log_dir = log_dir
+        self.echo = echo
+        self.prefix = prefix
+        self.dashboard = dashboard
+        self.pipelines = {}
+    
+    def get(self, scn):
+        pipeline = self.pipelines.get(scn)
+        if pipeline is None:
+            pipeline = make_pipeline(
+                f"{self.ip}_{scn}",
+                os.path.join(self.log_dir, scn),
+                echo=self.echo,
+                prefix=f"{self.prefix}[{scn}] ",
+                dashboard=self.dashboard,
+            )
+            self.pipelines[scn] = pipeline
+        return pipeline
+    
+    def process(self, statuses):
+        """Обрабатывает результат get_all_detectors"""
+        if statuses is None:
+            # Таблицу SCN получить не удалось: ошибка во все известные конвейеры
+            for pipeline in self.pipelines.values():
+                pipeline.process(None)
+            return
+        for scn, raw in statuses.items():
+            self.get(scn).process(raw)
+
+async def main():
+    ip = IP_ADDRESS
+    # Экран состояния вместо построчного вывода (OUTPUT_MODE=dashboard)
+    dashboard = None
+    if OUTPUT_MODE == 'dashboard':
+        from potok_dt_dashboard import Dashboard
+        dashboard = Dashboard()
+    pipeline = make_pipeline(ip, LOG_DIR, log=logger, dashboard=dashboard)
+    
+    print(f"Режим сканирования: {SCAN_MODE}")
+    print(f"Режим вывода: {OUTPUT_MODE}")
+    print(f"IP адрес: {ip}")
+    print(f"Пропуск одинаковых ответов: {'ВКЛЮЧЕН' if SKIP_DUPLICATES else 'ВЫКЛЮЧЕН'}")
+    print(f"Логи сохраняются в папку: {LOG_DIR}")
+    print(f"Созданы два лог-файла: light и full режимы")
+    start_metrics_server()
+    await start_push_server()
+    
+    # Логируем начало работы в оба файла
+    start_message = f"[{get_current_datetime()}] Запуск мониторинга"
+    logger.write_both_logs(start_message, start_message)
+    
+    mode_message = f"[{get_current_datetime()}] Режим сканирования: {SCAN_MODE}"
+    logger.write_both_logs(mode_message, mode_message)
+    
+    ip_message = f"[{get_current_datetime()}] IP адрес: {ip}"
+    logger.write_both_logs(ip_message, ip_message)
+    
+    skip_message = f"[{get_current_datetime()}] Пропуск одинаковых ответов: {'ВКЛЮЧЕН' if SKIP_DUPLICATES else 'ВЫКЛЮЧЕН'}"
+    logger.write_both_logs(skip_message, skip_message)
+    
+    # Находим SCN один раз, дальше каждый опрос - один GET
+    scn_pipelines = None
+    if SCN_DISCOVERY == 'all':
+        # Все SCN таблицы, статусы детекторов запрашиваются пачками OID
+        scn_pipelines = ScnPipelines(ip, LOG_DIR, dashboard=dashboard)
+        scn_table = await discover_all_scns(get_client(ip)) or []
+        scn_message = f"[{get_current_datetime()}] Найдено SCN: {len(scn_table)} ({', '.join(scn for scn, _ in scn_table)})"
+    else:
+        scn_suffix = await get_client(ip).discover()
+        scn_message = f"[{get_current_datetime()}] Суффикс SCN: {scn_suffix}"
+    print(scn_message)
+    logger.write_both_logs(scn_message, scn_message)
+    
+    # Дополнительные объекты UG405 опрашиваются в том же PDU, что и детекторы
+    objects = parse_objects(UG405_OBJECTS)
+    if objects:
+        objects_message = f"[{get_current_datetime()}] Объекты UG405: {', '.join(obj.name for obj in objects)}"
+        print(objects_message)
+        logger.write_both_logs(objects_message, objects_message)
+    
+    poll_interval = POLL_INTERVAL
+    if TRAP_LISTENER:
+        # Изменения приходят уведомлениями, опрос остается редкой сверкой
+        def on_trap(source_ip, scn, raw):
+            if source_ip != ip:
+                return
+            if scn_pipelines is not None:
+                scn_pipelines.get(scn).process(raw)
+            elif get_client(ip).scn_suffix in (None, scn_to_oid_suffix(scn)):
+                pipeline.process(raw)
+        
+        await start_trap_receiver(on_trap)
+        poll_interval = RECONCILE_INTERVAL
+        trap_message = f"[{get_current_datetime()}] Прием trap/inform на порту {TRAP_PORT}, сверочный опрос раз в {poll_interval} с"
+        print(trap_message)
+        logger.write_both_logs(trap_message, trap_message)
+    
+    if dashboard is not None:
+        # Ссылка на задачу хранится, иначе ее может собрать сборщик мусора
+        dashboard_task = asyncio.create_task(dashboard.run())
+    
+    # Опрос с постоянным периодом: сроки тактов не зависят от времени запроса
+    scheduler = FixedRateScheduler(poll_interval)
+    
+    while True:
+        missed = await scheduler.wait()
+        if missed:
+            pipeline.print(f"[{get_current_time_with_ms()}] Пропущено тактов: {missed} (опрос дольше периода {poll_interval} с)")
+        if scn_pipelines is not None:
+            scn_pipelines.process(await get_all_detectors(get_client(ip)))
+        elif objects:
+            pipeline.process_sample(await get_sample(get_client(ip), objects), objects)
+        else:
+            result = await get_ug405(ip)
+            pipeline.process(result)
 
 if __name__ == "__main__":
     try:
@@ -385,3 +482,6 @@ if __name__ == "__main__":
             f"[{get_current_datetime()}] {error_msg}", 
             f"[{get_current_datetime()}] {error_msg}"
         )
+    finally:
+        # Последние строки (в т.ч. сообщение об остановке) сбрасываются на диск сразу
+        logger.close()
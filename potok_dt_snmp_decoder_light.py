@@ -1,50 +1,7 @@
 import asyncio
-import ipaddress
 import time
-from pysnmp.hlapi.asyncio import *
-
-async def snmp_get_request(ip, community, oid):
-    """Асинхронный SNMP GET запрос"""
-    error_indication, error_status, error_index, var_binds = await getCmd(
-        SnmpEngine(),
-        CommunityData(community),
-        UdpTransportTarget((ip, 161)),
-        ContextData(),
-        ObjectType(ObjectIdentity(oid)),
-        lexicographicMode=True,
-    )
-    
-    if error_indication:
-        return None
-    if error_status:
-        return None
-
-    for name, val in var_binds:
-        return val.prettyPrint()
-
-async def snmp_get_next_request(ip, community, oid):
-    """Асинхронный SNMP GET NEXT запрос"""
-    error_indication, error_status, error_index, var_binds = await nextCmd(
-        SnmpEngine(),
-        CommunityData(community),
-        UdpTransportTarget((ip, 161)),
-        ContextData(),
-        ObjectType(ObjectIdentity(oid)),
-        lexicographicMode=True,
-    )
-
-    if error_indication:
-        return None
-    if error_status:
-        return None
-
-    # Извлекаем SCN
-    co = var_binds[0][0][1].prettyPrint()
-    len_scn = str(len(co)) + "."
-    scn = [str(ord(c)) for c in co]
-    scn = ".".join(scn)
-    scn = f".1.{len_scn}{scn}"
-    return scn
+from potok_dt_schedule import FixedRateScheduler
+from potok_dt_snmp_client import get_client, get_ug405
 
 def parse_detectors_status(hex_string):
     """Парсит hex-строку и возвращает статусы детекторов"""
@@ -99,32 +56,21 @@ def get_current_time_with_ms():
     time_struct = time.localtime(current_time)
     return time.strftime("%H:%M:%S", time_struct) + f".{milliseconds:03d}"
 
-async def get_ug405(ip_address):
-    try:
-        ipaddress.IPv4Address(ip_address)
-    except ipaddress.AddressValueError:
-        return "Invalid IP Address"
-
-    community_string = "UTMC"
-    oid_get_request = ".1.3.6.1.4.1.13267.3.2.4.2.1.15"
-    
-    # Получаем SCN
-    old_str = await snmp_get_next_request(ip_address, community_string, oid_get_request)
-    
-    if old_str is not None:
-        # Получаем статус детекторов
-        oid_get = f".1.3.6.1.4.1.13267.3.2.5.1.1.32{old_str}"
-        response = await snmp_get_request(ip_address, community_string, oid_get)
-        return response
-    
-    return None
-
 async def main():
     ip = "10.45.154.11"
     num_detectors = 0
     first_run = True
     
+    # Находим SCN один раз, дальше каждый опрос - один GET
+    await get_client(ip).discover()
+    
+    # Период 0.5 с считается от сроков тактов, а не от конца запроса
+    scheduler = FixedRateScheduler(0.5)
+    
     while True:
+        missed = await scheduler.wait()
+        if missed:
+            print(f"[{get_current_time_with_ms()}] Пропущено тактов: {missed}")
         result = await get_ug405(ip)
         
         if result:
@@ -163,8 +109,6 @@ async def main():
         else:
             current_time = get_current_time_with_ms()
             print(f"[{current_time}] Нет данных от устройства")
-        
-        await asyncio.sleep(0.5)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,436 @@
+import asyncio
+import random
+import time
+from potok_dt_metrics import STAGE_DETECTOR_GET, STAGE_SCN_GETNEXT, stage_histogram
+from potok_dt_snmp_client import (
+    COMMUNITY_STRING,
+    OID_DETECTORS,
+    OID_SCN,
+    SNMP_PORT,
+    controller_label,
+    scn_to_oid_suffix,
+)
+
+# Минимальный BER кодек SNMPv2c для коротких GET/GETNEXT запросов без pysnmp
+
+SNMP_VERSION_2C = 1
+
+# Теги ASN.1 / SNMP
+TAG_INTEGER = 0x02
+TAG_OCTET_STRING = 0x04
+TAG_NULL = 0x05
+TAG_OID = 0x06
+TAG_SEQUENCE = 0x30
+TAG_IP_ADDRESS = 0x40
+TAG_COUNTER32 = 0x41
+TAG_GAUGE32 = 0x42
+TAG_TIMETICKS = 0x43
+TAG_OPAQUE = 0x44
+TAG_COUNTER64 = 0x46
+TAG_NO_SUCH_OBJECT = 0x80
+TAG_NO_SUCH_INSTANCE = 0x81
+TAG_END_OF_MIB_VIEW = 0x82
+
+# Типы PDU
+PDU_GET = 0xA0
+PDU_GET_NEXT = 0xA1
+PDU_RESPONSE = 0xA2
+PDU_SET = 0xA3
+PDU_GET_BULK = 0xA5
+PDU_INFORM = 0xA6
+PDU_TRAP_V2 = 0xA7
+PDU_REPORT = 0xA8
+
+# Значения-исключения SNMPv2 (RFC 3416)
+EXCEPTION_TAGS = (TAG_NO_SUCH_OBJECT, TAG_NO_SUCH_INSTANCE, TAG_END_OF_MIB_VIEW)
+
+UNSIGNED_TAGS = (TAG_COUNTER32, TAG_GAUGE32, TAG_TIMETICKS, TAG_COUNTER64)
+
+
+class SnmpDecodeError(ValueError):
+    """Пакет не разбирается как сообщение SNMPv2c"""
+
+
+def parse_oid(oid):
+    """Преобразует строку '.1.3.6...' или кортеж в кортеж чисел"""
+    if isinstance(oid, tuple):
+        return oid
+    return tuple(int(arc) for arc in oid.strip('.').split('.'))
+
+
+def encode_length(length):
+    """Кодирует длину BER (короткая или длинная форма)"""
+    if length < 0x80:
+        return bytes((length,))
+    body = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes((0x80 | len(body),)) + body
+
+
+def encode_tlv(tag, value):
+    return bytes((tag,)) + encode_length(len(value)) + value
+
+
+def encode_integer(value, tag=TAG_INTEGER):
+    """Кодирует INTEGER минимальным числом байт в дополнительном коде"""
+    length = max(1, (value + (value < 0)).bit_length() // 8 + 1)
+    return encode_tlv(tag, value.to_bytes(length, 'big', signed=True))
+
+
+def encode_oid(oid):
+    """Кодирует OBJECT IDENTIFIER"""
+    arcs = parse_oid(oid)
+    body = bytearray((arcs[0] * 40 + arcs[1],))
+    for arc in arcs[2:]:
+        if arc < 0x80:
+            body.append(arc)
+            continue
+        chunk = bytearray()
+        while arc:
+            chunk.append((arc & 0x7F) | 0x80)
+            arc >>= 7
+        chunk[0] &= 0x7F
+        chunk.reverse()
+        body += chunk
+    return encode_tlv(TAG_OID, bytes(body))
+
+
+def encode_value(tag, value):
+    """Кодирует значение varbind по тегу"""
+    if tag == TAG_NULL or tag in EXCEPTION_TAGS:
+        return bytes((tag, 0))
+    if tag == TAG_INTEGER:
+        return encode_integer(value)
+    if tag == TAG_OID:
+        return encode_oid(value)
+    if tag in UNSIGNED_TAGS:
+        length = value.bit_length() // 8 + 1
+        return encode_tlv(tag, value.to_bytes(length, 'big'))
+    return encode_tlv(tag, bytes(value))
+
+
+def encode_message(pdu_type, request_id, varbinds, community=COMMUNITY_STRING,
+                   error_status=0, error_index=0):
+    """Собирает сообщение SNMPv2c.
+
+    varbinds - список (oid, тег, значение); для запросов значение NULL:
+    (oid, TAG_NULL, None). Для GETBULK error_status/error_index - это
+    non-repeaters и max-repetitions.
+    """
+    encoded_varbinds = b''.join(
+        encode_tlv(TAG_SEQUENCE, encode_oid(oid) + encode_value(tag, value))
+        for oid, tag, value in varbinds
+    )
+    pdu = encode_tlv(
+        pdu_type,
+        encode_integer(request_id)
+        + encode_integer(error_status)
+        + encode_integer(error_index)
+        + encode_tlv(TAG_SEQUENCE, encoded_varbinds),
+    )
+    if isinstance(community, str):
+        community = community.encode()
+    return encode_tlv(
+        TAG_SEQUENCE,
+        encode_integer(SNMP_VERSION_2C) + encode_tlv(TAG_OCTET_STRING, community) + pdu,
+    )
+
+
+def encode_get_request(request_id, oids, community=COMMUNITY_STRING, pdu_type=PDU_GET):
+    """GET (или GETNEXT) для списка OID"""
+    return encode_message(pdu_type, request_id, [(oid, TAG_NULL, None) for oid in oids], community)
+
+
+def decode_tlv(data, offset):
+    """Читает TLV, возвращает (тег, начало значения, конец значения)"""
+    try:
+        tag = data[offset]
+        length = data[offset + 1]
+        offset += 2
+        if length & 0x80:
+            num_bytes = length & 0x7F
+            length = int.from_bytes(data[offset:offset + num_bytes], 'big')
+            offset += num_bytes
+    except IndexError:
+        raise SnmpDecodeError("обрезанный пакет")
+    end = offset + length
+    if end > len(data):
+        raise SnmpDecodeError("обрезанный пакет")
+    return tag, offset, end
+
+
+def decode_oid(body):
+    """Декодирует тело OBJECT IDENTIFIER в кортеж"""
+    if not body:
+        return ()
+    first = body[0]
+    arcs = [min(first // 40, 2), first - 40 * min(first // 40, 2)]
+    arc = 0
+    for byte in body[1:]:
+        arc = (arc << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(arc)
+            arc = 0
+    return tuple(arcs)
+
+
+def decode_value(tag, body):
+    """Декодирует значение varbind по тегу"""
+    if tag == TAG_INTEGER:
+        return int.from_bytes(body, 'big', signed=True)
+    if tag in UNSIGNED_TAGS:
+        return int.from_bytes(body, 'big')
+    if tag == TAG_OID:
+        return decode_oid(body)
+    if tag == TAG_NULL or tag in EXCEPTION_TAGS:
+        return None
+    return bytes(body)
+
+
+def decode_message(data):
+    """Разбирает сообщение SNMPv2c.
+
+    Возвращает словарь: version, community, pdu_type, request_id,
+    error_status, error_index, varbinds [(oid кортеж, тег, значение)].
+    """
+    data = memoryview(data)
+    tag, start, end = decode_tlv(data, 0)
+    if tag != TAG_SEQUENCE:
+        raise SnmpDecodeError("ожидалась SEQUENCE")
+
+    tag, pos, value_end = decode_tlv(data, start)
+    if tag != TAG_INTEGER:
+        raise SnmpDecodeError("ожидалась версия")
+    version = int.from_bytes(data[pos:value_end], 'big', signed=True)
+
+    tag, pos, value_end = decode_tlv(data, value_end)
+    if tag != TAG_OCTET_STRING:
+        raise SnmpDecodeError("ожидалось community")
+    community = bytes(data[pos:value_end])
+
+    pdu_type, pos, pdu_end = decode_tlv(data, value_end)
+    header = []
+    for _ in range(3):
+        tag, pos, value_end = decode_tlv(data, pos)
+        if tag != TAG_INTEGER:
+            raise SnmpDecodeError("ожидался INTEGER в заголовке PDU")
+        header.append(int.from_bytes(data[pos:value_end], 'big', signed=True))
+        pos = value_end
+
+    tag, pos, list_end = decode_tlv(data, pos)
+    if tag != TAG_SEQUENCE:
+        raise SnmpDecodeError("ожидался список varbind")
+
+    varbinds = []
+    while pos < list_end:
+        tag, vb_pos, vb_end = decode_tlv(data, pos)
+        oid_tag, oid_pos, oid_end = decode_tlv(data, vb_pos)
+        if oid_tag != TAG_OID:
+            raise SnmpDecodeError("ожидался OID в varbind")
+        value_tag, value_pos, value_end = decode_tlv(data, oid_end)
+        varbinds.append((
+            decode_oid(data[oid_pos:oid_end]),
+            value_tag,
+            decode_value(value_tag, data[value_pos:value_end]),
+        ))
+        pos = vb_end
+
+    return {
+        'version': version,
+        'community': community,
+        'pdu_type': pdu_type,
+        'request_id': header[0],
+        'error_status': header[1],
+        'error_index': header[2],
+        'varbinds': varbinds,
+    }
+
+
+class FastSnmpProtocol(asyncio.DatagramProtocol):
+    """UDP протокол: сопоставляет ответы с ожидающими запросами по request-id.
+
+    Ответом считается только SNMPv2c GetResponse с community клиента;
+    прочие датаграммы с совпавшим request-id отбрасываются.
+    """
+
+    def __init__(self, community=COMMUNITY_STRING):
+        self.community = community.encode() if isinstance(community, str) else community
+        self.transport = None
+        self.pending = {}
+        self.rejected = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            message = decode_message(data)
+        except SnmpDecodeError:
+            return
+        if (
+            message['version'] != SNMP_VERSION_2C
+            or message['community'] != self.community
+            or message['pdu_type'] != PDU_RESPONSE
+        ):
+            self.rejected += 1
+            return
+        future = self.pending.pop(message['request_id'], None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def error_received(self, exc):
+        # ICMP port unreachable и т.п. - запрос завершится по таймауту
+        pass
+
+    def connection_lost(self, exc):
+        for future in self.pending.values():
+            if not future.done():
+                future.cancel()
+        self.pending.clear()
+
+
+class FastSnmpClient:
+    """Легкий SNMPv2c клиент без pysnmp, интерфейс как у SnmpPollerClient"""
+
+    def __init__(self, ip, community=COMMUNITY_STRING, port=SNMP_PORT, timeout=1, retries=5):
+        self.ip = ip
+        self.community = community.encode() if isinstance(community, str) else community
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.protocol = None
+        self._connect_lock = None
+        self._request_id = random.randrange(1, 0x7FFFFFFF)
+        # Кэш суффикса OID для SCN, заполняется при discover()
+        self.scn_suffix = None
+        # Все строки таблицы SCN [(SCN, суффикс)], заполняется discover_all_scns()
+        self.scn_table = None
+        # Гистограммы длительности запросов
+        self.scn_metric = stage_histogram(STAGE_SCN_GETNEXT, controller_label(ip, port))
+        self.get_metric = stage_histogram(STAGE_DETECTOR_GET, controller_label(ip, port))
+
+    async def _ensure_protocol(self):
+        if self.protocol is not None:
+            return self.protocol
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.protocol is None:
+                loop = asyncio.get_running_loop()
+                transport, protocol = await loop.create_datagram_endpoint(
+                    lambda: FastSnmpProtocol(self.community), remote_addr=(self.ip, self.port)
+                )
+                self.protocol = protocol
+        return self.protocol
+
+    def _next_request_id(self):
+        self._request_id = self._request_id % 0x7FFFFFFF + 1
+        return self._request_id
+
+    async def request(self, pdu_type, oids, non_repeaters=0, max_repetitions=0):
+        """Отправляет запрос с повторами, возвращает разобранный ответ или None"""
+        protocol = await self._ensure_protocol()
+        loop = asyncio.get_running_loop()
+
+        for _ in range(self.retries + 1):
+            request_id = self._next_request_id()
+            packet = encode_message(
+                pdu_type,
+                request_id,
+                [(oid, TAG_NULL, None) for oid in oids],
+                self.community,
+                non_repeaters,
+                max_repetitions,
+            )
+            future = loop.create_future()
+            protocol.pending[request_id] = future
+            protocol.transport.sendto(packet)
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                protocol.pending.pop(request_id, None)
+
+        return None
+
+    async def get_raw(self, oid):
+        """GET одного OID, возвращает (тег, значение) или None при ошибке"""
+        response = await self.request(PDU_GET, [oid])
+        if response is None or response['error_status'] or not response['varbinds']:
+            return None
+        oid, tag, value = response['varbinds'][0]
+        return tag, value
+
+    async def get_many(self, oids):
+        """Один GET на несколько OID, значения по порядку или None"""
+        response = await self.request(PDU_GET, oids)
+        if response is None or response['error_status']:
+            return None
+        return [value for oid, tag, value in response['varbinds']]
+
+    async def get_bulk(self, oids, max_repetitions, non_repeaters=0):
+        """Один GETBULK, возвращает [(кортеж OID, значение)] построчно или None"""
+        response = await self.request(PDU_GET_BULK, oids, non_repeaters, max_repetitions)
+        if response is None or response['error_status']:
+            return None
+        return [(oid, value) for oid, tag, value in response['varbinds']]
+
+    async def get(self, oid):
+        """GET одного OID, OctetString возвращается как '0x...'"""
+        result = await self.get_raw(oid)
+        if result is None:
+            return None
+        tag, value = result
+        if tag == TAG_OCTET_STRING:
+            return '0x' + value.hex()
+        return str(value)
+
+    async def get_next_scn(self, oid=OID_SCN):
+        """GETNEXT по столбцу SCN, возвращает суффикс OID для первого SCN"""
+        started = time.perf_counter()
+        response = await self.request(PDU_GET_NEXT, [oid])
+        self.scn_metric.observe(time.perf_counter() - started)
+        if response is None or response['error_status'] or not response['varbinds']:
+            return None
+        oid, tag, value = response['varbinds'][0]
+        if tag != TAG_OCTET_STRING:
+            return None
+        return scn_to_oid_suffix(value.decode('latin-1'))
+
+    async def discover(self):
+        """Находит SCN и запоминает суффикс OID для последующих опросов"""
+        self.scn_suffix = await self.get_next_scn()
+        return self.scn_suffix
+
+    def invalidate_scn(self):
+        """Сбрасывает кэш SCN, при следующем опросе он будет найден заново"""
+        self.scn_suffix = None
+
+    async def get_ug405_raw(self):
+        """Статус детекторов как bytes (OctetString без prettyPrint) или None"""
+        old_str = self.scn_suffix
+        if old_str is None:
+            old_str = await self.discover()
+            if old_str is None:
+                return None
+
+        started = time.perf_counter()
+        result = await self.get_raw(f"{OID_DETECTORS}{old_str}")
+        self.get_metric.observe(time.perf_counter() - started)
+        if result is None or result[0] != TAG_OCTET_STRING:
+            # Ошибка или noSuchInstance - SCN мог смениться
+            self.invalidate_scn()
+            return None
+        return result[1]
+
+    async def get_ug405(self):
+        """Статус детекторов в том же виде, что и у pysnmp ('0x...')"""
+        raw = await self.get_ug405_raw()
+        if raw is None:
+            return None
+        return '0x' + raw.hex()
+
+    def close(self):
+        if self.protocol is not None and self.protocol.transport is not None:
+            self.protocol.transport.close()
+        self.protocol = None
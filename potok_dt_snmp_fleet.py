@@ -0,0 +1,330 @@
+import asyncio
+import ipaddress
+import multiprocessing
+import os
+import random
+import time
+from potok_dt_events import OUTPUT_MODE
+from potok_dt_metrics import METRICS_PORT, start_metrics_server
+from potok_dt_push import PUSH_PORT, start_push_server
+from potok_dt_schedule import FixedRateScheduler
+from potok_dt_snmp_client import (
+    COMMUNITY_STRING,
+    SCN_DISCOVERY,
+    UG405_OBJECTS,
+    discover_all_scns,
+    get_all_detectors,
+    get_client,
+    get_sample,
+    parse_objects,
+    scn_to_oid_suffix,
+)
+from potok_dt_snmp_decoder import (
+    LOG_DIR,
+    DualLogger,
+    ScnPipelines,
+    get_current_datetime,
+    make_pipeline,
+)
+from potok_dt_state import STATE_NAME, StateSlot, StateTable
+from potok_dt_snmp_trap import RECONCILE_INTERVAL, TRAP_LISTENER, TRAP_PORT, start_trap_receiver
+
+# Загрузка констант из .env
+CONTROLLERS_FILE = os.getenv('CONTROLLERS_FILE', 'controllers.txt')
+POLL_INTERVAL = float(os.getenv('POLL_INTERVAL', '0.2'))  # Период опроса по умолчанию, с
+MAX_CONCURRENCY = int(os.getenv('FLEET_CONCURRENCY', '200'))  # Одновременных SNMP запросов
+SNMP_TIMEOUT = float(os.getenv('SNMP_TIMEOUT', '0.5'))
+SNMP_RETRIES = int(os.getenv('SNMP_RETRIES', '1'))
+FLEET_ECHO = os.getenv('FLEET_ECHO', 'false').lower() == 'true'  # Вывод в терминал
+FLEET_WORKERS = int(os.getenv('FLEET_WORKERS', '1'))  # Процессов опроса, контроллеры делятся между ними
+FLEET_BACKOFF_MAX = float(os.getenv('FLEET_BACKOFF_MAX', '60'))  # Наибольшая пауза после ошибок контроллера, с
+
+# Открытых файлов на контроллер: UDP сокет, light/full, бинарный журнал,
+# журнал событий, матрица и времена, статистика
+FDS_PER_CONTROLLER = 8
+FDS_RESERVE = 64  # stdin/stdout, эндпоинты метрик и потока изменений, trap, импорт
+
+# Обработчики уведомлений по ip контроллера (TRAP_LISTENER=true)
+trap_handlers = {}
+
+
+def dispatch_trap(source_ip, scn, raw):
+    """Передает статус детекторов из trap конвейеру контроллера-отправителя"""
+    handler = trap_handlers.get(source_ip)
+    if handler is not None:
+        handler(scn, raw)
+
+
+class Controller:
+    """Описание контроллера из списка"""
+
+    def __init__(self, ip, community=COMMUNITY_STRING, interval=POLL_INTERVAL, objects=UG405_OBJECTS):
+        self.ip = ip
+        self.community = community
+        self.interval = interval
+        # Дополнительные объекты UG405 (формат UG405_OBJECTS)
+        self.objects = parse_objects(objects)
+        # Номер слота в таблице состояния (по порядку в списке)
+        self.slot = None
+
+
+def load_controllers(path):
+    """Читает список контроллеров.
+
+    Одна строка - один контроллер: ip[,community[,интервал_опроса_с[,объекты]]],
+    объекты - в формате UG405_OBJECTS (по умолчанию из .env).
+    Пустые строки и строки с # пропускаются, ошибочные - пропускаются
+    с сообщением, чтобы одна строка не мешала опросу остальных.
+    """
+    controllers = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+
+            parts = [part.strip() for part in line.split(',')]
+            ip = parts[0]
+            community = parts[1] if len(parts) > 1 and parts[1] else COMMUNITY_STRING
+            objects = parts[3] if len(parts) > 3 and parts[3] else UG405_OBJECTS
+            try:
+                ipaddress.IPv4Address(ip)
+                interval = float(parts[2]) if len(parts) > 2 and parts[2] else POLL_INTERVAL
+                if interval <= 0:
+                    raise ValueError(f"период опроса должен быть больше 0: {interval}")
+                controller = Controller(ip, community, interval, objects)
+            except ValueError as e:
+                print(f"⚠️ {path}:{number}: строка пропущена ({e})")
+                continue
+            controllers.append(controller)
+
+    return controllers
+
+
+def raise_fd_limit(count):
+    """Поднимает мягкий лимит открытых файлов (RLIMIT_NOFILE) под размер парка.
+
+    Мягкий лимит 1024 кончается примерно на 120 контроллерах, дальше
+    open()/socket() падают с EMFILE. Поднимается не выше жесткого лимита,
+    если и его мало - печатается предупреждение. Процессы опроса
+    (FLEET_WORKERS) наследуют лимит основного процесса.
+    """
+    try:
+        import resource
+    except ImportError:
+        # Windows: лимита RLIMIT_NOFILE нет
+        return
+    needed = FDS_RESERVE + FDS_PER_CONTROLLER * count
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY or soft >= needed:
+        return
+    target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    except (ValueError, OSError) as e:
+        print(f"⚠️ Не удалось поднять лимит открытых файлов: {e}")
+    if soft < needed:
+        print(f"⚠️ Лимит открытых файлов {soft} меньше нужного (~{needed}) для {count} контроллеров, "
+              f"возможны ошибки EMFILE: увеличьте ulimit -n")
+
+
+async def poll_controller(controller, semaphore, state=None, dashboard=None):
+    """Бесконечный опрос одного контроллера.
+
+    Семафор удерживается только на время SNMP запроса, поэтому медленный
+    контроллер занимает один слот и не задерживает опрос остальных.
+    """
+    ip = controller.ip
+    client = get_client(ip, controller.community, timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES)
+    log_dir = os.path.join(LOG_DIR, ip)
+    logger = DualLogger(ip, log_dir)
+    pipeline = make_pipeline(ip, log_dir, log=logger, echo=FLEET_ECHO, prefix=f"[{ip}] ", state=state, dashboard=dashboard)
+    # SCN_DISCOVERY=all - отдельный конвейер и подпапка логов на каждый SCN
+    scn_pipelines = ScnPipelines(ip, log_dir, echo=FLEET_ECHO, prefix=f"[{ip}] ", dashboard=dashboard) if SCN_DISCOVERY == 'all' else None
+
+    start_message = f"[{get_current_datetime()}] Запуск мониторинга (fleet), период {controller.interval} с"
+    logger.write_both_logs(start_message, start_message)
+
+    # Пауза после ошибок: удваивается до FLEET_BACKOFF_MAX, сбрасывается первым удачным опросом
+    failures = 0
+    retry_at = 0.0
+
+    def failed(stage, error):
+        nonlocal failures, retry_at
+        failures += 1
+        backoff = min(controller.interval * 2 ** failures, FLEET_BACKOFF_MAX)
+        retry_at = time.monotonic() + backoff
+        pipeline.print(f"Ошибка {stage}: {error}, повтор через {backoff:.1f} с")
+
+    # Ошибка поиска SCN не останавливает задачу: опрос найдет SCN заново
+    # на следующих тактах (get_ug405/get_sample/get_all_detectors)
+    try:
+        async with semaphore:
+            if scn_pipelines is not None:
+                await discover_all_scns(client)
+            else:
+                await client.discover()
+    except Exception as e:
+        failed("поиска SCN", e)
+
+    interval = controller.interval
+    if TRAP_LISTENER:
+        # Изменения приходят уведомлениями, опрос остается редкой сверкой
+        def on_trap(scn, raw):
+            if scn_pipelines is not None:
+                scn_pipelines.get(scn).process(raw)
+            elif client.scn_suffix in (None, scn_to_oid_suffix(scn)):
+                pipeline.process(raw)
+
+        trap_handlers[ip] = on_trap
+        interval = max(interval, RECONCILE_INTERVAL)
+
+    # Разносим сроки тактов контроллеров по фазе, чтобы запросы не шли одной пачкой
+    scheduler = FixedRateScheduler(
+        interval,
+        start=time.monotonic() + random.uniform(0, interval),
+    )
+
+    while True:
+        missed = await scheduler.wait()
+        if missed:
+            pipeline.print(f"Пропущено тактов: {missed}, опоздание {scheduler.last_lateness * 1000:.1f} мс")
+        if failures and time.monotonic() < retry_at:
+            continue
+        if scn_pipelines is not None:
+            try:
+                async with semaphore:
+                    statuses = await get_all_detectors(client)
+                failures = 0
+            except Exception as e:
+                failed("опроса", e)
+                statuses = None
+            scn_pipelines.process(statuses)
+            continue
+
+        try:
+            async with semaphore:
+                if controller.objects:
+                    sample = await get_sample(client, controller.objects)
+                else:
+                    sample = {'time': None, 'detectors': await client.get_ug405()}
+            failures = 0
+        except Exception as e:
+            # Ошибка одного контроллера не должна останавливать весь парк
+            failed("опроса", e)
+            sample = {'time': None, 'detectors': None}
+        pipeline.process_sample(sample, controller.objects)
+
+
+async def run_controllers(controllers, table=None, concurrency=MAX_CONCURRENCY, traps=TRAP_LISTENER,
+                          push_port=PUSH_PORT, dashboard=None):
+    """Опрос части парка в одном цикле событий (весь парк или доля процесса)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    await start_push_server(push_port)
+    if dashboard is not None:
+        dashboard_task = asyncio.create_task(dashboard.run())
+    if traps:
+        await start_trap_receiver(dispatch_trap)
+        print(f"Прием trap/inform на порту {TRAP_PORT}, сверочный опрос раз в {RECONCILE_INTERVAL} с")
+    await asyncio.gather(*(
+        poll_controller(
+            controller,
+            semaphore,
+            StateSlot(table, controller.slot) if table is not None else None,
+            dashboard,
+        )
+        for controller in controllers
+    ))
+
+
+def run_worker(index, controllers, state_name, concurrency):
+    """Процесс опроса: свой цикл событий над своей долей контроллеров"""
+    # У каждого процесса свои эндпоинты: METRICS_PORT / PUSH_PORT + номер процесса
+    start_metrics_server(METRICS_PORT + index if METRICS_PORT else 0)
+    table = StateTable.attach(state_name, untrack=False) if state_name else None
+    try:
+        asyncio.run(run_controllers(controllers, table, concurrency, traps=False,
+                                    push_port=PUSH_PORT + index if PUSH_PORT else 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if table is not None:
+            table.close()
+
+
+def run_sharded(controllers, state_name, table=None):
+    """Делит контроллеры между FLEET_WORKERS процессами и ждет их завершения.
+
+    С OUTPUT_MODE=dashboard основной процесс рисует экран по таблице состояния.
+    """
+    workers = min(FLEET_WORKERS, len(controllers))
+    concurrency = max(1, MAX_CONCURRENCY // workers)
+    # spawn: дочерний процесс не наследует потоки записи логов родителя
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(index, controllers[index::workers], state_name, concurrency),
+            name=f"fleet-worker-{index}",
+            daemon=True,
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Процессов опроса: {workers}, контроллеров на процесс: ~{len(controllers) // workers}")
+    try:
+        if OUTPUT_MODE == 'dashboard' and table is not None:
+            from potok_dt_dashboard import Dashboard
+            Dashboard().run_table(table, running=lambda: any(process.is_alive() for process in processes))
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+
+def main():
+    controllers = load_controllers(CONTROLLERS_FILE)
+    for slot, controller in enumerate(controllers):
+        controller.slot = slot
+
+    print(f"Контроллеров в списке: {len(controllers)}")
+    print(f"Одновременных запросов: {MAX_CONCURRENCY}")
+    print(f"Логи сохраняются в папку: {LOG_DIR}/<ip>")
+    raise_fd_limit(len(controllers))
+
+    # Таблица последнего состояния: слот на контроллер, читается из других процессов
+    try:
+        table = StateTable.create([controller.ip for controller in controllers]) if STATE_NAME else None
+    except FileExistsError as e:
+        print(f"❌ {e}: задайте другой STATE_NAME или остановите запущенный мониторинг")
+        return
+    if table is not None:
+        print(f"Таблица состояния: {STATE_NAME} ({table.slots} слотов)")
+    try:
+        if FLEET_WORKERS > 1 and controllers:
+            if TRAP_LISTENER:
+                print("⚠️ TRAP_LISTENER работает только с FLEET_WORKERS=1, используется обычный опрос")
+            run_sharded(controllers, STATE_NAME if table is not None else None, table)
+        else:
+            start_metrics_server()
+            dashboard = None
+            if OUTPUT_MODE == 'dashboard':
+                from potok_dt_dashboard import Dashboard
+                dashboard = Dashboard()
+            asyncio.run(run_controllers(controllers, table, dashboard=dashboard))
+    finally:
+        if table is not None:
+            table.close()
+            table.unlink()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nМониторинг остановлен пользователем")
@@ -0,0 +1,112 @@
+import asyncio
+import os
+from potok_dt_snmp_client import COMMUNITY_STRING, OID_DETECTORS
+from potok_dt_snmp_fast import (
+    PDU_INFORM,
+    PDU_RESPONSE,
+    PDU_TRAP_V2,
+    SNMP_VERSION_2C,
+    TAG_OCTET_STRING,
+    SnmpDecodeError,
+    decode_message,
+    encode_message,
+    parse_oid,
+)
+
+# Загрузка констант из .env
+TRAP_LISTENER = os.getenv('TRAP_LISTENER', 'false').lower() == 'true'  # Прием trap/inform вместо частого опроса
+TRAP_HOST = os.getenv('TRAP_HOST', '0.0.0.0')
+TRAP_PORT = int(os.getenv('TRAP_PORT', '162'))
+TRAP_COMMUNITY = os.getenv('TRAP_COMMUNITY', COMMUNITY_STRING)
+RECONCILE_INTERVAL = float(os.getenv('RECONCILE_INTERVAL', '30'))  # Период сверочного опроса get_ug405, с
+
+# Стандартные varbind уведомления SNMPv2
+OID_SYS_UPTIME = ".1.3.6.1.2.1.1.3.0"
+OID_SNMP_TRAP_OID = ".1.3.6.1.6.3.1.1.4.1.0"
+
+DETECTORS_ARCS = parse_oid(OID_DETECTORS)
+
+
+def suffix_to_scn(suffix):
+    """Суффикс OID .1.<длина>.<ascii коды> -> SCN, None если формат другой"""
+    if len(suffix) < 2 or suffix[0] != 1 or suffix[1] != len(suffix) - 2:
+        return None
+    try:
+        return bytes(suffix[2:]).decode('latin-1')
+    except ValueError:
+        return None
+
+
+def detector_varbinds(varbinds):
+    """Статусы детекторов из varbind уведомления: [(SCN, сырые bytes)]"""
+    result = []
+    prefix_length = len(DETECTORS_ARCS)
+    for oid, tag, value in varbinds:
+        if tag != TAG_OCTET_STRING or oid[:prefix_length] != DETECTORS_ARCS:
+            continue
+        scn = suffix_to_scn(oid[prefix_length:])
+        if scn is not None:
+            result.append((scn, value))
+    return result
+
+
+class TrapReceiver(asyncio.DatagramProtocol):
+    """Прием SNMPv2c trap/inform со статусом детекторов UG405.
+
+    handler(ip, scn, raw) вызывается на каждый varbind статуса детекторов;
+    raw - те же байты OctetString, что возвращает get_ug405, поэтому
+    дальше они идут через обычный DetectorPipeline.process. На inform
+    сразу отправляется Response, иначе контроллер будет его повторять.
+    """
+
+    def __init__(self, handler, community=TRAP_COMMUNITY):
+        self.handler = handler
+        self.community = community.encode() if isinstance(community, str) else community
+        self.transport = None
+        self.received = 0
+        self.rejected = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            message = decode_message(data)
+        except SnmpDecodeError:
+            self.rejected += 1
+            return
+        if (
+            message['version'] != SNMP_VERSION_2C
+            or message['community'] != self.community
+            or message['pdu_type'] not in (PDU_TRAP_V2, PDU_INFORM)
+        ):
+            self.rejected += 1
+            return
+        self.received += 1
+
+        if message['pdu_type'] == PDU_INFORM:
+            # Подтверждение inform: Response с тем же request-id и varbind
+            self.transport.sendto(
+                encode_message(PDU_RESPONSE, message['request_id'], message['varbinds'], self.community),
+                addr,
+            )
+
+        for scn, raw in detector_varbinds(message['varbinds']):
+            try:
+                self.handler(addr[0], scn, raw)
+            except Exception as e:
+                # Ошибка обработки одного уведомления не должна останавливать прием
+                print(f"Ошибка обработки trap от {addr[0]}: {e}")
+
+    def error_received(self, exc):
+        pass
+
+
+async def start_trap_receiver(handler, host=TRAP_HOST, port=TRAP_PORT, community=TRAP_COMMUNITY):
+    """Открывает UDP порт приема уведомлений, возвращает TrapReceiver"""
+    loop = asyncio.get_running_loop()
+    _, receiver = await loop.create_datagram_endpoint(
+        lambda: TrapReceiver(handler, community),
+        local_addr=(host, port),
+    )
+    return receiver
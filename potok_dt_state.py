@@ -0,0 +1,240 @@
+import argparse
+import os
+import struct
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+
+# Загрузка констант из .env
+STATE_NAME = os.getenv('STATE_NAME', 'ug405_dt_state')  # Имя разделяемой памяти таблицы состояния ('' - не создавать)
+STATE_DETECTORS = int(os.getenv('STATE_DETECTORS', '64'))  # Мест под детекторы в слоте
+
+# Таблица последнего состояния контроллеров в разделяемой памяти:
+#   заголовок: magic, версия, число слотов, мест под детекторы, размер слота,
+#              PID процесса-создателя (живой владелец не дает пересоздать таблицу)
+#   слот:      счетчик seq (uint32), детекторов (uint16), статус (uint16),
+#              время выборки (float64), имя контроллера (32 байта),
+#              нибблы детекторов (байт на детектор, как decode_detectors_bytes)
+# Каждый слот пишет только один процесс. Seq нечетный во время записи:
+# читатель повторяет чтение, пока seq до и после копирования не совпадет
+# и не станет четным (seqlock), поэтому блокировок между процессами нет.
+MAGIC = b'UGST'
+VERSION = 2
+TABLE_HEADER = struct.Struct('<4sBxHHHI')
+SLOT_HEADER = struct.Struct('<IHHd32s')
+SEQ = struct.Struct('<I')
+NAME_SIZE = 32
+
+STATUS_EMPTY = 0  # Выборок еще не было
+STATUS_OK = 1
+STATUS_NO_DATA = 2  # Последний опрос без данных, нибблы - от предыдущей выборки
+
+
+def slot_size_for(detectors):
+    """Размер слота, выровненный на 8 байт"""
+    return (SLOT_HEADER.size + detectors + 7) // 8 * 8
+
+
+def pid_alive(pid):
+    """Работает ли процесс pid"""
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        # os.kill в Windows завершает процесс, а разделяемая память там
+        # существует, только пока ее держит открытой хотя бы один процесс
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+class StateTable:
+    """Таблица последнего состояния детекторов в multiprocessing.shared_memory.
+
+    Слот на контроллер задается при создании; запись - publish() из
+    процесса-владельца слота, чтение - read()/snapshot() из любого процесса
+    через attach() без обращения к опрашивающим процессам.
+    """
+
+    def __init__(self, memory, owner=False):
+        self.memory = memory
+        self.owner = owner
+        self.buffer = memory.buf
+        magic, version, self.slots, self.detectors, self.slot_size, self.owner_pid = \
+            TABLE_HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{memory.name}: не таблица состояния")
+
+    @classmethod
+    def create(cls, names, name=STATE_NAME, detectors=STATE_DETECTORS):
+        """Создает таблицу со слотами для контроллеров names.
+
+        Таблица с тем же именем, оставшаяся от завершившегося процесса, удаляется.
+        Если ее создатель еще работает - FileExistsError: второй запуск
+        не должен отбирать таблицу у первого.
+        """
+        slot_size = slot_size_for(detectors)
+        size = TABLE_HEADER.size + slot_size * len(names)
+        try:
+            memory = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            owner = table_owner(name)
+            if owner is not None and pid_alive(owner):
+                raise FileExistsError(
+                    f"таблица состояния {name} используется процессом {owner}"
+                ) from None
+            # Осталась от прерванного запуска
+            shared_memory.SharedMemory(name).unlink()
+            memory = shared_memory.SharedMemory(name, create=True, size=size)
+        TABLE_HEADER.pack_into(memory.buf, 0, MAGIC, VERSION, len(names), detectors, slot_size, os.getpid())
+        for slot, controller in enumerate(names):
+            offset = TABLE_HEADER.size + slot * slot_size
+            SLOT_HEADER.pack_into(memory.buf, offset, 0, 0, STATUS_EMPTY, 0.0, controller.encode()[:NAME_SIZE])
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name=STATE_NAME, untrack=True):
+        """Подключается к существующей таблице.
+
+        Посторонний процесс не владеет памятью, и его resource_tracker не должен
+        удалять ее при выходе (untrack=True). Процессы, запущенные создателем
+        таблицы через multiprocessing, делят с ним resource_tracker - untrack=False.
+        """
+        memory = shared_memory.SharedMemory(name)
+        if untrack:
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(memory._name, 'shared_memory')
+            except Exception:
+                pass
+        return cls(memory)
+
+    def slot_offset(self, slot):
+        if not 0 <= slot < self.slots:
+            raise IndexError(f"нет слота {slot}")
+        return TABLE_HEADER.size + slot * self.slot_size
+
+    def names(self):
+        """Имена контроллеров по слотам"""
+        return [self.read(slot)[1] for slot in range(self.slots)]
+
+    def find(self, controller):
+        """Номер слота контроллера или None"""
+        for slot, name in enumerate(self.names()):
+            if name == controller:
+                return slot
+        return None
+
+    def publish(self, slot, timestamp, nibbles, status=STATUS_OK):
+        """Записывает выборку в слот (только процесс-владелец слота)"""
+        offset = self.slot_offset(slot)
+        buffer = self.buffer
+        seq = SEQ.unpack_from(buffer, offset)[0]
+        SEQ.pack_into(buffer, offset, (seq + 1) & 0xFFFFFFFF)
+        data_offset = offset + SLOT_HEADER.size
+        if nibbles is not None:
+            count = min(len(nibbles), self.detectors)
+            buffer[data_offset:data_offset + count] = nibbles[:count]
+            struct.pack_into('<H', buffer, offset + 4, count)
+        struct.pack_into('<Hd', buffer, offset + 6, status, timestamp)
+        SEQ.pack_into(buffer, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def read(self, slot, retries=100):
+        """Согласованная копия слота: (seq, имя, время, статус, нибблы)"""
+        offset = self.slot_offset(slot)
+        size = SLOT_HEADER.size + self.detectors
+        buffer = self.buffer
+        for _ in range(retries):
+            before = SEQ.unpack_from(buffer, offset)[0]
+            if before & 1:
+                continue
+            data = bytes(buffer[offset:offset + size])
+            if SEQ.unpack_from(buffer, offset)[0] == before:
+                seq, count, status, timestamp, name = SLOT_HEADER.unpack_from(data, 0)
+                nibbles = data[SLOT_HEADER.size:SLOT_HEADER.size + count]
+                return seq, name.rstrip(b'\0').decode(), timestamp, status, nibbles
+        raise TimeoutError(f"слот {slot} постоянно перезаписывается")
+
+    def snapshot(self):
+        """Копии всех слотов"""
+        return [self.read(slot) for slot in range(self.slots)]
+
+    def close(self):
+        self.buffer = None
+        self.memory.close()
+
+    def unlink(self):
+        """Удаляет разделяемую память (создатель таблицы при завершении)"""
+        self.memory.unlink()
+
+
+def table_owner(name):
+    """PID создателя существующей таблицы или None (чужой сегмент или старая версия)"""
+    try:
+        table = StateTable.attach(name)
+    except (ValueError, struct.error):
+        return None
+    try:
+        return table.owner_pid
+    finally:
+        table.close()
+
+
+class StateSlot:
+    """Слот контроллера в таблице: публикация из DetectorPipeline"""
+
+    def __init__(self, table, slot):
+        self.table = table
+        self.slot = slot
+
+    def publish(self, timestamp, nibbles):
+        self.table.publish(self.slot, timestamp, nibbles)
+
+    def publish_missing(self, timestamp):
+        self.table.publish(self.slot, timestamp, None, STATUS_NO_DATA)
+
+
+def format_slot(seq, name, timestamp, status, nibbles):
+    """Строка состояния контроллера для терминала"""
+    if status == STATUS_EMPTY:
+        return f"{name:<24} нет выборок"
+    current_time = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")[:-3]
+    marker = "" if status == STATUS_OK else " (нет данных)"
+    return f"{name:<24} [{current_time}] {''.join(f'{nibble:x}' for nibble in nibbles)}{marker}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Текущее состояние детекторов из разделяемой памяти")
+    parser.add_argument('--name', default=STATE_NAME)
+    parser.add_argument('--watch', type=float, default=0, help="обновлять каждые N секунд")
+    parser.add_argument('--unlink', action='store_true',
+                        help="удалить оставшуюся таблицу, если ее PID занят другим процессом")
+    args = parser.parse_args()
+
+    if args.unlink:
+        shared_memory.SharedMemory(args.name).unlink()
+        print(f"Таблица состояния {args.name} удалена")
+        return
+
+    table = StateTable.attach(args.name)
+    try:
+        while True:
+            for record in table.snapshot():
+                print(format_slot(*record))
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+            print()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+from datetime import datetime
+from potok_dt_log import RotatingLogWriter
+
+
+def parse_ints(value):
+    """'60,900' -> (60, 900)"""
+    return tuple(int(item) for item in value.split(','))
+
+
+# Загрузка констант из .env
+STATS = os.getenv('STATS', 'false').lower() == 'true'  # Агрегаты по окнам в отдельный лог
+STATS_WINDOWS = parse_ints(os.getenv('STATS_WINDOWS', '60,900,3600'))  # Длины окон, с
+STATS_BIT_PLANES = parse_ints(os.getenv('STATS_BIT_PLANES', '0'))  # Учитываемые биты ниббла
+
+
+class StatsWindow:
+    """Накопители одного окна (длина length, выровнено по времени) для всех каналов"""
+
+    def __init__(self, length, timestamp, channels):
+        self.length = length
+        self.start = timestamp // length * length
+        self.end = self.start + length
+        # Начало наблюдения: для первого окна - время первой выборки
+        self.observed_from = timestamp
+        self.on_time = [0.0] * channels
+        self.actuations = [0] * channels
+        self.on_sum = [0.0] * channels
+        self.on_count = [0] * channels
+        self.gap_sum = [0.0] * channels
+        self.gap_count = [0] * channels
+        self.max_gap = [0.0] * channels
+
+
+class DetectorStats:
+    """Потоковые агрегаты по детекторам: занятость, срабатывания, длительности.
+
+    Канал - пара (детектор, бит ниббла). Состояние хранится одним целым
+    числом, как в EdgeDetector, и на выборку обрабатываются только
+    изменившиеся биты: O(1) на изменение и на каждое окно. Длительность
+    периода учитывается в окне, где он закончился; время занятости
+    окна - точно по границам окна. Длительности срабатываний и интервалов
+    считаются только от наблюдавшегося фронта: первый период канала
+    начался до начала наблюдения, и его длина неизвестна.
+    """
+
+    def __init__(self, controller, windows=STATS_WINDOWS, planes=STATS_BIT_PLANES):
+        self.controller = controller
+        self.lengths = windows
+        self.planes = planes
+        self.reset()
+
+    def reset(self):
+        self.previous = None
+        self.count = 0
+        self.mask = 0
+        self.since = []
+        # Каналы, у которых since - время наблюдавшегося фронта
+        self.edges_seen = 0
+        self.windows = []
+        self.next_end = 0.0
+
+    def start(self, timestamp, current, count):
+        """Новая точка отсчета: первая выборка или смена числа детекторов"""
+        self.previous = current
+        self.count = count
+        # Маска учитываемых битов: одинаковые биты в каждом байте детектора
+        plane_bits = 0
+        for plane in self.planes:
+            plane_bits |= 1 << plane
+        self.mask = int.from_bytes(bytes([plane_bits]) * count, 'little')
+        channels = count * 8
+        self.since = [timestamp] * channels
+        self.edges_seen = 0
+        self.windows = [
+            StatsWindow(length, timestamp, channels)
+            for length in self.lengths
+        ]
+        self.next_end = min(window.end for window in self.windows)
+
+    def close_window(self, window, end=None):
+        """Итог окна; каналы, занятые на границе, дозаполняются до конца окна"""
+        end = window.end if end is None else end
+        on_channels = self.previous & self.mask
+        while on_channels:
+            lowest = on_channels & -on_channels
+            channel = lowest.bit_length() - 1
+            window.on_time[channel] += end - max(self.since[channel], window.start)
+            on_channels ^= lowest
+        # Занятость - доля наблюдавшейся части окна
+        observed = max(end - window.observed_from, 1e-9)
+
+        detectors = []
+        for detector in range(self.count):
+            for plane in self.planes:
+                channel = detector * 8 + plane
+                detectors.append({
+                    'detector': detector + 1,
+                    'plane': plane,
+                    'occupancy': window.on_time[channel] / observed * 100,
+                    'count': window.actuations[channel],
+                    'mean_on': window.on_sum[channel] / window.on_count[channel] if window.on_count[channel] else None,
+                    'mean_gap': window.gap_sum[channel] / window.gap_count[channel] if window.gap_count[channel] else None,
+                    'max_gap': window.max_gap[channel] if window.gap_count[channel] else None,
+                })
+        return {
+            'controller': self.controller,
+            'window': window.length,
+            'start': window.start,
+            'end': window.end,
+            'observed': observed,
+            'detectors': detectors,
+        }
+
+    def roll(self, timestamp):
+        """Закрывает окна, чьи границы прошли, возвращает их итоги"""
+        records = []
+        for index, window in enumerate(self.windows):
+            if timestamp < window.end:
+                continue
+            records.append(self.close_window(window))
+            # Пропущенные окна (нет выборок) не выдаются, новое - по текущему времени
+            self.windows[index] = StatsWindow(window.length, max(window.end, timestamp // window.length * window.length), len(self.since))
+        self.next_end = min(window.end for window in self.windows)
+        return records
+
+    def update(self, timestamp, nibbles):
+        """Учитывает выборку (ниббл на детектор), возвращает итоги закрытых окон"""
+        current = int.from_bytes(nibbles, 'little')
+        count = len(nibbles)
+        if self.previous is None or count != self.count:
+            records = [self.close_window(window, timestamp) for window in self.windows] if self.previous is not None else []
+            self.start(timestamp, current, count)
+            return records
+
+        records = self.roll(timestamp) if timestamp >= self.next_end else []
+        changed = (current ^ self.previous) & self.mask
+        while changed:
+            lowest = changed & -changed
+            channel = lowest.bit_length() - 1
+            duration = timestamp - self.since[channel]
+            # Период, начавшийся до первой выборки, в средние не входит
+            measured = self.edges_seen & lowest
+            if current & lowest:
+                # Начало срабатывания: закончился интервал между срабатываниями
+                for window in self.windows:
+                    window.actuations[channel] += 1
+                    if measured:
+                        window.gap_sum[channel] += duration
+                        window.gap_count[channel] += 1
+                        if duration > window.max_gap[channel]:
+                            window.max_gap[channel] = duration
+            else:
+                # Конец срабатывания
+                for window in self.windows:
+                    window.on_time[channel] += timestamp - max(self.since[channel], window.start)
+                    if measured:
+                        window.on_sum[channel] += duration
+                        window.on_count[channel] += 1
+            self.since[channel] = timestamp
+            changed ^= lowest
+        self.edges_seen |= (current ^ self.previous) & self.mask
+
+        self.previous = current
+        return records
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value:.1f} с"
+
+
+def format_stats_record(record):
+    """Строки итога окна: одна строка на детектор и бит"""
+    start = datetime.fromtimestamp(record['start']).strftime("%Y-%m-%d %H:%M:%S")
+    end = datetime.fromtimestamp(record['end']).strftime("%H:%M:%S")
+    lines = []
+    for det in record['detectors']:
+        lines.append(
+            f"[{start} - {end}] {record['controller']} окно {record['window']} с "
+            f"DT {det['detector']} бит {det['plane']}: "
+            f"занятость {det['occupancy']:.1f}%, срабатываний {det['count']}, "
+            f"ср. занятость {format_seconds(det['mean_on'])}, "
+            f"ср. интервал {format_seconds(det['mean_gap'])}, "
+            f"макс. интервал {format_seconds(det['max_gap'])}"
+        )
+    return lines
+
+
+class StatsLog:
+    """Дневной лог итогов окон"""
+
+    def __init__(self, log_dir, prefix="snmp_stats", date_format="%Y-%m-%d"):
+        self.writer = RotatingLogWriter(
+            lambda current_date: os.path.join(log_dir, f"{prefix}_{current_date}.txt"),
+            date_format=date_format,
+        )
+
+    def write_records(self, records):
+        for record in records:
+            self.writer.write("".join(line + "\n" for line in format_stats_record(record)))
+
+    def close(self):
+        self.writer.close()
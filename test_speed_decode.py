@@ -0,0 +1,81 @@
+import os
+import random
+import time
+from potok_dt_detectors import (
+    convert_to_binary_representation,
+    decode_detectors_batch,
+    decode_detectors_bytes,
+    nibbles_to_binary_representation,
+    nibbles_to_chars,
+    nibbles_to_planes,
+    parse_detectors_status,
+    reorder_detectors,
+)
+
+CONTROLLERS = int(os.getenv('BENCH_CONTROLLERS', '500'))
+SAMPLES = int(os.getenv('BENCH_SAMPLES', '50'))
+RAW_LENGTH = int(os.getenv('BENCH_RAW_LENGTH', '32'))  # Длина OctetString, байт
+
+
+def decode_text(raw):
+    """Текущий путь: prettyPrint строка -> символы -> 4 строки бит"""
+    detectors = reorder_detectors(parse_detectors_status('0x' + raw.hex()))
+    return detectors, convert_to_binary_representation(detectors)
+
+
+def decode_raw(raw):
+    """Путь по байтам"""
+    nibbles = decode_detectors_bytes(raw)
+    return nibbles_to_chars(nibbles), nibbles_to_binary_representation(nibbles)
+
+
+def main():
+    random.seed(405)
+    samples = [bytes(random.randrange(256) for _ in range(RAW_LENGTH))
+               for _ in range(CONTROLLERS * SAMPLES)]
+
+    print(f"🔍 ТЕСТ ДЕКОДИРОВАНИЯ: {len(samples)} выборок по {RAW_LENGTH} байт")
+    print("=" * 30)
+
+    # Результаты обязаны совпадать с текущими функциями
+    for length in range(RAW_LENGTH + 1):
+        for raw in samples[:200]:
+            raw = raw[:length]
+            assert decode_raw(raw) == decode_text(raw), f"Различие для {raw.hex()}"
+    print("✅ Результаты совпадают")
+
+    start = time.perf_counter()
+    for raw in samples:
+        decode_text(raw)
+    text_time = time.perf_counter() - start
+    print(f"Текстовый путь: {text_time * 1000:.1f} мс ({text_time / len(samples) * 1e6:.2f} мкс/выборка)")
+
+    start = time.perf_counter()
+    for raw in samples:
+        decode_raw(raw)
+    raw_time = time.perf_counter() - start
+    print(f"Путь по байтам: {raw_time * 1000:.1f} мс ({raw_time / len(samples) * 1e6:.2f} мкс/выборка)"
+          f", ускорение x{text_time / raw_time:.1f}")
+
+    try:
+        import numpy as np
+    except ImportError:
+        print("NumPy не установлен, пакетный тест пропущен")
+        return
+
+    matrix = np.frombuffer(b''.join(samples), dtype=np.uint8).reshape(len(samples), RAW_LENGTH)
+    start = time.perf_counter()
+    planes = nibbles_to_planes(decode_detectors_batch(matrix))
+    batch_time = time.perf_counter() - start
+    print(f"NumPy пакетом: {batch_time * 1000:.1f} мс ({batch_time / len(samples) * 1e6:.3f} мкс/выборка)"
+          f", ускорение x{text_time / batch_time:.1f}")
+
+    for index in range(0, len(samples), max(1, len(samples) // 100)):
+        _, expected = decode_text(samples[index])
+        actual = [[str(bit) for bit in planes[index, :, bit_position]] for bit_position in range(4)]
+        assert actual == expected, f"NumPy различие для {samples[index].hex()}"
+    print("✅ Пакетный результат совпадает")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import time
+from potok_dt_https import (
+    LAYOUT_MISMATCH,
+    parse_detectors_bs4,
+    parse_detectors_fast,
+    parse_detectors_page,
+)
+from potok_dt_sim import render_status_page
+
+ITERATIONS = 300
+
+
+def make_detectors(count):
+    return [
+        {'number': str(i), 'input': str(i), 'type': 'Индуктивный', 'status': '1' if i % 3 == 0 else '0'}
+        for i in range(1, count + 1)
+    ]
+
+
+def wrap(rows):
+    return f'<html><body><table><tbody id="table_detectors">{rows}</tbody></table></body></html>'
+
+
+# Эталонные страницы: разметка контроллера и ее вариации
+GOLDEN_PAGES = {
+    "симулятор, 32 детектора": render_status_page(make_detectors(32)),
+    "пустая таблица": wrap(""),
+    "нет таблицы": "<html><body><p>Авторизация не требуется</p></body></html>",
+    "сущности и пробелы": wrap(
+        "<tr><td> 1&nbsp;</td><td>\n 2 </td><td>Инд &amp; <b>петля</b></td>"
+        "<td><span id='det_status' class='badge  badge-success'> 1 </span></td>"
+        "<td><select name=\"state[]\"><option value=0>Авто</option>"
+        "<option value=1 selected>Вкл &lt;1&gt;</option></select></td></tr>"
+    ),
+    "верхний регистр и атрибуты без кавычек": wrap(
+        "<TR class=row><TD>7</TD><TD>3</TD><TD>Видео</TD>"
+        "<TD><SPAN ID=det_status>0</SPAN></TD>"
+        "<TD><SELECT NAME=state[]><OPTION SELECTED=selected>Выкл</OPTION></SELECT></TD></TR>"
+    ),
+    "без класса и без выбранного режима": wrap(
+        "<tr><td>2</td><td>2</td><td>Инд</td><td><span id=\"det_status\">1</span></td>"
+        "<td><select name=\"state[]\"><option>Авто</option></select></td></tr>"
+    ),
+    "без span и select": wrap(
+        "<tr><td>3</td><td>3</td><td>Инд</td><td>?</td><td>-</td></tr>"
+    ),
+    "короткая строка": wrap("<tr><td colspan=5>Нет данных</td></tr>"),
+    "вложенный span (откат на bs4)": wrap(
+        "<tr><td>4</td><td>4</td><td>Инд</td>"
+        "<td><span id=\"det_status\" class=\"x\"><span>1</span></span></td>"
+        "<td><select name=\"state[]\"><option selected>Авто</option></select></td></tr>"
+    ),
+    "'>' в кавычках атрибута (откат на bs4)": wrap(
+        "<tr><td>6</td><td>6</td><td>Инд</td>"
+        "<td><span title=\"a>b\" id=\"det_status\" class=\"badge\">1</span></td>"
+        "<td><select name=\"state[]\"><option data-x='1>0' selected>Вкл</option></select></td></tr>"
+    ),
+    "'>' в кавычках атрибута tbody": (
+        '<html><body><table><tbody title="a>b" id="table_detectors">'
+        '<tr><td>8</td><td>8</td><td>Инд</td><td><span id="det_status">0</span></td>'
+        '<td><select name="state[]"><option selected>Авто</option></select></td></tr>'
+        '</tbody></table></body></html>'
+    ),
+    "незакрытые option (откат на bs4)": wrap(
+        "<tr><td>5</td><td>5</td><td>Инд</td><td><span id=\"det_status\">0</span></td>"
+        "<td><select name=\"state[]\"><option selected>Авто<option>Вкл</select></td></tr>"
+    ),
+}
+
+
+def check_golden():
+    """Быстрый разбор обязан давать тот же результат, что и BeautifulSoup"""
+    for name, page in GOLDEN_PAGES.items():
+        expected = parse_detectors_bs4(page)
+        actual = parse_detectors_page(page, 'fast')
+        assert actual == expected, f"{name}: {actual} != {expected}"
+        mode = "откат" if parse_detectors_fast(page) is LAYOUT_MISMATCH else "fast"
+        print(f"✅ {name} ({mode})")
+
+
+def bench(name, func, page):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(page)
+    elapsed = (time.perf_counter() - start) / ITERATIONS * 1000
+    print(f"{name}: {elapsed:.3f} мс")
+    return elapsed
+
+
+def main():
+    print("🔍 ТЕСТ РАЗБОРА /detectors/status")
+    print("=" * 30)
+    check_golden()
+
+    page = GOLDEN_PAGES["симулятор, 32 детектора"]
+    slow = bench("BeautifulSoup", parse_detectors_bs4, page)
+    fast = bench("Быстрый разбор", parse_detectors_fast, page)
+    print(f"Ускорение: x{slow / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
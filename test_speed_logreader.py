@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+from potok_dt_binlog import RAW_LINE_RE
+from potok_dt_logreader import LogReader
+from potok_dt_sim import DetectorScript, encode_detectors_bytes
+from potok_dt_detectors import decode_detectors_bytes, nibbles_to_chars, print_full_output
+
+BENCH_LOG_HOURS = float(os.getenv('BENCH_LOG_HOURS', '2'))  # Длительность синтетического лога, ч
+BENCH_LOG_RATE = float(os.getenv('BENCH_LOG_RATE', '5'))  # Выборок в секунду
+WINDOW = 600  # Окно инцидента, с
+
+
+def write_full_log(path, start):
+    """Синтетический snmp_log_full_* в формате DualLogger"""
+    script = DetectorScript(pattern='random', step=1.0)
+    samples = int(BENCH_LOG_HOURS * 3600 * BENCH_LOG_RATE)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("SNMP Monitor Log - bench (Full Mode)\n" + "=" * 80 + "\n\n")
+        for index in range(samples):
+            timestamp = start + index / BENCH_LOG_RATE
+            # Сценарий 'random' меняет по биту на каждый шаг
+            script.started = time.monotonic() - index / BENCH_LOG_RATE
+            raw = encode_detectors_bytes(script.nibbles())
+            current_datetime = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            f.write(f"[{current_datetime}] Raw data: '0x{raw.hex()}'\n")
+            full_output = print_full_output(nibbles_to_chars(decode_detectors_bytes(raw)), len(raw) // 2)
+            for line in full_output.split('\n'):
+                f.write(f"[{current_datetime}] {line}\n")
+    return samples
+
+
+def naive_window(path, start, end):
+    """Как раньше: весь файл в память, регулярное выражение по каждой строке"""
+    result = []
+    with open(path, encoding='utf-8') as f:
+        lines = f.readlines()
+    for line in lines:
+        match = RAW_LINE_RE.match(line)
+        if not match:
+            continue
+        timestamp = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S.%f").timestamp()
+        if start <= timestamp < end:
+            result.append((timestamp, decode_detectors_bytes(bytes.fromhex(match.group(2)[2:]))))
+    return result
+
+
+def main():
+    print("🔍 ТЕСТ ЧТЕНИЯ ЛОГОВ ЧЕРЕЗ MMAP")
+    print("=" * 30)
+    start = datetime(2025, 1, 15, 8, 0).timestamp()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snmp_log_full_2025-01-15.txt")
+        samples = write_full_log(path, start)
+        print(f"Лог: {samples} выборок, {os.path.getsize(path) / 1e6:.1f} МБ")
+
+        window_start = start + BENCH_LOG_HOURS * 3600 / 2
+        window_end = window_start + WINDOW
+
+        began = time.perf_counter()
+        expected = naive_window(path, window_start, window_end)
+        naive = (time.perf_counter() - began) * 1000
+
+        with LogReader(path) as reader:
+            began = time.perf_counter()
+            actual = list(reader.samples(window_start, window_end))
+            mapped = (time.perf_counter() - began) * 1000
+
+            assert [nibbles for _, nibbles in actual] == [nibbles for _, nibbles in expected]
+            assert all(abs(a - b) < 1e-3 for (a, _), (b, _) in zip(actual, expected))
+            print(f"✅ Окно {WINDOW // 60} мин: {len(actual)} выборок совпадают")
+
+            began = time.perf_counter()
+            total = sum(1 for _ in reader.samples())
+            full_scan = (time.perf_counter() - began) * 1000
+            assert total == samples
+
+        print(f"Окно, чтение всего файла: {naive:.1f} мс")
+        print(f"Окно, mmap + бинарный поиск: {mapped:.1f} мс")
+        print(f"Весь файл через mmap: {full_scan:.1f} мс ({samples / full_scan * 1000:.0f} выб/с)")
+        print(f"Ускорение для окна: x{naive / mapped:.0f}")
+
+
+if __name__ == "__main__":
+    main()
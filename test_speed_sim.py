@@ -0,0 +1,135 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import requests
+import urllib3
+from potok_dt_https import get_detectors_status
+from potok_dt_sim import SIM_HOST, SIM_HTTPS_PORT, SIM_SNMP_PORT
+from potok_dt_snmp_client import SnmpPollerClient
+from potok_dt_snmp_fast import FastSnmpClient
+urllib3.disable_warnings()
+
+BENCH_SCALES = [int(count) for count in os.getenv('BENCH_SCALES', '1,10,50').split(',')]
+BENCH_DURATION = float(os.getenv('BENCH_DURATION', '5'))  # Длительность каждого прогона, с
+BENCH_HTTPS_THREADS = int(os.getenv('BENCH_HTTPS_THREADS', '16'))
+
+
+def start_simulator(count):
+    """Запускает симуляторы отдельным процессом, чтобы их CPU не попал в замер"""
+    env = dict(os.environ, SIM_CONTROLLERS=str(count))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "potok_dt_sim.py")],
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    for line in process.stdout:
+        if line.strip() == "READY":
+            return process
+    raise RuntimeError("Симулятор не запустился")
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(name, count, latencies, errors, wall, cpu):
+    """Печатает p50/p95/p99, пропускную способность и CPU на выборку"""
+    if not latencies:
+        print(f"{name:<14} x{count:<4} нет ответов, ошибок: {errors}")
+        return
+    latencies.sort()
+    print(
+        f"{name:<14} x{count:<4} "
+        f"p50 {percentile(latencies, 0.50):6.2f} мс  "
+        f"p95 {percentile(latencies, 0.95):6.2f} мс  "
+        f"p99 {percentile(latencies, 0.99):6.2f} мс  "
+        f"{len(latencies) / wall:8.0f} выб/с  "
+        f"CPU {cpu / len(latencies) * 1e6:6.0f} мкс/выб  "
+        f"ошибок: {errors}"
+    )
+
+
+async def bench_snmp(client_class, count):
+    """Замкнутый цикл get_ug405 по каждому контроллеру (один запрос в полете)"""
+    clients = [client_class(SIM_HOST, port=SIM_SNMP_PORT + index, timeout=1, retries=1)
+               for index in range(count)]
+    for client in clients:
+        await client.discover()
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + BENCH_DURATION
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            result = await client.get_ug405()
+            latencies.append((time.perf_counter() - start) * 1000)
+            if result is None:
+                errors += 1
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    for client in clients:
+        client.close()
+    return latencies, errors, wall, cpu
+
+
+def bench_https(count):
+    """get_detectors_status по всем контроллерам из пула потоков"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + BENCH_DURATION
+    threads_count = min(count, BENCH_HTTPS_THREADS)
+
+    def worker(thread_index):
+        nonlocal errors
+        targets = [(f"{SIM_HOST}:{SIM_HTTPS_PORT + index}", requests.Session())
+                   for index in range(thread_index, count, threads_count)]
+        while time.perf_counter() < deadline:
+            for ip, session in targets:
+                start = time.perf_counter()
+                detectors = get_detectors_status(ip, session)
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    if not detectors:
+                        errors += 1
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def main():
+    print(f"🔍 ТЕСТ НА СИМУЛЯТОРАХ: {BENCH_DURATION:.0f} с на прогон")
+    print("=" * 30)
+
+    for count in BENCH_SCALES:
+        simulator = start_simulator(count)
+        try:
+            for name, client_class in (("SNMP pysnmp", SnmpPollerClient), ("SNMP fast", FastSnmpClient)):
+                report(name, count, *asyncio.run(bench_snmp(client_class, count)))
+            report("HTTPS", count, *bench_https(count))
+        finally:
+            simulator.terminate()
+            simulator.wait()
+
+
+if __name__ == "__main__":
+    main()
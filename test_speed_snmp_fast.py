@@ -0,0 +1,97 @@
+import time
+from potok_dt_snmp_fast import (
+    PDU_GET,
+    PDU_RESPONSE,
+    TAG_OCTET_STRING,
+    decode_message,
+    encode_get_request,
+    encode_message,
+)
+
+OID = ".1.3.6.1.4.1.13267.3.2.5.1.1.32.1.6.67.79.48.48.48.49"
+COMMUNITY = "UTMC"
+STATUS = bytes.fromhex("1200ff00" * 8)
+ITERATIONS = 20000
+
+
+def pysnmp_modules():
+    """Низкоуровневый API pysnmp (эталон), None если pysnmp не установлен"""
+    try:
+        from pyasn1.codec.ber import decoder, encoder
+        from pysnmp.proto import api
+    except ImportError:
+        return None
+    modules = getattr(api, 'protoModules', None) or api.PROTOCOL_MODULES
+    version = getattr(api, 'protoVersion2c', None)
+    if version is None:
+        version = api.SNMP_VERSION_2C
+    return modules[version], encoder, decoder
+
+
+def pysnmp_get_request(p_mod, encoder, request_id):
+    pdu = p_mod.GetRequestPDU()
+    p_mod.apiPDU.setDefaults(pdu)
+    p_mod.apiPDU.setRequestID(pdu, request_id)
+    p_mod.apiPDU.setVarBinds(pdu, ((OID.strip('.'), p_mod.Null('')),))
+    message = p_mod.Message()
+    p_mod.apiMessage.setDefaults(message)
+    p_mod.apiMessage.setCommunity(message, COMMUNITY)
+    p_mod.apiMessage.setPDU(message, pdu)
+    return encoder.encode(message)
+
+
+def pysnmp_decode_response(p_mod, decoder, packet):
+    message, _ = decoder.decode(packet, asn1Spec=p_mod.Message())
+    pdu = p_mod.apiMessage.getPDU(message)
+    for name, val in p_mod.apiPDU.getVarBinds(pdu):
+        return val.asOctets()
+
+
+def check_against_pysnmp(reference):
+    """Сверяет байты запроса и разбор ответа с pysnmp"""
+    p_mod, encoder, decoder = reference
+    for request_id in (1, 127, 128, 65535, 2 ** 31 - 1):
+        expected = pysnmp_get_request(p_mod, encoder, request_id)
+        actual = encode_get_request(request_id, [OID], COMMUNITY)
+        assert actual == expected, f"GET различается для request-id {request_id}"
+
+    response = encode_message(PDU_RESPONSE, 42, [(OID, TAG_OCTET_STRING, STATUS)], COMMUNITY)
+    assert pysnmp_decode_response(p_mod, decoder, response) == STATUS
+    print("✅ Кодек совпадает с pysnmp")
+
+
+def bench(name, func):
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        func(i)
+    elapsed = (time.perf_counter() - start) / ITERATIONS * 1e6
+    print(f"{name}: {elapsed:.2f} мкс")
+    return elapsed
+
+
+def main():
+    print("🔍 ТЕСТ SNMP КОДЕКА")
+    print("=" * 30)
+
+    response = encode_message(PDU_RESPONSE, 42, [(OID, TAG_OCTET_STRING, STATUS)], COMMUNITY)
+    message = decode_message(response)
+    assert message['pdu_type'] == PDU_RESPONSE
+    assert message['varbinds'][0][2] == STATUS
+    assert decode_message(encode_get_request(7, [OID]))['pdu_type'] == PDU_GET
+
+    bench("Кодирование GET (fast)", lambda i: encode_get_request(i + 1, [OID], COMMUNITY))
+    bench("Разбор ответа (fast)", lambda i: decode_message(response))
+
+    reference = pysnmp_modules()
+    if reference is None:
+        print("pysnmp не установлен, сравнение пропущено")
+        return
+
+    check_against_pysnmp(reference)
+    p_mod, encoder, decoder = reference
+    bench("Кодирование GET (pysnmp)", lambda i: pysnmp_get_request(p_mod, encoder, i + 1))
+    bench("Разбор ответа (pysnmp)", lambda i: pysnmp_decode_response(p_mod, decoder, response))
+
+
+if __name__ == "__main__":
+    main()
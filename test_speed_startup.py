@@ -0,0 +1,91 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STARTUP_RUNS = int(os.getenv('STARTUP_RUNS', '5'))  # Запусков интерпретатора на модуль
+ITERATIONS = 2000
+
+# Точки входа мониторов
+MODULES = (
+    "potok_dt_snmp",
+    "potok_dt_snmp_decoder",
+    "potok_dt_snmp_fleet",
+    "potok_dt_https",
+    "potok_dt_https_async",
+)
+HEAVY_MODULES = ("pysnmp", "bs4", "requests")
+
+OID = ".1.3.6.1.4.1.13267.3.2.5.1.1.32.1.7.83.73.77.48.48.48.48"
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+
+def measure_import(module):
+    """Медиана времени импорта модуля в новом процессе и загруженные тяжелые зависимости"""
+    times = []
+    heavy = ""
+    for _ in range(STARTUP_RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.split()
+        times.append(float(output[0]))
+        heavy = output[1] if len(output) > 1 else ""
+    return statistics.median(times), heavy
+
+
+def bench_varbinds():
+    """Подготовка varbind запроса: новый ObjectType из строки против готового"""
+    from pysnmp.hlapi.asyncio import ObjectIdentity, ObjectType, SnmpEngine
+    from pysnmp.hlapi.asyncio.varbinds import CommandGeneratorVarBinds
+    from potok_dt_snmp_client import SnmpPollerClient
+
+    engine = SnmpEngine()
+    processor = CommandGeneratorVarBinds()
+    client = SnmpPollerClient("127.0.0.1")
+
+    def fresh():
+        processor.makeVarBinds(engine, [ObjectType(ObjectIdentity(OID))])
+
+    def cached():
+        processor.makeVarBinds(engine, [client.object_type(OID)])
+
+    # Первое разрешение загружает MIB - вне замера
+    fresh()
+    cached()
+    results = []
+    for name, func in (("ObjectType(ObjectIdentity(строка)) на запрос", fresh), ("готовый ObjectType", cached)):
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            func()
+        elapsed = (time.perf_counter() - started) / ITERATIONS * 1e6
+        print(f"{name}: {elapsed:.1f} мкс")
+        results.append(elapsed)
+    print(f"Ускорение подготовки запроса: x{results[0] / results[1]:.0f}")
+
+
+def main():
+    print("🔍 ТЕСТ ВРЕМЕНИ ЗАПУСКА")
+    print("=" * 30)
+    for module in MODULES:
+        elapsed, heavy = measure_import(module)
+        print(f"{module:<24} {elapsed * 1000:6.0f} мс  загружено: {heavy or '-'}")
+
+    print()
+    bench_varbinds()
+
+
+if __name__ == "__main__":
+    main()